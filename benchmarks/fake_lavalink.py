@@ -0,0 +1,349 @@
+# benchmarks/fake_lavalink.py
+"""
+Minimal in-process stand-in for a Lavalink v4 node, used by the benchmark scripts.
+It answers searches with deterministic fake tracks after a configurable latency,
+so the bot code can be measured without Java, YouTube or Discord.
+
+Run standalone:
+    python benchmarks/fake_lavalink.py --port 2333 --latency 0.05
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import sys
+import time
+import types
+from types import SimpleNamespace
+
+from aiohttp import web
+
+PASSWORD = "youshallnotpass"
+
+# The shipped config.py is a template that does not parse until it is filled in: the benchmarks then
+# run with these settings (imported before any bot module), everything else keeps the modules' defaults
+OFFLINE_CONFIG = {
+    "TOKEN": "",
+    "PREFIX": "!",
+    "PLAYER_CHANNEL_ID": 0,
+    "SPOTIPY_CLIENT_ID": "offline",         # placeholders: the benchmarks use a fake Spotify client
+    "SPOTIPY_CLIENT_SECRET": "offline",
+    "SNAPSHOT_PATH": ":memory:",
+}
+try:
+    import config  # noqa: F401
+except (ImportError, SyntaxError):
+    sys.modules["config"] = types.ModuleType("config")
+    sys.modules["config"].__dict__.update(OFFLINE_CONFIG)
+
+
+def make_track(query: str, length: int = 180_000) -> dict:
+    """Build a Lavalink track payload for `query`; the same query always gives the same track."""
+    identifier = hashlib.sha1(query.encode()).hexdigest()[:11]
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": "Fake Artist",
+        "length": length,
+        "isStream": False,
+        "position": 0,
+        "title": query.split(":", 1)[-1][:100],
+        "uri": f"https://www.youtube.com/watch?v={identifier}",
+        "artworkUrl": None,
+        "isrc": None,
+        "sourceName": "youtube",
+    }
+    # Framed like a real encoded track (lavaplayer message header, version, title), then the info as JSON:
+    # the fake node only has to decode its own strings
+    body = bytes([3]) + _utf(info["title"]) + _utf(json.dumps(info))
+    encoded = base64.b64encode(((1 << 30) | len(body)).to_bytes(4, "big") + body).decode()
+    return {"encoded": encoded, "info": info, "pluginInfo": {}, "userData": {}}
+
+
+def _utf(text: str) -> bytes:
+    data = text.encode()
+    return len(data).to_bytes(2, "big") + data
+
+
+def decode_track(encoded: str) -> dict:
+    raw = base64.b64decode(encoded)
+    position = 5 + 2 + int.from_bytes(raw[5:7], "big")
+    info = json.loads(raw[position + 2:])
+    return {"encoded": encoded, "info": info, "pluginInfo": {}, "userData": {}}
+
+
+class FakeLavalink:
+    """
+    One fake node. `latency` is the delay (seconds) added to every track load,
+    `stats` lets a test set what the node reports as its load.
+    With `track_seconds`, every track "plays" for that long: the node sends TrackStartEvent when it starts
+    and TrackEndEvent when it finishes, is replaced or is stopped (pauses are not taken into account).
+    Identifiers with "list=" load as a playlist of `playlist_size` tracks.
+    """
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 2333, latency: float = 0.05,
+                 track_seconds: float | None = None, playlist_size: int = 100):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.track_seconds = track_seconds
+        self.playlist_size = playlist_size
+        self._track_ends: dict[str, asyncio.TimerHandle] = {}   # guild ID -> end of its current track
+        self.session_id = hashlib.sha1(f"{host}:{port}:{time.time()}".encode()).hexdigest()[:16]
+        self.load_requests = 0
+        self.players: dict[str, dict] = {}   # guild ID -> last state sent by the client
+        self.stats = {"cpu": {"cores": 4, "systemLoad": 0.1, "lavalinkLoad": 0.05}, "frameStats": None}
+        self.sockets: set[web.WebSocketResponse] = set()
+        self._transports = set()
+        self._started = time.monotonic()
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(middlewares=[self._auth])
+        self.app.router.add_get("/version", self.version)
+        self.app.router.add_get("/v4/info", self.info)
+        self.app.router.add_get("/v4/stats", self.get_stats)
+        self.app.router.add_get("/v4/websocket", self.websocket)
+        self.app.router.add_get("/v4/loadtracks", self.loadtracks)
+        self.app.router.add_get("/v4/decodetrack", self.decodetrack)
+        self.app.router.add_post("/v4/decodetracks", self.decodetracks)
+        self.app.router.add_patch("/v4/sessions/{session_id}", self.update_session)
+        self.app.router.add_get("/v4/sessions/{session_id}/players", self.get_players)
+        self.app.router.add_patch("/v4/sessions/{session_id}/players/{guild_id}", self.update_player)
+        self.app.router.add_delete("/v4/sessions/{session_id}/players/{guild_id}", self.destroy_player)
+
+    @property
+    def uri(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @web.middleware
+    async def _auth(self, request: web.Request, handler):
+        if request.headers.get("Authorization") != PASSWORD:
+            raise web.HTTPUnauthorized()
+        return await handler(request)
+
+    # ─── REST ─────────────────────────────────────────────────────────
+    async def version(self, request: web.Request):
+        return web.Response(text="4.0.8")
+
+    async def info(self, request: web.Request):
+        return web.json_response({
+            "version": {"semver": "4.0.8", "major": 4, "minor": 0, "patch": 8, "preRelease": None, "build": None},
+            "buildTime": 0, "git": {"branch": "fake", "commit": "fake", "commitTime": 0},
+            "jvm": "fake", "lavaplayer": "fake",
+            "sourceManagers": ["youtube", "soundcloud", "bandcamp"],
+            "filters": [], "plugins": [],
+        })
+
+    def stats_payload(self) -> dict:
+        return {
+            "players": len(self.players),
+            "playingPlayers": sum(1 for player in self.players.values() if player["track"]),
+            "uptime": int((time.monotonic() - self._started) * 1000),
+            "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+            "cpu": self.stats["cpu"],
+            "frameStats": self.stats["frameStats"],
+        }
+
+    async def get_stats(self, request: web.Request):
+        return web.json_response(self.stats_payload())
+
+    async def loadtracks(self, request: web.Request):
+        self.load_requests += 1
+        identifier = request.query.get("identifier", "")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not identifier.strip() or identifier.endswith(":"):
+            return web.json_response({"loadType": "empty", "data": {}})
+        if "list=" in identifier:
+            return web.json_response({"loadType": "playlist", "data": {
+                "info": {"name": f"Playlist {identifier}", "selectedTrack": -1}, "pluginInfo": {},
+                "tracks": [make_track(f"{identifier} #{i}") for i in range(self.playlist_size)],
+            }})
+        return web.json_response({"loadType": "search", "data": [make_track(identifier)]})
+
+    async def decodetrack(self, request: web.Request):
+        return web.json_response(decode_track(request.query["encodedTrack"]))
+
+    async def decodetracks(self, request: web.Request):
+        return web.json_response([decode_track(e) for e in await request.json()])
+
+    async def update_session(self, request: web.Request):
+        data = await request.json()
+        return web.json_response({"resuming": data.get("resuming", False), "timeout": data.get("timeout", 60)})
+
+    def player_payload(self, guild_id: str) -> dict:
+        player = self.players[guild_id]
+        return {
+            "guildId": guild_id,
+            "track": player["track"],
+            "volume": player["volume"],
+            "paused": player["paused"],
+            "state": {"time": int(time.time() * 1000), "position": player["position"], "connected": True, "ping": 0},
+            "voice": player["voice"],
+            "filters": player["filters"],
+        }
+
+    async def get_players(self, request: web.Request):
+        return web.json_response([self.player_payload(guild_id) for guild_id in self.players])
+
+    async def update_player(self, request: web.Request):
+        guild_id = request.match_info["guild_id"]
+        data = await request.json()
+        player = self.players.setdefault(guild_id, {
+            "track": None, "volume": 100, "paused": False, "position": 0, "voice": {}, "filters": {}
+        })
+        track = data.get("track")
+        previous = player["track"]
+        if track and track.get("encoded"):
+            player["track"] = decode_track(track["encoded"])
+            player["position"] = data.get("position", 0)
+            self._track_changed(guild_id, previous, player["track"])
+        elif track and "encoded" in track:
+            player["track"] = None
+            player["position"] = 0
+            self._track_changed(guild_id, previous, None)
+        elif "position" in data:
+            player["position"] = data["position"]
+        for key in ("volume", "paused", "voice", "filters"):
+            if key in data:
+                player[key] = data[key]
+        return web.json_response(self.player_payload(guild_id))
+
+    async def destroy_player(self, request: web.Request):
+        guild_id = request.match_info["guild_id"]
+        self.players.pop(guild_id, None)
+        end = self._track_ends.pop(guild_id, None)
+        if end:
+            end.cancel()
+        return web.Response(status=204)
+
+    # ─── Playback events ──────────────────────────────────────────────
+    def _track_changed(self, guild_id: str, previous: dict | None, track: dict | None):
+        if self.track_seconds is None:
+            return
+        end = self._track_ends.pop(guild_id, None)
+        if end:
+            end.cancel()
+        if previous is not None and end is not None:
+            self._send_event(guild_id, "TrackEndEvent", previous, reason="replaced" if track else "stopped")
+        if track is not None:
+            self._send_event(guild_id, "TrackStartEvent", track)
+            loop = asyncio.get_running_loop()
+            self._track_ends[guild_id] = loop.call_later(self.track_seconds, self._track_finished, guild_id, track)
+
+    def _track_finished(self, guild_id: str, track: dict):
+        self._track_ends.pop(guild_id, None)
+        player = self.players.get(guild_id)
+        if player is not None and player["track"] is track:
+            player["track"] = None
+            player["position"] = 0
+        self._send_event(guild_id, "TrackEndEvent", track, reason="finished")
+
+    def _send_event(self, guild_id: str, kind: str, track: dict, **fields):
+        # Sent after the REST response, like a real node
+        payload = {"op": "event", "type": kind, "guildId": guild_id, "track": track, **fields}
+        asyncio.get_running_loop().call_soon(asyncio.ensure_future, self.broadcast(payload))
+
+    # ─── Websocket ────────────────────────────────────────────────────
+    async def websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        self._transports.add(request.transport)
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": self.session_id})
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    async def broadcast(self, payload: dict):
+        for ws in list(self.sockets):
+            if not ws.closed:
+                await ws.send_json(payload)
+
+    # ─── Lifecycle ────────────────────────────────────────────────────
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def kill(self):
+        """Drop every connection without a close frame, like a crashed node, then stop serving."""
+        for transport in list(self._transports):
+            transport.abort()
+        self._transports.clear()
+        self.sockets.clear()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def stop(self):
+        for end in self._track_ends.values():
+            end.cancel()
+        self._track_ends.clear()
+        for ws in list(self.sockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class BenchClient:
+    """The few attributes of discord.Client that wavelink.Node uses, for running without Discord."""
+
+    def __init__(self, user_id: int = 1):
+        self.user = SimpleNamespace(id=user_id)
+        self.events: list[tuple] = []
+
+    def dispatch(self, event: str, *args, **kwargs):
+        self.events.append((event, args))
+
+
+def fake_player(guild_id: int, node):
+    """A wavelink.Player as it is after joining a voice channel, without Discord."""
+    import wavelink
+
+    player = wavelink.Player(channel=SimpleNamespace(id=guild_id, members=[]), nodes=[node])
+    player._guild = SimpleNamespace(id=guild_id)
+    player._voice_state = {
+        "voice": {"session_id": f"session{guild_id}", "token": "token", "endpoint": "voice.invalid"},
+        "channel_id": str(guild_id),
+    }
+    player._connected = True
+    node._players[guild_id] = player
+    return player
+
+
+async def connect_pool(*fakes: FakeLavalink, client=None):
+    """Connect wavelink.Pool to the given fake nodes and wait until they are ready."""
+    import wavelink
+
+    client = client or BenchClient()
+    nodes = [
+        wavelink.Node(identifier=f"fake-{fake.port}", uri=fake.uri, password=PASSWORD, client=client)
+        for fake in fakes
+    ]
+    await wavelink.Pool.connect(nodes=nodes, client=client)
+    while any(node.status is not wavelink.NodeStatus.CONNECTED for node in nodes):
+        await asyncio.sleep(0.01)
+    return nodes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a fake Lavalink node.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2333)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every track load")
+    args = parser.parse_args()
+
+    fake = FakeLavalink(host=args.host, port=args.port, latency=args.latency)
+    await fake.start()
+    print(f"Fake Lavalink listening on {fake.uri} (latency {args.latency * 1000:.0f} ms)")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
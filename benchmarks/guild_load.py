@@ -0,0 +1,330 @@
+# benchmarks/guild_load.py
+"""
+Load test: how many guilds can one bot process serve?
+N simulated guilds use the real Music and PlayerEmbed cogs at the same time for DURATION seconds:
+each joins with !play, then keeps issuing !play, !playlist (YouTube and Spotify), !next and
+player button presses with random pauses in between. A local fake Lavalink node plays every track
+for --track-seconds and sends the track start/end events over its websocket, which a fake gateway
+dispatches to the cogs' listeners like discord.py would. Discord replies and message edits take --discord-latency.
+
+Each guild count runs in its own process (so memory numbers do not add up) and reports
+p50/p99 command latency, event loop lag, resident memory and the mean silence between two tracks:
+
+    python benchmarks/guild_load.py --guilds 10 50 100 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from music_cog import FakeSpotify, StubBot
+
+import wavelink
+
+import library
+import search_cache
+import spotify
+import spotify_index
+from fake_lavalink import FakeLavalink, connect_pool, fake_player
+from main import Music
+from player import PlayerEmbed
+
+logging.getLogger("Anakin").setLevel(logging.ERROR)
+
+BUTTONS = ("pause_button", "play_button", "next_button", "prev_button", "queue_button")
+# (action, weight) of what a guild does after each pause
+ACTIONS = (("play", 35), ("next", 15), ("playlist", 5), ("button", 45))
+
+
+# ─── Fake Discord ───────────────────────────────────────────────────
+class FakeGateway(StubBot):
+    """Stands for the bot: lets the cogs find each other and delivers wavelink's events to their listeners."""
+
+    def __init__(self):
+        super().__init__()
+        self.user = SimpleNamespace(id=1)
+        self.events = Counter()
+
+    def dispatch(self, event: str, *args, **kwargs):
+        self.events[event] += 1
+        for cog in self.cogs.values():
+            listener = getattr(cog, f"on_{event}", None)
+            if listener is not None:
+                asyncio.create_task(listener(*args, **kwargs))
+
+
+class SlowMessage:
+    """A message whose edits take `latency` seconds, like a Discord REST call."""
+
+    def __init__(self, latency: float, content=None):
+        self.id = id(self)
+        self.latency = latency
+        self.content = content
+
+    async def edit(self, **fields):
+        await asyncio.sleep(self.latency)
+        self.content = fields.get("content", self.content)
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(self.latency)
+
+
+class VoiceChannel:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.members = []
+
+    async def connect(self, *, cls):
+        # nodes.NodeBalancer.connect passes functools.partial(wavelink.Player, nodes=[node])
+        return fake_player(self.id, cls.keywords["nodes"][0])
+
+
+class GuildClient:
+    """One guild's member and text channel: builds contexts for commands and interactions for buttons."""
+
+    def __init__(self, guild_id: int, latency: float):
+        self.guild = SimpleNamespace(id=guild_id)
+        self.author = SimpleNamespace(voice=SimpleNamespace(channel=VoiceChannel(guild_id)), bot=False)
+        self.latency = latency
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return SlowMessage(self.latency, content)
+
+    def context(self, command):
+        return SimpleNamespace(guild=self.guild, author=self.author, command=command, reply=self.send, send=self.send)
+
+    def interaction(self, custom_id: str):
+        client = self
+
+        class Response:
+            done = False
+
+            def is_done(self):
+                return self.done
+
+            async def defer(self):
+                await asyncio.sleep(client.latency)
+                self.done = True
+
+            async def edit_message(self, **fields):
+                await asyncio.sleep(client.latency)
+                self.done = True
+
+        async def edit_original_response(**fields):
+            await asyncio.sleep(client.latency)
+
+        return SimpleNamespace(
+            guild_id=self.guild.id, user=self.author, channel=self, data={"custom_id": custom_id},
+            response=Response(), edit_original_response=edit_original_response
+        )
+
+
+# ─── Simulation ─────────────────────────────────────────────────────
+class Simulation:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.latencies: dict[str, list[float]] = {}
+        self.errors = Counter()
+        self.lags: list[float] = []
+
+    async def invoke(self, music: Music, client: GuildClient, name: str, **kwargs):
+        command = getattr(music, name)
+        ctx = client.context(command)
+        start = time.perf_counter()
+        try:
+            await music.cog_before_invoke(ctx)
+            await command.callback(music, ctx, **kwargs)
+            await music.cog_after_invoke(ctx)
+        except Exception as e:
+            self.errors[f"!{name}: {type(e).__name__}"] += 1
+        self.latencies.setdefault(f"!{name}", []).append(time.perf_counter() - start)
+
+    async def press(self, embeds: PlayerEmbed, client: GuildClient, button: str):
+        item = getattr(embeds.controls, button)
+        interaction = client.interaction(item.custom_id)
+        start = time.perf_counter()
+        try:
+            await embeds.controls.interaction_check(interaction)
+            await item.callback(interaction)
+        except Exception as e:
+            self.errors[f"{button}: {type(e).__name__}"] += 1
+        self.latencies.setdefault(button, []).append(time.perf_counter() - start)
+
+    async def guild_session(self, music: Music, embeds: PlayerEmbed, guild_id: int, deadline: float):
+        rng = random.Random(self.random.random())
+        client = GuildClient(guild_id, self.args.discord_latency)
+        messages = embeds.get_messages(guild_id, client)
+        messages.player_message = SlowMessage(self.args.discord_latency)
+
+        await asyncio.sleep(rng.uniform(0, self.args.think))   # guilds do not all start at once
+        await self.invoke(music, client, "play", query=f"song {guild_id}-0")
+        played = 1
+        actions, weights = zip(*ACTIONS)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(rng.expovariate(1 / self.args.think))
+            action = rng.choices(actions, weights)[0]
+            if action == "play":
+                played += 1
+                await self.invoke(music, client, "play", query=f"song {guild_id}-{played}")
+            elif action == "next":
+                await self.invoke(music, client, "next")
+            elif action == "playlist":
+                url = (
+                    f"https://www.youtube.com/playlist?list=guild{guild_id}-{played}"
+                    if rng.random() < 0.5 else f"https://open.spotify.com/playlist/guild{guild_id}"
+                )
+                await self.invoke(music, client, "playlist", url=url)
+            else:
+                await self.press(embeds, client, rng.choice(BUTTONS))
+
+    async def sample_loop_lag(self, interval: float = 0.05):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.lags.append(max(0.0, loop.time() - start - interval))
+
+    async def run(self) -> dict:
+        args = self.args
+        fake = FakeLavalink(
+            port=args.port, latency=args.latency, track_seconds=args.track_seconds, playlist_size=args.playlist_size
+        )
+        await fake.start()
+        gateway = FakeGateway()
+        spotify.get_client = lambda: FakeSpotify(args.playlist_size)
+        search_cache._cache = search_cache.SearchCache(":memory:")
+        spotify_index._index = spotify_index.SpotifyIndex(":memory:")
+        library._library = library.LibraryIndex(":memory:")
+        try:
+            await connect_pool(fake, client=gateway)
+            music = Music(gateway)
+            embeds = PlayerEmbed(gateway)
+            gateway.cogs = {"Music": music, "PlayerEmbed": embeds}
+
+            baseline = rss_mb()
+            sampler = asyncio.create_task(self.sample_loop_lag())
+            deadline = time.monotonic() + args.duration
+            await asyncio.gather(*(
+                self.guild_session(music, embeds, guild_id, deadline) for guild_id in range(1, args.level + 1)
+            ))
+            sampler.cancel()
+            memory = rss_mb()
+
+            commands = {name: summary(values) for name, values in sorted(self.latencies.items())}
+            return {
+                "guilds": args.level,
+                "commands": commands,
+                "all": summary([value for values in self.latencies.values() for value in values]),
+                "errors": dict(self.errors),
+                "loop_lag": summary(self.lags),
+                "rss_mb": memory,
+                "rss_per_guild_kb": (memory - baseline) * 1024 / args.level,
+                "track_ends": gateway.events["wavelink_track_end"],
+                "dead_air_ms": mean_dead_air(music) * 1000,
+                "queued": sum(state.queued for state in music.guilds),
+                "embed_edits": embeds.scheduler.stats(),
+            }
+        finally:
+            await wavelink.Pool.close()
+            await fake.stop()
+
+
+def summary(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def mean_dead_air(music: Music) -> float:
+    """Mean silence between a finished track and the next one, over every guild, in seconds."""
+    transitions = sum(state.transitions for state in music.guilds)
+    return sum(state.dead_air for state in music.guilds) / transitions if transitions else 0.0
+
+
+def rss_mb() -> float:
+    """Resident memory of this process, in MB."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ─── Report ─────────────────────────────────────────────────────────
+def run_level(args, level: int) -> dict:
+    command = [sys.executable, __file__, "--level", str(level)] + [
+        option for name in ("duration", "think", "track_seconds", "latency", "discord_latency",
+                            "playlist_size", "port", "seed")
+        for option in (f"--{name.replace('_', '-')}", str(getattr(args, name)))
+    ]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(reports: list[dict]):
+    print(f"{'guilds':>6}  {'cmds':>6}  {'p50 ms':>7}  {'p99 ms':>7}  {'lag p50':>7}  {'lag p99':>7}  "
+          f"{'lag max':>7}  {'RSS MB':>7}  {'KB/guild':>8}  {'ends':>6}  {'gap ms':>6}  {'errors':>6}")
+    for report in reports:
+        commands, lag = report["all"], report["loop_lag"]
+        print(
+            f"{report['guilds']:>6}  {commands['count']:>6}  {commands['p50_ms']:>7.1f}  {commands['p99_ms']:>7.1f}  "
+            f"{lag['p50_ms']:>7.1f}  {lag['p99_ms']:>7.1f}  {lag['max_ms']:>7.1f}  {report['rss_mb']:>7.1f}  "
+            f"{report['rss_per_guild_kb']:>8.1f}  {report['track_ends']:>6}  {report['dead_air_ms']:>6.1f}  "
+            f"{sum(report['errors'].values()):>6}"
+        )
+    last = reports[-1]
+    print(f"\nPer command at {last['guilds']} guilds:")
+    for name, stats in last["commands"].items():
+        print(f"  {name:<14} {stats['count']:>6}  p50 {stats['p50_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms")
+    for error, count in sorted(last["errors"].items()):
+        print(f"  ⚠️ {error} x{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per guild count")
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between two actions of a guild")
+    parser.add_argument("--track-seconds", type=float, default=8.0, help="how long every track plays")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds of every fake Lavalink search")
+    parser.add_argument("--discord-latency", type=float, default=0.05, help="seconds of every Discord API call")
+    parser.add_argument("--playlist-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=2395)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the reports to this JSON file")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)   # one guild count, in a child process
+    args = parser.parse_args()
+
+    if args.level:
+        print(json.dumps(asyncio.run(Simulation(args).run())))
+        return
+
+    reports = []
+    for level in args.guilds:
+        print(f"… {level} guild(s) for {args.duration:.0f}s", file=sys.stderr)
+        reports.append(run_level(args, level))
+    print_report(reports)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(reports, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
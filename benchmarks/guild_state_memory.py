@@ -0,0 +1,71 @@
+# benchmarks/guild_state_memory.py
+"""
+Per-guild memory of the Music cog's state, for a bot in N guilds:
+the former six-dicts layout versus guild_state.GuildRegistry.
+Tracks are shared objects, so only the bookkeeping around them is measured.
+
+    python benchmarks/guild_state_memory.py --guilds 1000
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from guild_state import GuildRegistry
+from track_queue import TrackQueue
+
+TRACKS = [SimpleNamespace(title=f"Track {i}", uri=f"https://www.youtube.com/watch?v={i:011d}") for i in range(3)]
+
+
+def six_dicts(guilds: int, queue_factory):
+    queues, history, skip_flags, loading, pending_shuffle, loops = {}, {}, {}, {}, {}, {}
+    for guild_id in range(guilds):
+        queues[guild_id] = queue_factory()
+        history[guild_id] = list(TRACKS)
+        skip_flags[guild_id] = False
+        loading[guild_id] = False
+        pending_shuffle[guild_id] = False
+        loops[guild_id] = -1
+    return queues, history, skip_flags, loading, pending_shuffle, loops
+
+
+def registry(guilds: int):
+    states = GuildRegistry(history_size=3)
+    for guild_id in range(guilds):
+        state = states.get(guild_id)
+        for track in TRACKS:
+            state.history.append(track)
+        state.loop = -1
+    return states
+
+
+def measure(build, guilds: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(guilds)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / guilds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = [
+        ("six dicts, list queues", measure(lambda n: six_dicts(n, list), args.guilds)),
+        ("six dicts, TrackQueue", measure(lambda n: six_dicts(n, TrackQueue), args.guilds)),
+        ("GuildRegistry", measure(registry, args.guilds)),
+    ]
+    print(f"{args.guilds} guilds, 3 history entries each, empty queues")
+    for name, per_guild in rows:
+        print(f"{name:<24} {per_guild:>8.0f} B/guild  {per_guild * args.guilds / 1024:>8.1f} KiB total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+# benchmarks/music_cog.py
+"""
+Micro-benchmarks of the Music cog and PlayerEmbed, run offline: commands are called with stub
+contexts (no Discord), players live on a local fake Lavalink node and Spotify is a fake client.
+- queue operations on a 10k-entry queue (--queue), directly and through the commands that use them
+- on_wavelink_track_end handling (next track from the queue, played on the fake node)
+- _build_queue_embed / _build_player_embed render time
+- Spotify playlist ingestion throughput (lazy entries, and tracks searched up front)
+- !import throughput (a file written by !export, decoded by batched Lavalink requests)
+
+Results are written as JSON so runs can be compared across commits:
+
+    python benchmarks/music_cog.py --output before.json
+    git checkout other-branch
+    python benchmarks/music_cog.py --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+import wavelink
+
+from fake_lavalink import FakeLavalink, connect_pool, fake_player, make_track   # first: sets up config
+import config
+config.SNAPSHOT_PATH = ":memory:"   # never touch the bot's real state file
+
+import playlist
+import queue_file
+import resolver
+import search_cache
+import spotify
+import spotify_index
+from main import Music
+from player import GuildMessages, PlayerEmbed
+from track_queue import QueueEntry, TrackQueue
+
+GUILD_ID = 1
+logging.getLogger("Anakin").setLevel(logging.WARNING)   # no log line per benchmarked track
+
+
+# ─── Stubs ──────────────────────────────────────────────────────────
+class StubMessage:
+    latency = 0.0   # seconds of every edit (--discord-latency)
+
+    def __init__(self, content=None, embed=None):
+        self.id = id(self)
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, **fields):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.content = fields.get("content", self.content)
+        self.embed = fields.get("embed", self.embed)
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class StubContext:
+    """The parts of commands.Context the Music commands use; replies are kept instead of sent."""
+
+    def __init__(self, guild_id: int):
+        self.guild = SimpleNamespace(id=guild_id)
+        self.author = SimpleNamespace(voice=None)
+        self.replies: list[StubMessage] = []
+
+    async def reply(self, content=None, *, embed=None, **kwargs):
+        message = StubMessage(content, embed)
+        self.replies.append(message)
+        return message
+
+    send = reply
+
+
+class StubBot:
+    """Enough of commands.Bot for the cogs to find each other."""
+
+    def __init__(self):
+        self.cogs = {}
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+
+class FakeSpotify:
+    """Paged playlist like spotify.SpotifyClient, 100 items per page, each request taking `latency` seconds."""
+
+    def __init__(self, total: int, latency: float = 0.0):
+        self.total = total
+        self.latency = latency
+
+    async def _page(self, offset: int) -> dict:
+        await asyncio.sleep(self.latency)
+        items = [
+            {"track": {"name": f"Song {i}", "artists": [{"name": f"Artist {i % 37}"}], "id": f"sp{i}"}}
+            for i in range(offset, min(offset + 100, self.total))
+        ]
+        following = offset + 100 if offset + 100 < self.total else None
+        return {"items": items, "total": self.total, "limit": 100, "offset": offset, "next": following}
+
+    async def playlist_page(self, playlist_id: str, offset: int = 0) -> dict:
+        return await self._page(offset)
+
+
+# ─── Timing ─────────────────────────────────────────────────────────
+def measure(func, number: int, repeat: int) -> float:
+    """Median over `repeat` runs of the mean time of one call, in microseconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - start) / number)
+    return statistics.median(runs) * 1e6
+
+
+async def measure_async(func, number: int, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        runs.append((time.perf_counter() - start) / number)
+    return statistics.median(runs) * 1e6
+
+
+def make_entries(count: int) -> list[QueueEntry]:
+    return [QueueEntry.of(wavelink.Playable(make_track(f"ytsearch:Track {i}"))) for i in range(count)]
+
+
+# ─── Benchmarks ─────────────────────────────────────────────────────
+def bench_queue(entries: list[QueueEntry], repeat: int) -> dict:
+    queue = TrackQueue(entries)
+    last_title = entries[-1].title
+    spare = entries[0]
+
+    def append_popleft():
+        queue.append(spare)
+        queue.popleft()
+
+    def remove_last():
+        # Worst case for a title match: the last entry; put it back for the next round
+        removed = queue.remove_match(last_title)
+        queue.append(removed)
+
+    return {
+        "queue.append_popleft": measure(append_popleft, 1000, repeat),
+        "queue.peek_slice_10": measure(lambda: queue[:10], 1000, repeat),
+        "queue.find_last": measure(lambda: queue.find(last_title), 100, repeat),
+        "queue.remove_match_last": measure(remove_last, 100, repeat),
+        "queue.shuffle": measure(queue.shuffle, 10, repeat),
+        "queue.extend_all": measure(lambda: TrackQueue().extend(entries), 3, repeat),
+        "queue.iterate_all": measure(lambda: sum(1 for _ in queue), 10, repeat),
+    }
+
+
+async def bench_commands(music: Music, entries: list[QueueEntry], repeat: int) -> dict:
+    queue = music.get_queue(GUILD_ID)
+    queue.clear()
+    queue.extend(entries)
+    ctx = StubContext(GUILD_ID)
+    last_title = entries[-1].title
+
+    async def remove_last():
+        await music.remove.callback(music, ctx, identifier=last_title)
+        queue.append(entries[-1])
+
+    results = {
+        "command.queue": await measure_async(lambda: music.queue.callback(music, ctx), 100, repeat),
+        "command.shuffle": await measure_async(lambda: music.shuffle.callback(music, ctx), 10, repeat),
+        "command.remove_last": await measure_async(remove_last, 100, repeat),
+    }
+    ctx.replies.clear()
+    return results
+
+
+async def bench_track_end(music: Music, player: wavelink.Player, entries: list[QueueEntry],
+                          events: int, repeat: int) -> dict:
+    """Cost of one finished track: history, next entry from the queue, play request to the node."""
+    state = music.get_state(GUILD_ID)
+    finished = wavelink.Playable(make_track("ytsearch:finished"))
+    event = SimpleNamespace(player=player, track=finished, reason="finished")
+
+    runs = []
+    for _ in range(repeat):
+        state.queue.clear()
+        state.queue.extend(entries)
+        start = time.perf_counter()
+        for _ in range(events):
+            await music.on_wavelink_track_end(event)
+        runs.append((time.perf_counter() - start) / events)
+    return {"track_end.next_from_queue": statistics.median(runs) * 1e6}
+
+
+def bench_embeds(embeds: PlayerEmbed, music: Music, entries: list[QueueEntry], repeat: int) -> dict:
+    queue = music.get_queue(GUILD_ID)
+    queue.clear()
+    queue.extend(entries)
+    return {
+        "embed.build_queue": measure(lambda: embeds._build_queue_embed(GUILD_ID), 1000, repeat),
+        "embed.build_player": measure(lambda: embeds._build_player_embed(GUILD_ID), 1000, repeat),
+    }
+
+
+async def bench_ingestion(music: Music, node: wavelink.Node, tracks: int, spotify_latency: float, repeat: int) -> dict:
+    """Tracks per second from a Spotify playlist to the queue (player already playing, like a second !playlist)."""
+    spotify.get_client = lambda: FakeSpotify(tracks, spotify_latency)
+    results = {}
+    for lazy in (True, False):
+        rates = []
+        for run in range(repeat):
+            # Fresh, empty caches so the eager mode really searches every track
+            search_cache._cache = search_cache.SearchCache(":memory:")
+            spotify_index._index = spotify_index.SpotifyIndex(":memory:")
+            guild_id = 1000 + run * 2 + lazy
+            player = fake_player(guild_id, node)
+            await player.play(wavelink.Playable(make_track("ytsearch:already playing")))
+            ctx = StubContext(guild_id)
+            progress = resolver.ResolveProgress()
+            source = playlist.stream_spotify_playlist("https://open.spotify.com/playlist/bench", progress, lazy=lazy)
+            start = time.perf_counter()
+            await music.ingest_playlist(ctx, player, "Spotify playlist", source, progress, StubMessage())
+            rates.append(tracks / (time.perf_counter() - start))
+            assert len(music.get_queue(guild_id)) == tracks, ctx.replies[-1].content
+            state = music.guilds.get(guild_id)
+            if state.lookahead:
+                await state.lookahead
+            music.guilds.discard(guild_id)
+        results[f"ingest.spotify_{'lazy' if lazy else 'eager'}"] = statistics.median(rates)
+    return results
+
+
+async def bench_import(music: Music, node: wavelink.Node, entries: list[QueueEntry], repeat: int) -> dict:
+    """Tracks per second from an !export file to the queue (player already playing)."""
+    data = queue_file.dump(entries)
+    rates = []
+    for run in range(repeat):
+        guild_id = 2000 + run
+        player = fake_player(guild_id, node)
+        await player.play(wavelink.Playable(make_track("ytsearch:already playing")))
+        ctx = StubContext(guild_id)
+        progress = resolver.ResolveProgress()
+        start = time.perf_counter()
+        await music.ingest_playlist(
+            ctx, player, "queue file", queue_file.stream_queue_file(data, progress), progress, StubMessage()
+        )
+        rates.append(len(entries) / (time.perf_counter() - start))
+        assert len(music.get_queue(guild_id)) == len(entries), ctx.replies[-1].content
+        music.guilds.discard(guild_id)
+    return {"ingest.import_file": statistics.median(rates)}
+
+
+# ─── Results ────────────────────────────────────────────────────────
+UNITS = {"ingest.": "tracks/s"}   # anything else is µs per operation (lower is better)
+
+
+def unit(name: str) -> str:
+    return next((u for prefix, u in UNITS.items() if name.startswith(prefix)), "us/op")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, previous: dict | None):
+    header = f"{'benchmark':<28}  {'value':>12}  {'unit':<8}"
+    print(header + ("  previous      change" if previous else ""))
+    for name, value in results.items():
+        line = f"{name:<28}  {value:>12.2f}  {unit(name):<8}"
+        old = previous.get(name) if previous else None
+        if old:
+            better = value / old if unit(name) == "tracks/s" else old / value
+            line += f"  {old:>12.2f}  {better:>5.2f}x {'faster' if better >= 1 else 'slower'}"
+        print(line)
+
+
+async def run(args) -> dict:
+    fake = FakeLavalink(port=args.port, latency=args.latency)
+    StubMessage.latency = args.discord_latency
+    await fake.start()
+    try:
+        (node,) = await connect_pool(fake)
+        bot = StubBot()
+        music = Music(bot)
+        embeds = PlayerEmbed(bot)
+        bot.cogs = {"Music": music, "PlayerEmbed": embeds}
+        player = fake_player(GUILD_ID, node)
+        await player.play(wavelink.Playable(make_track("ytsearch:now playing")))
+        embeds.guild_messages[GUILD_ID] = GuildMessages(GUILD_ID, StubContext(GUILD_ID))
+
+        entries = make_entries(args.queue)
+        results = {}
+        results.update(bench_queue(entries, args.repeat))
+        results.update(await bench_commands(music, entries, args.repeat))
+        results.update(bench_embeds(embeds, music, entries, args.repeat))
+        results.update(await bench_track_end(music, player, entries, args.events, args.repeat))
+        results.update(await bench_ingestion(music, node, args.playlist, args.spotify_latency, args.repeat))
+        results.update(await bench_import(music, node, entries[:args.import_tracks], args.repeat))
+        return results
+    finally:
+        await wavelink.Pool.close()
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", type=int, default=10_000, help="entries in the benchmarked queues")
+    parser.add_argument("--events", type=int, default=200, help="track end events per run")
+    parser.add_argument("--playlist", type=int, default=500, help="tracks in the Spotify playlist")
+    parser.add_argument("--spotify-latency", type=float, default=0.0, help="seconds of every fake Spotify request")
+    parser.add_argument("--import-tracks", type=int, default=2000, help="tracks in the !import file")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Lavalink search")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="seconds of every message edit")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the median is kept")
+    parser.add_argument("--port", type=int, default=2396)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+    print_results(results, previous)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parameters": {
+                name: getattr(args, name)
+                for name in ("queue", "events", "playlist", "spotify_latency", "import_tracks", "latency",
+                             "discord_latency", "repeat")
+            },
+            "units": {name: unit(name) for name in results},
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
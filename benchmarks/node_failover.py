@@ -0,0 +1,80 @@
+# benchmarks/node_failover.py
+"""
+Load-aware placement and failover of players (nodes.NodeBalancer) with two local fake Lavalink nodes:
+- node A reports a high CPU load, so new players should mostly land on node B
+- node B then crashes, and its players must move to node A at the same track position
+
+    python benchmarks/node_failover.py --players 40 --cpu-a 0.3
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import wavelink
+
+from fake_lavalink import FakeLavalink, connect_pool, fake_player, make_track
+import nodes
+
+
+async def run(players: int, cpu_a: float, port: int):
+    fake_a, fake_b = FakeLavalink(port=port, latency=0), FakeLavalink(port=port + 1, latency=0)
+    fake_a.stats["cpu"]["systemLoad"] = cpu_a
+    await fake_a.start()
+    await fake_b.start()
+    try:
+        node_a, node_b = await connect_pool(fake_a, fake_b)
+        balancer = nodes.get_balancer()
+        await balancer.refresh()
+        print(f"penalties: A={balancer.score(node_a):.1f}  B={balancer.score(node_b):.1f}")
+
+        # ─── Placement ────────────────────────────────────────────────
+        created = []
+        for guild_id in range(1, players + 1):
+            player = fake_player(guild_id, balancer.best_node())
+            await player.play(wavelink.Playable(make_track(f"song {guild_id}")))
+            created.append(player)
+        on_a, on_b = len(node_a.players), len(node_b.players)
+        print(f"{players} players placed: A={on_a}  B={on_b}")
+
+        # Every player is 42 s into its track, as reported by the node
+        for fake in (fake_a, fake_b):
+            for guild_id in fake.players:
+                fake.players[guild_id]["position"] = 42_000
+                await fake.broadcast({
+                    "op": "playerUpdate", "guildId": guild_id,
+                    "state": {"time": int(time.time() * 1000), "position": 42_000, "connected": True, "ping": 0},
+                })
+        await asyncio.sleep(0.1)
+
+        # ─── Failover ─────────────────────────────────────────────────
+        await fake_b.kill()
+        while node_b.status is wavelink.NodeStatus.CONNECTED:
+            await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        moved = await balancer.failover(node_b)
+        elapsed = time.perf_counter() - start
+
+        positions = [fake_a.players[str(p.guild.id)]["position"] for p in created]
+        assert len(node_a.players) == players and len(fake_a.players) == players, "some players were not moved"
+        assert all(42_000 <= position < 45_000 for position in positions), "track position was not kept"
+        print(f"node B crashed: {moved} player(s) moved to A in {elapsed * 1000:.0f} ms, positions kept")
+    finally:
+        await wavelink.Pool.close()
+        await fake_a.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=40)
+    parser.add_argument("--cpu-a", type=float, default=0.3, help="system load reported by node A (0-1)")
+    parser.add_argument("--port", type=int, default=2397)
+    args = parser.parse_args()
+    asyncio.run(run(args.players, args.cpu_a, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/resolve_throughput.py
+"""
+Throughput of the Spotify → YouTube resolution pipeline (resolver.resolve_ordered)
+against a local fake Lavalink node, at several concurrency limits.
+
+    python benchmarks/resolve_throughput.py --tracks 200 --latency 0.05 --concurrency 1 4 8 16
+
+With --distinct N, the playlist only has N different songs (each one several times in a row),
+so identical searches in flight at the same time are merged into one Lavalink load.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import wavelink
+
+from fake_lavalink import FakeLavalink, connect_pool
+import resolver
+import search_cache
+import spotify_index
+
+
+def fake_spotify_items(count: int, distinct: int | None = None) -> list[dict]:
+    # With fewer distinct songs, copies of a song follow each other (e.g. an album and its deluxe edition)
+    distinct = distinct or count
+    return [
+        {"name": f"Song {song}", "artists": [{"name": f"Artist {song % 37}"}], "id": f"sp{i}"}
+        for i, song in ((i, i * distinct // count) for i in range(count))
+    ]
+
+
+async def run(tracks: int, latency: float, levels: list[int], port: int, distinct: int | None = None):
+    fake = FakeLavalink(port=port, latency=latency)
+    await fake.start()
+    try:
+        await connect_pool(fake)
+        items = fake_spotify_items(tracks, distinct)
+        print(f"{tracks} tracks ({distinct or tracks} distinct), {latency * 1000:.0f} ms per Lavalink load")
+        print(f"{'concurrency':>11}  {'seconds':>8}  {'tracks/s':>9}  {'speed-up':>8}  {'loads':>6}")
+        baseline = None
+        for level in levels:
+            # Fresh, empty caches per run so every level really goes to Lavalink
+            search_cache._cache = search_cache.SearchCache(":memory:")
+            spotify_index._index = spotify_index.SpotifyIndex(":memory:")
+            progress = resolver.ResolveProgress(total=len(items))
+            loads = fake.load_requests
+            start = time.perf_counter()
+            names = [
+                track.title
+                async for _, track in resolver.resolve_ordered(
+                    items, resolver.resolve_spotify_track, concurrency=level, progress=progress
+                )
+            ]
+            elapsed = time.perf_counter() - start
+            assert names == [resolver.spotify_query(item) for item in items], "order was not preserved"
+            rate = tracks / elapsed
+            baseline = baseline or rate
+            print(f"{level:>11}  {elapsed:>8.2f}  {rate:>9.1f}  {rate / baseline:>7.1f}x  {fake.load_requests - loads:>6}")
+    finally:
+        await wavelink.Pool.close()
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--port", type=int, default=2399)
+    parser.add_argument("--distinct", type=int, help="number of different songs in the playlist (default: all)")
+    args = parser.parse_args()
+    asyncio.run(run(args.tracks, args.latency, args.concurrency, args.port, args.distinct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# cluster.py
+"""
+Run the bot as several processes, each one serving a group of shards, to use more than one CPU core:
+
+    python cluster.py                    # CLUSTERS processes, SHARD_COUNT shards (from config.py)
+    python cluster.py --clusters 4 --shards 16
+
+Every process is a normal `main.py` told which shards it owns through the environment
+(ANAKIN_SHARD_IDS, ANAKIN_SHARD_COUNT, ANAKIN_CLUSTER). A process that exits is restarted.
+With METRICS_PORT set, process i serves its metrics on METRICS_PORT + 1 + i and this launcher
+serves all of them on METRICS_PORT, each sample labelled with its cluster="i".
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import signal
+import sys
+
+import aiohttp
+from aiohttp import web
+
+import config
+
+logger = logging.getLogger("Anakin")
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+handler.setFormatter(logging.Formatter("[%(levelname)s] %(name)s[launcher]: %(message)s"))
+logger.addHandler(handler)
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+async def recommended_shards(token: str) -> int:
+    """Number of shards Discord recommends for the bot."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {token}"}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def shard_groups(shard_count: int, clusters: int) -> list[list[int]]:
+    """Split shards 0..shard_count-1 into `clusters` contiguous groups of (nearly) the same size."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    groups, start = [], 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+# ─── Processes ──────────────────────────────────────────────────────
+class Cluster:
+    """One bot process and the shards it serves."""
+
+    def __init__(self, index: int, shard_ids: list[int], shard_count: int, metrics_port: int | None):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.metrics_port = metrics_port
+        self.process: asyncio.subprocess.Process | None = None
+        self.stopping = False
+
+    def environment(self) -> dict:
+        env = dict(os.environ)
+        env["ANAKIN_CLUSTER"] = str(self.index)
+        env["ANAKIN_SHARD_IDS"] = ",".join(map(str, self.shard_ids))
+        env["ANAKIN_SHARD_COUNT"] = str(self.shard_count)
+        if self.metrics_port:
+            env["ANAKIN_METRICS_PORT"] = str(self.metrics_port)
+        return env
+
+    async def run(self):
+        """Keep the process running until stop(), restarting it (with a growing delay) when it exits."""
+        delay = 5
+        loop = asyncio.get_running_loop()
+        while not self.stopping:
+            # In its own session: a Ctrl+C in the terminal reaches the launcher only, which stops every process
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, MAIN, env=self.environment(), start_new_session=True
+            )
+            logger.info(f"🚀 Cluster {self.index} started (pid {self.process.pid}, shards {self.shard_ids}).")
+            started = loop.time()
+            code = await self.process.wait()
+            if self.stopping:
+                break
+            if loop.time() - started > 600:
+                delay = 5
+            logger.error(f"❌ Cluster {self.index} exited with code {code}, restarting in {delay}s.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 300)
+
+    async def stop(self):
+        self.stopping = True
+        if self.process and self.process.returncode is None:
+            # SIGINT, not SIGTERM: the bot shuts down cleanly and saves its state snapshot
+            self.process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(self.process.wait(), 30)
+            except asyncio.TimeoutError:
+                self.process.kill()
+
+
+# ─── Metrics ────────────────────────────────────────────────────────
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?( .*)$")
+
+
+def add_label(sample: str, label: str) -> str:
+    """Add `label` (e.g. 'cluster="0"') to one sample line of the Prometheus text format."""
+    match = _SAMPLE.match(sample)
+    if match is None:
+        return sample
+    name, labels, value = match.groups()
+    inner = labels[1:-1] if labels else ""
+    return f"{name}{{{label}{',' if inner else ''}{inner}}}{value}"
+
+
+def merge_metrics(texts: dict[int, str]) -> str:
+    """
+    Merge the /metrics pages of several processes into one: each family keeps a single HELP/TYPE header,
+    followed by the samples of every process labelled with its cluster.
+    """
+    families: dict[str, list[str]] = {}   # family name -> header lines + samples, in order of first appearance
+    for index, text in sorted(texts.items()):
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split()[2]
+                lines = families.setdefault(family, [])
+                if line not in lines:
+                    lines.append(line)
+            elif not line.startswith("#") and family is not None:
+                families[family].append(add_label(line, f'cluster="{index}"'))
+    return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+async def serve_metrics(clusters: list[Cluster], host: str, port: int) -> web.AppRunner:
+    session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+
+    async def fetch(cluster: Cluster) -> str | None:
+        try:
+            async with session.get(f"http://{host}:{cluster.metrics_port}/metrics") as response:
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None   # restarting: its samples are missing from this scrape
+
+    async def handle(request: web.Request):
+        texts = await asyncio.gather(*(fetch(cluster) for cluster in clusters))
+        merged = merge_metrics({cluster.index: text for cluster, text in zip(clusters, texts) if text is not None})
+        return web.Response(text=merged, content_type="text/plain", charset="utf-8")
+
+    async def close_session(app):
+        await session.close()
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    app.on_cleanup.append(close_session)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Metrics of every cluster available on http://{host}:{port}/metrics")
+    return runner
+
+
+# ─── Launcher ───────────────────────────────────────────────────────
+async def launch(clusters_wanted: int, shard_count: int | None):
+    if shard_count is None:
+        shard_count = await recommended_shards(config.TOKEN)
+        logger.info(f"🔢 Discord recommends {shard_count} shard(s).")
+
+    metrics_port = getattr(config, "METRICS_PORT", None)
+    metrics_host = getattr(config, "METRICS_HOST", "127.0.0.1")
+    clusters = [
+        Cluster(index, shard_ids, shard_count, metrics_port + 1 + index if metrics_port else None)
+        for index, shard_ids in enumerate(shard_groups(shard_count, clusters_wanted))
+    ]
+    runner = await serve_metrics(clusters, metrics_host, metrics_port) if metrics_port else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = [asyncio.create_task(cluster.run()) for cluster in clusters]
+    await stop.wait()
+    logger.info("🛑 Stopping every cluster…")
+    await asyncio.gather(*(cluster.stop() for cluster in clusters))
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if runner:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clusters", type=int, default=getattr(config, "CLUSTERS", None) or os.cpu_count() or 1,
+                        help="number of processes (default: CLUSTERS, or one per CPU core)")
+    parser.add_argument("--shards", type=int, default=getattr(config, "SHARD_COUNT", None),
+                        help="total number of shards (default: SHARD_COUNT, or what Discord recommends)")
+    args = parser.parse_args()
+    asyncio.run(launch(args.clusters, args.shards))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,3 +14,79 @@ SPOTIPY_CLIENT_SECRET = "CLIENT SECRET"
 
 # Channel where you want the player to be sent
 PLAYER_CHANNEL_ID = PLAYER CHANNEL ID
+
+# Threads used for Spotify API requests (they run off the event loop)
+SPOTIFY_MAX_WORKERS = 4
+
+# Maximum number of tracks searched on Lavalink at the same time while loading a playlist
+RESOLVE_CONCURRENCY = 8
+
+# Search cache: recent Lavalink results kept in memory and in a SQLite file (survives restarts)
+SEARCH_CACHE_PATH = "anakin_cache.db"
+SEARCH_CACHE_SIZE = 5000                # searches kept in memory (playlists are never cached)
+SEARCH_CACHE_TTL  = 7 * 24 * 3600       # seconds before a cached result is searched again
+
+# Typed titles (!play, !add) are first looked up in the library of tracks the bot has played (same file as the
+# search cache). A track must cover this share of its artist + title words to be used (None = always search).
+LIBRARY_MIN_COVERAGE = 0.75
+
+# Number of played tracks remembered per guild for !previous
+HISTORY_SIZE = 3
+
+# Seconds without any activity after which a guild's state (queue included) is freed
+GUILD_IDLE_TIMEOUT = 6 * 3600
+
+# Per-guild queue quotas (None = unlimited)
+MAX_QUEUE_LENGTH    = 10000         # tracks
+MAX_QUEUE_MEMORY_MB = 16            # approximate memory of the queued tracks
+
+# Queue snapshots: every guild's queue and playback are saved here and restored on restart
+SNAPSHOT_PATH     = "anakin_state.db"
+SNAPSHOT_INTERVAL = 60              # seconds between snapshots (0 = only on shutdown)
+
+# Lavalink nodes (empty = the single node set by LAVA_HOST / LAVA_PORT / LAVA_PASSWORD in main.py).
+# New players go to the least-loaded node; players of a node that drops are moved to another one.
+LAVALINK_NODES = [
+    # {"identifier": "main",   "uri": "http://127.0.0.1:2333", "password": "youshallnotpass"},
+    # {"identifier": "backup", "uri": "http://127.0.0.1:2334", "password": "youshallnotpass"},
+]
+NODE_STATS_INTERVAL = 30            # seconds between two polls of the nodes' load
+NODE_STATS_FAILURES = 3             # polls a node may miss in a row before its players are moved away
+
+# Seconds the bot stays in the voice channel with nothing playing (after !stop or the end of the queue),
+# so the next !play starts without reconnecting. None = !stop disconnects at once and a finished queue never does.
+IDLE_TIMEOUT = 300
+
+# Player channels of the other guilds (one channel ID per guild), in addition to PLAYER_CHANNEL_ID
+PLAYER_CHANNEL_IDS = []
+
+# Minimum seconds between two edits of the same player/queue embed (updates in between are merged)
+EMBED_EDIT_INTERVAL = 1.0
+
+# Recent messages of the player channel searched at startup for the player message of the previous run
+PLAYER_HISTORY_SCAN = 50
+
+# Spotify playlists are queued at once and each track is searched on YouTube only when it is about to play
+SPOTIFY_LAZY_PLAYLISTS = True
+LOOKAHEAD_TRACKS       = 5          # upcoming queue entries resolved in advance
+# Pages of 100 tracks fetched at the same time while a Spotify playlist loads
+SPOTIFY_PAGE_CONCURRENCY = 4
+
+# Largest file !import accepts (files written by !export take about 200 bytes per track)
+QUEUE_FILE_MAX_BYTES = 5_000_000
+
+# Prometheus metrics endpoint (http://METRICS_HOST:METRICS_PORT/metrics), see metrics.py.
+# Set METRICS_PORT = None to disable it.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# Log the code that blocks the event loop for longer than this many seconds (None = watchdog off).
+# A report of the worst offenders, with their stacks, is logged when the bot shuts down.
+WATCHDOG_THRESHOLD = None
+
+# Sharding, for bots in many guilds. SHARDING = True runs every shard in this one process;
+# `python cluster.py` runs CLUSTERS processes (None = one per CPU core), each serving its share of the shards.
+# SHARD_COUNT = None uses the number of shards Discord recommends.
+SHARDING    = False
+SHARD_COUNT = None
+CLUSTERS    = None
@@ -0,0 +1,105 @@
+# embed_scheduler.py
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Hashable
+
+import discord
+
+import metrics
+
+logger = logging.getLogger("Anakin")
+
+
+class EmbedScheduler:
+    """
+    Coalesces the edits of long-lived messages (the player and queue embeds) so they stay under
+    Discord's edit rate limits however fast the playback state changes.
+    - schedule(key, edit): `edit()` performs the edit from the state *at the time it runs*,
+      so only the latest request per key matters and the ones it replaces are dropped
+    - each key is edited at most once every `interval` seconds, with one edit in flight at a time;
+      the first edit after a quiet period waits `debounce` seconds to absorb bursts (skip = stop + play)
+    - mark_edited(key): the message was just edited another way (e.g. in an interaction response),
+      pending edits are superseded and the interval starts over, also for a worker already waiting
+    """
+
+    def __init__(self, interval: float = 1.0, debounce: float = 0.25):
+        self.interval = interval
+        self.debounce = debounce
+        self._pending: dict[Hashable, Callable[[], Awaitable]] = {}
+        self._workers: dict[Hashable, asyncio.Task] = {}
+        self._edited: dict[Hashable, float] = {}   # key -> monotonic time of its last edit, while it has a worker
+        self.requested = 0
+        self.edits = 0
+        self.superseded = 0
+        self.rate_limited = 0
+
+    def schedule(self, key: Hashable, edit: Callable[[], Awaitable]):
+        self.requested += 1
+        if key in self._pending:
+            self.superseded += 1
+            metrics.EMBED_EDITS_SUPERSEDED.inc()
+        self._pending[key] = edit
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key, self.debounce))
+
+    def mark_edited(self, key: Hashable):
+        self._edited[key] = time.monotonic()
+        if self._pending.pop(key, None) is not None:
+            self.superseded += 1
+            metrics.EMBED_EDITS_SUPERSEDED.inc()
+        worker = self._workers.get(key)
+        if worker is None:
+            self._workers[key] = asyncio.create_task(self._run(key, self.interval))
+
+    def cancel(self, key: Hashable):
+        """Forget a key, e.g. its message was deleted."""
+        self._pending.pop(key, None)
+        self._edited.pop(key, None)
+        worker = self._workers.pop(key, None)
+        if worker:
+            worker.cancel()
+
+    async def _run(self, key: Hashable, wait: float):
+        try:
+            while True:
+                await asyncio.sleep(wait)
+                # The message may have been edited another way meanwhile (mark_edited)
+                wait = self._edited.get(key, -math.inf) + self.interval - time.monotonic()
+                if wait > 0:
+                    continue
+                edit = self._pending.pop(key, None)
+                if edit is None:
+                    return
+                wait = self.interval
+                try:
+                    # Keys are (guild_id, "player" / "queue") in player.py
+                    with metrics.EMBED_EDIT_SECONDS.time(key[-1] if isinstance(key, tuple) else "message"):
+                        await edit()
+                    self.edits += 1
+                except discord.RateLimited as e:
+                    # Only raised if the client was told not to wait; retry unless a newer edit is queued.
+                    # The metric counts every 429, waited out or not (see metrics._RateLimitLog)
+                    self.rate_limited += 1
+                    self._pending.setdefault(key, edit)
+                    wait = max(wait, e.retry_after)
+                except discord.NotFound:
+                    self._pending.pop(key, None)
+                    return
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not update message {key}: {e}")
+                self._edited[key] = time.monotonic()
+        finally:
+            if self._workers.get(key) is asyncio.current_task():
+                del self._workers[key]
+                self._edited.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "requested": self.requested,
+            "edits": self.edits,
+            "superseded": self.superseded,
+            "rate_limited": self.rate_limited,
+            "pending": len(self._pending),
+        }
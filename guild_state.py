@@ -0,0 +1,165 @@
+# guild_state.py
+import time
+
+from track_queue import TrackQueue
+
+
+class HistoryRing:
+    """
+    Fixed-size ring buffer of the last played tracks (oldest first when iterated).
+    Appending to a full ring overwrites the oldest track; pop() returns the newest one.
+    """
+    __slots__ = ("_slots", "_start", "_size")
+
+    def __init__(self, maxlen: int):
+        self._slots = [None] * max(1, maxlen)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def maxlen(self) -> int:
+        return len(self._slots)
+
+    def append(self, track):
+        capacity = len(self._slots)
+        self._slots[(self._start + self._size) % capacity] = track
+        if self._size < capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % capacity
+
+    def pop(self):
+        if not self._size:
+            raise IndexError("pop from an empty history")
+        self._size -= 1
+        index = (self._start + self._size) % len(self._slots)
+        track, self._slots[index] = self._slots[index], None
+        return track
+
+    def clear(self):
+        self._slots = [None] * len(self._slots)
+        self._start = self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self):
+        capacity = len(self._slots)
+        return (self._slots[(self._start + i) % capacity] for i in range(self._size))
+
+
+class GuildState:
+    """
+    Everything the Music cog keeps for one guild:
+    - queue: TrackQueue of upcoming tracks (with the registry's per-guild quotas), created on first use:
+      most guilds never queue anything (peek_queue() and queued do not create it)
+    - history: HistoryRing of previously played tracks, for "previous"
+    - loading: a playlist is currently loading
+    - pending_shuffle: a shuffle was requested during playlist loading
+    - loop: None (no loop), -1 (infinite loop), or int ≥ 0 (remaining loops)
+    - stopped: playback was stopped by a user (!stop, Stop button) and nobody started it again since;
+      a playlist still loading then only fills the queue
+    - lookahead: task resolving the lazy entries at the front of the queue, if one is running
+    - last_active: monotonic time of the last access, used for idle eviction
+    - ended_at: perf_counter time the last track finished, until the next one starts
+    - transitions, dead_air: tracks started after the previous one finished, and the total silence between them
+    """
+    __slots__ = (
+        "guild_id", "_queue", "max_queue_length", "max_queue_bytes", "history",
+        "loading", "pending_shuffle", "loop", "stopped", "lookahead", "last_active",
+        "ended_at", "transitions", "dead_air"
+    )
+
+    def __init__(self, guild_id: int, history_size: int, max_queue_length: int | None = None,
+                 max_queue_bytes: int | None = None):
+        self.guild_id = guild_id
+        self._queue = None
+        self.max_queue_length = max_queue_length
+        self.max_queue_bytes = max_queue_bytes
+        self.history = HistoryRing(history_size)
+        self.loading = False
+        self.pending_shuffle = False
+        self.loop = None
+        self.stopped = False
+        self.lookahead = None
+        self.last_active = time.monotonic()
+        self.ended_at = None
+        self.transitions = 0
+        self.dead_air = 0.0
+
+    @property
+    def queue(self) -> TrackQueue:
+        if self._queue is None:
+            self._queue = TrackQueue(max_length=self.max_queue_length, max_bytes=self.max_queue_bytes)
+        return self._queue
+
+    def peek_queue(self) -> TrackQueue | None:
+        """The queue if it was ever used, else None."""
+        return self._queue
+
+    @property
+    def queued(self) -> int:
+        """Number of queued tracks."""
+        return len(self._queue) if self._queue is not None else 0
+
+    def __repr__(self) -> str:
+        return f"<GuildState guild_id={self.guild_id} queue={self.queued} loop={self.loop}>"
+
+
+class GuildRegistry:
+    """
+    Owns the GuildState of every guild.
+    States are created on first use by get(), dropped explicitly with discard()
+    (e.g. when the bot leaves a guild), and evict_idle() frees the ones nobody used for a while.
+    """
+
+    def __init__(self, history_size: int = 3, max_queue_length: int | None = None, max_queue_bytes: int | None = None):
+        self.history_size = history_size
+        self.max_queue_length = max_queue_length
+        self.max_queue_bytes = max_queue_bytes
+        self._states: dict[int, GuildState] = {}
+
+    def get(self, guild_id: int) -> GuildState:
+        """Return the state of a guild, creating it if needed, and mark the guild as active."""
+        state = self._states.get(guild_id)
+        if state is None:
+            state = self._states[guild_id] = GuildState(
+                guild_id, self.history_size, self.max_queue_length, self.max_queue_bytes
+            )
+        else:
+            state.last_active = time.monotonic()
+        return state
+
+    def peek(self, guild_id: int) -> GuildState | None:
+        """Return the state of a guild if it exists, without creating it or touching it."""
+        return self._states.get(guild_id)
+
+    def discard(self, guild_id: int) -> GuildState | None:
+        return self._states.pop(guild_id, None)
+
+    def evict_idle(self, max_idle: float, keep=None) -> list[int]:
+        """
+        Drop every state unused for more than `max_idle` seconds.
+        `keep(state)` can veto the eviction (e.g. the guild still has a connected player).
+        Returns the evicted guild IDs.
+        """
+        deadline = time.monotonic() - max_idle
+        evicted = [
+            guild_id for guild_id, state in self._states.items()
+            if state.last_active < deadline and not (keep and keep(state))
+        ]
+        for guild_id in evicted:
+            del self._states[guild_id]
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._states
+
+    def __iter__(self):
+        return iter(self._states.values())
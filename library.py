@@ -0,0 +1,216 @@
+# library.py
+import json
+import logging
+import re
+import sqlite3
+import time
+
+import wavelink
+
+import config
+import metrics
+import search_cache
+from storage import SQLiteStore
+
+logger = logging.getLogger("Anakin")
+
+# Words that say nothing about which song a title is
+NOISE_WORDS = frozenset((
+    "official", "video", "audio", "lyrics", "lyric", "music", "clip", "visualizer", "hd", "hq", "4k", "mv",
+    "ft", "feat", "remastered", "remaster", "version", "topic", "the", "a", "an", "and", "of",
+))
+MAX_ALIASES = 10        # queries remembered per track
+CANDIDATES = 50         # full-text matches scored per lookup
+
+
+def _words(text: str) -> list[str]:
+    return [word for word in re.findall(r"\w+", text.casefold()) if word not in NOISE_WORDS]
+
+
+def _core_words(title: str, author: str) -> set[str]:
+    """The words that identify a song: artist and title, without "(Official Video)", "[HD]", "ft. …" and the like."""
+    title = re.sub(r"\(.*?\)|\[.*?\]", " ", title)
+    title = re.split(r"\b(?:ft|feat)\b\.?", title, flags=re.IGNORECASE)[0]
+    return set(_words(f"{author.removesuffix(' - Topic')} {title}"))
+
+
+def _coverage(query: set[str], title: str, author: str, aliases: list[str]) -> float:
+    """
+    How confidently `query` (its words) designates this track, from 0 to 1:
+    1 if it has the same words as a query that found the track before, else the share of the track's
+    core words it names. 0 if it has a word the track does not (a different version: "live", "remix"…).
+    A query word also matches the words it starts, so "beatl" finds "beatles".
+    """
+    if any(query == set(_words(alias)) for alias in aliases):
+        return 1.0
+    known = set(_words(f"{author} {title}"))
+    if not all(any(word.startswith(q) for word in known) for q in query):
+        return 0.0
+    core = _core_words(title, author)
+    if not core:
+        return 0.0
+    return sum(1 for word in core if any(word.startswith(q) for q in query)) / len(core)
+
+
+class LibraryIndex(SQLiteStore):
+    """
+    Full-text index of every track the bot has played, so a typed title can be answered without a search:
+    "get lucky daft punk" finds "Daft Punk - Get Lucky (Official Audio)" played last week.
+    - library: one row per Lavalink track (by identifier) with its payload, play count
+      and the queries that found it (aliases)
+    - library_fts: SQLite FTS5 trigram index of titles, artists and aliases, used to find candidates;
+      each candidate is then scored (see _coverage) and only a confident match is returned,
+      the most played one first
+    Needs SQLite's trigram tokenizer (SQLite 3.34+); without it the index stays empty and every
+    lookup misses.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS library ("
+        " id INTEGER PRIMARY KEY,"
+        " identifier TEXT NOT NULL UNIQUE,"
+        " title TEXT NOT NULL,"
+        " author TEXT NOT NULL,"
+        " aliases TEXT NOT NULL,"
+        " plays INTEGER NOT NULL,"
+        " track TEXT NOT NULL,"
+        " updated REAL NOT NULL)",
+    )
+
+    def __init__(self, path: str, min_coverage: float | None = 0.75):
+        super().__init__(path)
+        self.min_coverage = min_coverage
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(text, tokenize='trigram')")
+            self.available = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ Track library disabled, SQLite has no FTS5 trigram tokenizer: {e}")
+            self.available = False
+        self.size = self._db.execute("SELECT COUNT(*) FROM library").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    # ─── Runs in the store thread ─────────────────────────────────────
+    def _find(self, words: list[str]):
+        terms = [word for word in words if len(word) >= 3]   # trigrams: shorter words are only checked when scoring
+        if not terms:
+            return None
+        match = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        rows = self._db.execute(
+            "SELECT l.id, l.title, l.author, l.aliases, l.plays FROM library_fts"
+            " JOIN library l ON l.id = library_fts.rowid"
+            " WHERE library_fts MATCH ? ORDER BY l.plays DESC LIMIT ?",
+            (match, CANDIDATES)
+        ).fetchall()
+
+        query = set(words)
+        best, best_key = None, None
+        for row_id, title, author, aliases, plays in rows:
+            coverage = _coverage(query, title, author, json.loads(aliases))
+            if coverage >= self.min_coverage and (best_key is None or (coverage, plays) > best_key):
+                best, best_key = row_id, (coverage, plays)
+        if best is None:
+            return None
+        return json.loads(self._db.execute("SELECT track FROM library WHERE id = ?", (best,)).fetchone()[0])
+
+    def _add(self, track: dict, alias: str | None, plays: int) -> bool:
+        info = track["info"]
+        row = self._db.execute(
+            "SELECT id, aliases FROM library WHERE identifier = ?", (info["identifier"],)
+        ).fetchone()
+        aliases = json.loads(row[1]) if row else []
+        if alias and alias not in aliases:
+            aliases = [alias] + aliases[:MAX_ALIASES - 1]
+        elif row and not plays:
+            return False   # nothing new
+        with self._db:
+            self._db.execute(
+                "INSERT INTO library (identifier, title, author, aliases, plays, track, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (identifier) DO UPDATE SET"
+                " title = excluded.title, author = excluded.author, aliases = excluded.aliases,"
+                " plays = plays + excluded.plays, track = excluded.track, updated = excluded.updated",
+                (info["identifier"], info["title"], info["author"], json.dumps(aliases), plays,
+                 json.dumps(track, separators=(",", ":")), time.time())
+            )
+            row_id = row[0] if row else self._db.execute(
+                "SELECT id FROM library WHERE identifier = ?", (info["identifier"],)
+            ).fetchone()[0]
+            self._db.execute("DELETE FROM library_fts WHERE rowid = ?", (row_id,))
+            self._db.execute(
+                "INSERT INTO library_fts (rowid, text) VALUES (?, ?)",
+                (row_id, " ".join([info["author"], info["title"]] + aliases))
+            )
+        return row is None
+
+    def _invalidate(self, identifier: str) -> int:
+        row = self._db.execute("SELECT id FROM library WHERE identifier = ?", (identifier,)).fetchone()
+        if row is None:
+            return 0
+        with self._db:
+            self._db.execute("DELETE FROM library WHERE id = ?", row)
+            self._db.execute("DELETE FROM library_fts WHERE rowid = ?", row)
+        return 1
+
+    # ─── Event loop side ──────────────────────────────────────────────
+    async def find(self, query: str) -> wavelink.Playable | None:
+        """The track a typed title confidently designates, or None (URLs always miss)."""
+        if not self.available or self.min_coverage is None or search_cache.url_host(query.strip()):
+            return None
+        words = _words(query)
+        data = await self.run(self._find, words) if words else None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return wavelink.Playable(data)
+
+    async def add(self, track, query: str | None = None, played: bool = False):
+        """
+        Index a wavelink.Playable: with `query`, the title it was found with by a search;
+        with `played`, count one more play of it.
+        """
+        data = track.raw_data
+        if not self.available or not data.get("info", {}).get("identifier"):
+            return
+        alias = " ".join(_words(query)) if query and not search_cache.url_host(query.strip()) else None
+        if await self.run(self._add, data, alias, 1 if played else 0):
+            self.size += 1
+
+    async def invalidate(self, identifier: str):
+        """Forget the track `identifier` (e.g. it failed to play)."""
+        if self.available:
+            self.size -= await self.run(self._invalidate, identifier)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "tracks": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_library: LibraryIndex | None = None
+
+
+def get_library() -> LibraryIndex:
+    """Return the process-wide track library, creating it on first use."""
+    global _library
+    if _library is None:
+        _library = LibraryIndex(
+            getattr(config, "SEARCH_CACHE_PATH", "anakin_cache.db"),
+            min_coverage=getattr(config, "LIBRARY_MIN_COVERAGE", 0.75)
+        )
+        logger.info(f"📚 Track library: {_library.size} track(s).")
+    return _library
+
+
+def _lookup_counts() -> dict:
+    library = get_library()
+    return {("hit",): library.hits, ("miss",): library.misses}
+
+
+metrics.LIBRARY.collect = _lookup_counts
+metrics.LIBRARY_TRACKS.collect = lambda: {(): get_library().size}
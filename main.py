@@ -1,25 +1,49 @@
 #!/usr/bin/env python3
+import asyncio
+import collections
+import io
 import logging
-import random
+import os
 import re
+import time
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import wavelink
 
 import config      # contains TOKEN (str), PREFIX (str or tuple), FFMPEG_PATH (not used here), Spotify credentials
 import playlist    # separate module `playlist.py` in the same folder
-
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import spotify     # shared async Spotify client (`spotify.py`)
+import resolver    # concurrent track resolution (`resolver.py`)
+import search_cache
+import spotify_index
+import snapshot
+import library       # local index of played tracks (`library.py`)
+import metrics       # Prometheus metrics (`metrics.py`)
+import watchdog      # event loop stall detection (`watchdog.py`)
+import nodes         # Lavalink node selection and failover (`nodes.py`)
+import queue_file    # !export / !import files (`queue_file.py`)
+from guild_state import GuildRegistry, GuildState, HistoryRing
+from snapshot import SnapshotStore
+from track_queue import QueueEntry, QueueFull, TrackQueue
 
 # Load player extension
 initial_extensions = ["player"]
 
+# ─── Sharding ───────────────────────────────────────────────────────
+# cluster.py starts one process per group of shards and tells it which ones through the environment.
+# Otherwise SHARDING = True in config.py runs every shard in this single process.
+SHARD_IDS = [int(i) for i in os.environ["ANAKIN_SHARD_IDS"].split(",")] if os.environ.get("ANAKIN_SHARD_IDS") else None
+SHARD_COUNT = int(os.environ.get("ANAKIN_SHARD_COUNT") or 0) or getattr(config, "SHARD_COUNT", None)
+CLUSTER = os.environ.get("ANAKIN_CLUSTER")
+SHARDED = SHARD_IDS is not None or getattr(config, "SHARDING", False)
+
 # ─── Logging ────────────────────────────────────────────────────────
 logger = logging.getLogger("Anakin")
 logger.setLevel(logging.INFO)
 handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("[%(levelname)s] %(name)s: %(message)s"))
+handler.setFormatter(logging.Formatter(
+    f"[%(levelname)s] %(name)s[cluster {CLUSTER}]: %(message)s" if CLUSTER else "[%(levelname)s] %(name)s: %(message)s"
+))
 logger.addHandler(handler)
 
 # ─── Lavalink Node Settings ────────────────────────────────────────
@@ -27,26 +51,65 @@ LAVA_HOST     = "127.0.0.1"
 LAVA_PORT     = 2333
 LAVA_PASSWORD = "youshallnotpass"
 
+# Seconds between two edits of the playlist progress message (Discord allows about 5 edits per 5 s per
+# channel, which the player and queue embeds need too)
+PROGRESS_INTERVAL = 5.0
+
 # ─── Bot & Intents ──────────────────────────────────────────────────
 intents = discord.Intents.default()
 intents.message_content = True
 
-class MusicBot(commands.Bot):
+class MusicBot(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
+        sharding = {"shard_ids": SHARD_IDS, "shard_count": SHARD_COUNT} if SHARDED else {}
         super().__init__(
             command_prefix=config.PREFIX,
             intents=intents,
-            help_command=None  # disable Discord's default help command
+            help_command=None,  # disable Discord's default help command
+            **sharding
         )
+        self.started = time.perf_counter()   # for the time-to-ready logs
+        self.metrics_runner = None
+        metrics.GUILDS.collect = lambda: collections.Counter((str(guild.shard_id),) for guild in self.guilds)
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """
+        Whether this process serves the guild. Always true, except under cluster.py
+        where each process only receives the guilds of its own shards.
+        """
+        if not SHARD_IDS:
+            return True
+        return (guild_id >> 22) % self.shard_count in SHARD_IDS
 
     async def setup_hook(self):
-        # ─── Connect to the Lavalink node ───────────────────────────────
-        node = wavelink.Node(
-            uri=f"http://{LAVA_HOST}:{LAVA_PORT}",
-            password=LAVA_PASSWORD
+        # ─── Connect to the Lavalink nodes ──────────────────────────────
+        node_specs = getattr(config, "LAVALINK_NODES", None) or [
+            {"identifier": "main", "uri": f"http://{LAVA_HOST}:{LAVA_PORT}", "password": LAVA_PASSWORD}
+        ]
+        # Players that play nothing for IDLE_TIMEOUT seconds get wavelink's on_wavelink_inactive_player event
+        idle_timeout = getattr(config, "IDLE_TIMEOUT", None)
+        await wavelink.Pool.connect(
+            nodes=[wavelink.Node(**{"inactive_player_timeout": idle_timeout, **spec}) for spec in node_specs],
+            client=self
         )
-        await wavelink.Pool.connect(nodes=[node], client=self)
-        logger.info("🔗 Lavalink node connected.")
+        logger.info(f"🔗 {len(node_specs)} Lavalink node(s) connected.")
+
+        # ─── Metrics endpoint (see metrics.py) ─────────────────────────
+        # Under cluster.py, every process has its own port (the launcher merges them)
+        metrics_port = int(os.environ.get("ANAKIN_METRICS_PORT") or 0) or getattr(config, "METRICS_PORT", None)
+        if metrics_port:
+            try:
+                self.metrics_runner = await metrics.start_server(
+                    getattr(config, "METRICS_HOST", "127.0.0.1"), metrics_port
+                )
+            except OSError as e:
+                logger.error(f"❌ Could not start the metrics endpoint: {e}")
+            self.loop.create_task(metrics.monitor_loop_lag())
+
+        # ─── Event loop watchdog (see watchdog.py) ─────────────────────
+        threshold = getattr(config, "WATCHDOG_THRESHOLD", None)
+        if threshold:
+            watchdog.start(threshold)
 
         # ─── Load the main Music cog ───────────────────────────────────
         await self.add_cog(Music(self))
@@ -59,55 +122,134 @@ class MusicBot(commands.Bot):
             except Exception as e:
                 logger.error(f"❌ Error while loading extension '{ext}': {e}")
 
+    async def close(self):
+        # ─── Final snapshot before the voice connections go away ────────
+        music_cog = self.get_cog("Music")
+        if music_cog:
+            try:
+                saved = await music_cog.snapshots.save(music_cog.guilds, nodes.get_player)
+                logger.info(f"💾 Saved state of {saved} guild(s).")
+            except Exception as e:
+                logger.error(f"❌ Could not save state snapshot: {e}")
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        loop_watchdog = watchdog.get_watchdog()
+        if loop_watchdog:
+            loop_watchdog.stop()
+            logger.info(loop_watchdog.report(stacks=True))
+        await super().close()
+
 bot = MusicBot()
 
+def _lookahead_window(queue: TrackQueue, size: int, tried) -> list:
+    """
+    The lazy entries the look-ahead should resolve among the next `size` entries of `queue`
+    (leaving out those in `tried`, a set of ids). Entries already known to be unplayable do not
+    count towards `size`: the one after them is the track that will really play next.
+    """
+    window, counted = [], 0
+    for entry in queue:
+        if entry.resolved and not entry.playable:
+            continue
+        if not entry.resolved and id(entry) not in tried:
+            window.append(entry)
+        counted += 1
+        if counted == size:
+            break
+    return window
+
+
+async def _edit_status(message: discord.Message, content: str):
+    """Progress edit run in the background: a failure is only logged."""
+    try:
+        await message.edit(content=content)
+    except discord.HTTPException as e:
+        logger.warning(f"⚠️ Could not update progress message: {e}")
+
+
 class Music(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Dictionaries per guild:
-        # - queues[guild_id] = list of Tracks in the queue
-        # - history[guild_id] = list of previously played Tracks (max length 3) for "previous"
-        # - skip_flags[guild_id] = bool, indicates a manual skip occurred
-        # - loading[guild_id] = bool, indicates a playlist is currently loading
-        # - pending_shuffle[guild_id] = bool, indicates a shuffle was requested during playlist loading
-        # - loops[guild_id] = None (no loop), -1 (infinite loop), or int ≥ 0 (remaining loops)
-        self.queues = {}
-        self.history = {}
-        self.skip_flags = {}
-        self.loading = {}
-        self.pending_shuffle = {}
-        self.loops = {}
-
-        # Shared Spotify client (if needed elsewhere)
-        self.spotify_client = SpotifyClientCredentials(
-            client_id=config.SPOTIPY_CLIENT_ID,
-            client_secret=config.SPOTIPY_CLIENT_SECRET
+        # Per-guild state (queue, history, flags, loop counter), see guild_state.py
+        max_queue_mb = getattr(config, "MAX_QUEUE_MEMORY_MB", None)
+        self.guilds = GuildRegistry(
+            history_size=getattr(config, "HISTORY_SIZE", 3),
+            max_queue_length=getattr(config, "MAX_QUEUE_LENGTH", None),
+            max_queue_bytes=int(max_queue_mb * 1024 * 1024) if max_queue_mb else None
         )
-        self.sp = spotipy.Spotify(auth_manager=self.spotify_client)
-
-    def get_queue(self, guild_id: int):
-        return self.queues.setdefault(guild_id, [])
 
-    def get_history(self, guild_id: int):
-        return self.history.setdefault(guild_id, [])
-
-    def set_skip_flag(self, guild_id: int, value: bool):
-        self.skip_flags[guild_id] = value
-
-    def get_skip_flag(self, guild_id: int):
-        return self.skip_flags.get(guild_id, False)
+        # Shared async Spotify client (same instance as playlist.py), None if spotipy is missing
+        self.sp = spotify.get_client()
+
+        # Durable snapshots of the per-guild state, restored once at startup (see snapshot.py)
+        self.snapshots = SnapshotStore(getattr(config, "SNAPSHOT_PATH", "anakin_state.db"))
+        self._restore_task = None
+
+        metrics.QUEUED_TRACKS.collect = lambda: {(): sum(state.queued for state in self.guilds)}
+        metrics.LONGEST_QUEUE.collect = lambda: {(): max((state.queued for state in self.guilds), default=0)}
+        metrics.GUILD_STATES.collect = lambda: {(): len(self.guilds)}
+        metrics.PLAYERS.collect = lambda: {
+            (node.identifier,): len(node.players) for node in wavelink.Pool.nodes.values()
+        }
+        metrics.TRACK_TRANSITIONS.collect = lambda: {
+            (state.guild_id,): state.transitions for state in self.guilds if state.transitions
+        }
+        metrics.DEAD_AIR.collect = lambda: {
+            (state.guild_id,): state.dead_air for state in self.guilds if state.transitions
+        }
+
+    async def cog_load(self):
+        self.evict_idle_guilds.start()
+        self.poll_node_stats.change_interval(seconds=getattr(config, "NODE_STATS_INTERVAL", 30))
+        self.poll_node_stats.start()
+        interval = getattr(config, "SNAPSHOT_INTERVAL", 60)
+        if interval:
+            self.save_snapshots.change_interval(seconds=interval)
+            self.save_snapshots.start()
+        self._restore_task = asyncio.create_task(self.restore_snapshots())
+
+    async def cog_unload(self):
+        self.evict_idle_guilds.cancel()
+        self.poll_node_stats.cancel()
+        self.save_snapshots.cancel()
+        if self._restore_task:
+            self._restore_task.cancel()
+
+    async def cog_before_invoke(self, ctx: commands.Context):
+        ctx.started = time.perf_counter()
+        watchdog.set_activity(f"!{ctx.command.qualified_name} in guild {ctx.guild.id if ctx.guild else None}")
+
+    async def cog_after_invoke(self, ctx: commands.Context):
+        metrics.COMMAND_SECONDS.observe(time.perf_counter() - ctx.started, ctx.command.qualified_name)
+
+    def get_state(self, guild_id: int) -> GuildState:
+        return self.guilds.get(guild_id)
+
+    def get_queue(self, guild_id: int) -> TrackQueue:
+        return self.guilds.get(guild_id).queue
+
+    def get_history(self, guild_id: int) -> HistoryRing:
+        return self.guilds.get(guild_id).history
 
     def set_loading(self, guild_id: int, value: bool):
-        self.loading[guild_id] = value
+        self.guilds.get(guild_id).loading = value
 
     def get_loading(self, guild_id: int):
-        return self.loading.get(guild_id, False)
+        state = self.guilds.peek(guild_id)
+        return state.loading if state else False
 
     def set_pending_shuffle(self, guild_id: int, value: bool):
-        self.pending_shuffle[guild_id] = value
+        self.guilds.get(guild_id).pending_shuffle = value
 
     def get_pending_shuffle(self, guild_id: int):
-        return self.pending_shuffle.get(guild_id, False)
+        state = self.guilds.peek(guild_id)
+        return state.pending_shuffle if state else False
+
+    def clear_stopped(self, guild_id: int):
+        """A user asked for music again: a loading playlist may start the next track (see stop_player)."""
+        state = self.guilds.peek(guild_id)
+        if state:
+            state.stopped = False
 
     def set_loop(self, guild_id: int, count):
         """
@@ -115,15 +257,177 @@ class Music(commands.Cog):
         count = int ≥ 0 => number of loops remaining
         count = None => no loop
         """
-        if count is None:
-            # Remove any existing loop state
-            if guild_id in self.loops:
-                del self.loops[guild_id]
-        else:
-            self.loops[guild_id] = count
+        self.guilds.get(guild_id).loop = count
 
     def get_loop(self, guild_id: int):
-        return self.loops.get(guild_id, None)
+        state = self.guilds.peek(guild_id)
+        return state.loop if state else None
+
+    async def start_track(self, player: wavelink.Player, track, **kwargs):
+        """
+        Play a wavelink.Playable, or a QueueEntry taken from a queue, on `player`.
+        wavelink's own queue history is not used (the cog keeps a bounded one), so it is skipped.
+        A lazy entry is resolved first; if it cannot be found, the next entries of the guild's queue
+        are tried instead. Returns None if nothing could be played.
+        """
+        if isinstance(track, QueueEntry):
+            queue = self.get_queue(player.guild.id)
+            while not await resolver.resolve_entry(track):
+                logger.warning(f"⚠️ Skipping unplayable queue entry: {track.title}")
+                if not queue:
+                    return None
+                track = queue.popleft()
+            track = track.to_playable()
+        result = await player.play(track, add_history=False, **kwargs)
+        self.schedule_lookahead(player.guild.id)
+        return result
+
+    def schedule_lookahead(self, guild_id: int):
+        """
+        Resolve the lazy entries among the next LOOKAHEAD_TRACKS of the queue in the background,
+        so the track that plays when the current one ends is ready and nothing is searched in between.
+        """
+        state = self.guilds.peek(guild_id)
+        if state is None or not state.queued or (state.lookahead and not state.lookahead.done()):
+            return
+        size = max(1, getattr(config, "LOOKAHEAD_TRACKS", 5))
+        if _lookahead_window(state.queue, size, ()):
+            state.lookahead = asyncio.create_task(self._lookahead(state, size))
+
+    async def _lookahead(self, state: GuildState, size: int):
+        # The queue can change while this runs (shuffle, remove, playback): look again until the front is resolved
+        tried = set()
+        while True:
+            window = _lookahead_window(state.queue, size, tried)
+            if not window:
+                return
+            tried.update(id(entry) for entry in window)
+            async for _ in resolver.resolve_ordered(window, resolver.resolve_entry):
+                pass
+
+    @tasks.loop(minutes=5)
+    async def evict_idle_guilds(self):
+        """Free the state of guilds that have not used the bot for GUILD_IDLE_TIMEOUT seconds."""
+        max_idle = getattr(config, "GUILD_IDLE_TIMEOUT", 6 * 3600)
+        evicted = self.guilds.evict_idle(
+            max_idle,
+            keep=lambda state: state.loading or nodes.get_player(state.guild_id) is not None
+        )
+        if evicted:
+            await self.snapshots.delete(evicted)
+            logger.info(f"🧹 Evicted idle state of {len(evicted)} guild(s), {len(self.guilds)} remaining.")
+
+    @evict_idle_guilds.before_loop
+    async def before_evict_idle_guilds(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=30)
+    async def poll_node_stats(self):
+        """Refresh the load of every Lavalink node, used to place new players (interval: NODE_STATS_INTERVAL)."""
+        await nodes.get_balancer().refresh()
+
+    @poll_node_stats.before_loop
+    async def before_poll_node_stats(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=60)
+    async def save_snapshots(self):
+        """Periodically write every guild's queue and playback state to disk (interval: SNAPSHOT_INTERVAL)."""
+        await self.snapshots.save(self.guilds, nodes.get_player)
+
+    @save_snapshots.before_loop
+    async def before_save_snapshots(self):
+        # Don't overwrite the previous run's snapshot before it has been restored
+        await self.bot.wait_until_ready()
+        if self._restore_task:
+            await asyncio.wait([self._restore_task])
+
+    async def restore_snapshots(self):
+        """
+        Warm restart: rebuild queues, history and loop state from the last snapshot,
+        then rejoin voice and resume the track that was playing at its saved position.
+        Tracks come back from their encoded form, so no search is sent to Lavalink.
+        """
+        await self.bot.wait_until_ready()
+        while not nodes.get_balancer().connected_nodes():
+            await asyncio.sleep(0.5)
+
+        saved = await self.snapshots.load()
+        restored = resumed = 0
+        gone = []
+        for guild_id, data in saved.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                # Guilds of the other processes of a cluster are not gone: their process restores them
+                if self.bot.owns_guild(guild_id):
+                    gone.append(guild_id)
+                continue
+
+            state = self.guilds.get(guild_id)
+            for packed in data.get("queue", []):
+                try:
+                    state.queue.append(snapshot.unpack(packed))
+                except QueueFull:
+                    break
+            self.snapshots.mark_saved(guild_id, state.queue.version)
+            for packed in data.get("history", []):
+                state.history.append(snapshot.unpack(packed))
+            state.loop = data.get("loop")
+            restored += 1
+
+            channel = guild.get_channel(data["channel_id"]) if data.get("channel_id") else None
+            if channel is None or not data.get("current"):
+                continue
+            try:
+                player = await nodes.connect_player(channel)
+                await self.start_track(
+                    player, snapshot.unpack(data["current"]),
+                    start=data.get("position", 0), paused=data.get("paused", False)
+                )
+                resumed += 1
+            except Exception as e:
+                logger.error(f"❌ Could not resume playback in guild {guild_id}: {e}")
+
+        if gone:
+            await self.snapshots.delete(gone)
+        if saved:
+            logger.info(f"♻️ Restored {restored} guild(s) from snapshot, resumed playback in {resumed}.")
+
+    async def stop_player(self, player: wavelink.Player) -> bool:
+        """
+        Stop playback, for !stop and the Stop button. With IDLE_TIMEOUT set, the voice session and the
+        Lavalink player are kept warm so the next !play or !music starts at once instead of reconnecting;
+        on_wavelink_inactive_player disconnects them if nothing plays within IDLE_TIMEOUT seconds.
+        Otherwise the bot disconnects right away. Returns True if the player stays connected.
+        Until a user starts music again, a playlist that is still loading only fills the queue.
+        """
+        self.get_state(player.guild.id).stopped = True
+        if player.playing:
+            await player.stop()
+        if not player.connected:
+            return False
+        idle_timeout = getattr(config, "IDLE_TIMEOUT", None)
+        if not idle_timeout:
+            await player.disconnect()
+            return False
+        if player.paused:
+            # Otherwise the next track would start paused
+            await player.pause(False)
+        player.inactive_timeout = idle_timeout   # (re)starts wavelink's countdown
+        return True
+
+    async def search_title(self, query: str):
+        """
+        First track for a title or URL typed by a user (!play, !add): the track library's confident match
+        if there is one, else a search (through the search cache), which the library then remembers.
+        """
+        index = library.get_library()
+        track = await index.find(query)
+        if track is None:
+            track = await resolver.search_first(query)
+            if track is not None:
+                await index.add(track, query=query)
+        return track
 
     async def skip_track(self, guild_id: int):
         """
@@ -131,12 +435,13 @@ class Music(commands.Cog):
         Returns True if a new track has started; False if the queue is empty and playback stops.
         Also clears any active loop for this guild.
         """
+        state = self.guilds.get(guild_id)
         # Clear the loop on manual skip
-        self.set_loop(guild_id, None)
+        state.loop = None
+        state.stopped = False
 
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
-        queue = self.get_queue(guild_id)
+        player = nodes.get_player(guild_id)
+        queue = state.queue
         current = player.current if player and player.current else None
 
         # Case A: queue is empty and nothing is playing => stop the player
@@ -145,29 +450,21 @@ class Music(commands.Cog):
 
         # Case B: queue is empty but a track is playing => stop it
         if not queue and current:
-            hist = self.get_history(guild_id)
-            hist.append(current)
-            if len(hist) > 3:
-                hist.pop(0)
-
-            self.set_skip_flag(guild_id, True)
+            state.history.append(current)
             await player.stop()
             return False
 
-        # Case C: queue contains at least one track
-        if queue:
+        # Case C: queue contains at least one track, which replaces the current one
+        # in a single request (no stop first, which would add a round trip of silence)
+        if current:
+            state.history.append(current)
+
+        next_track = queue.popleft()
+        if await self.start_track(player, next_track) is None:
             if current:
-                hist = self.get_history(guild_id)
-                hist.append(current)
-                if len(hist) > 3:
-                    hist.pop(0)
-
-            next_track = queue.pop(0)
-            self.set_skip_flag(guild_id, True)
-            if player and player.playing:
                 await player.stop()
-            await player.play(next_track)
-            return True
+            return False
+        return True
 
     @commands.command(name="play")
     async def play(self, ctx: commands.Context, *, query: str):
@@ -193,13 +490,13 @@ class Music(commands.Cog):
             # Remove the -loop option from the search query
             query = re.sub(r"-loop(?:\s+\d+)?", "", query).strip()
 
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        self.clear_stopped(guild_id)
+        player = nodes.get_player(guild_id)
 
         if player is None:
             if not ctx.author.voice or not ctx.author.voice.channel:
                 return await ctx.reply("❌ You must be in a voice channel.")
-            player = await ctx.author.voice.channel.connect(cls=wavelink.Player)
+            player = await nodes.connect_player(ctx.author.voice.channel)
 
         track: wavelink.Track = None
 
@@ -210,10 +507,9 @@ class Music(commands.Cog):
         )
         if yt_match:
             url = yt_match.group(0)
-            tracks = await wavelink.Playable.search(url)
-            if not tracks:
+            track = await resolver.search_first(url)
+            if not track:
                 return await ctx.reply("❌ Could not load the YouTube track.")
-            track = tracks[0]
         else:
             # 2) Check for a Spotify track link
             sp_match = re.search(
@@ -222,32 +518,38 @@ class Music(commands.Cog):
             )
             if sp_match:
                 spotify_id = sp_match.group(1)
-                try:
-                    sp_data = self.sp.track(spotify_id)
-                except Exception:
-                    return await ctx.reply("❌ Could not retrieve Spotify track info.")
-                name = sp_data.get("name", "")
-                artists = ", ".join(artist["name"] for artist in sp_data.get("artists", []))
-                search_query = f"{name} {artists}"
-                yt_results = await wavelink.Playable.search(search_query)
-                if not yt_results:
-                    return await ctx.reply(f"❌ Could not find a YouTube video for: **{name}**.")
-                track = yt_results[0]
+                # Already resolved once: no Spotify or Lavalink request needed
+                known = await spotify_index.get_index().get(spotify_id)
+                if known is not None:
+                    track = wavelink.Playable(known)
+                else:
+                    if self.sp is None:
+                        return await ctx.reply("❌ Spotipy is not available; cannot load Spotify tracks.")
+                    try:
+                        sp_data = await self.sp.track(spotify_id)
+                    except Exception:
+                        return await ctx.reply("❌ Could not retrieve Spotify track info.")
+                    name = sp_data.get("name", "")
+                    track = await resolver.resolve_spotify_track(sp_data)
+                    if not track:
+                        return await ctx.reply(f"❌ Could not find a YouTube video for: **{name}**.")
             else:
-                # 3) Standard search by title on YouTube
-                tracks = await wavelink.Playable.search(query)
-                if not tracks:
+                # 3) Standard search by title: the track library, else YouTube
+                track = await self.search_title(query)
+                if not track:
                     return await ctx.reply("❌ No results found.")
-                track = tracks[0]
 
         if player.playing:
             # Add to the queue without loop
             queue = self.get_queue(guild_id)
-            queue.append(track)
+            try:
+                queue.append(track)
+            except QueueFull as e:
+                return await ctx.reply(f"❌ Could not add **{track.title}**: {e}.")
             return await ctx.reply(f"➕ **{track.title}** added to the queue")
 
         # Play immediately
-        await player.play(track)
+        await self.start_track(player, track)
 
         # Set up looping if requested
         if loop_match:
@@ -264,31 +566,34 @@ class Music(commands.Cog):
     @commands.command(name="stop")
     async def stop(self, ctx: commands.Context):
         """
-        Stop playback and disconnect the bot, without clearing the queue.
+        Stop playback without clearing the queue. The bot disconnects, right away
+        or after IDLE_TIMEOUT seconds without music (see stop_player).
         """
         guild_id = ctx.guild.id
         # Clear any active loop
         self.set_loop(guild_id, None)
 
-        player = wavelink.Pool.get_node().get_player(guild_id)
+        player = nodes.get_player(guild_id)
         if not player:
             return await ctx.reply("❌ No active player.")
-        if player.playing:
-            await player.stop()
-        if player.connected:
-            await player.disconnect()
+        if await self.stop_player(player):
+            minutes = max(1, round(player.inactive_timeout / 60))
+            return await ctx.reply(
+                f"🛑 Playback stopped. Queue remains in memory; "
+                f"the bot leaves the voice channel after {minutes} min without music."
+            )
         await ctx.reply("🛑 Bot disconnected. Queue remains in memory.")
 
     @commands.command(name="music")
     async def music(self, ctx: commands.Context):
         """
         Resume playback if the bot was stopped, or unpause if music is paused.
-        If the bot is disconnected but there are tracks in the queue,
-        reconnect and play the next track.
+        If nothing is playing but there are tracks in the queue, play the next track
+        (reconnecting first if the bot is no longer in a voice channel).
         """
         guild_id = ctx.guild.id
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        self.clear_stopped(guild_id)
+        player = nodes.get_player(guild_id)
 
         # If the player exists and is paused, unpause
         if player and player.paused:
@@ -300,13 +605,18 @@ class Music(commands.Cog):
             return await ctx.reply("❌ You must be in a voice channel to resume music.")
         voice_channel = ctx.author.voice.channel
 
-        if player is None or not player.connected:
-            player = await voice_channel.connect(cls=wavelink.Player)
+        # A player kept warm after !stop is still connected: no voice handshake needed
+        reconnected = player is None or not player.connected
+        if reconnected:
+            player = await nodes.connect_player(voice_channel)
+        if not player.playing:
             queue = self.get_queue(guild_id)
             if queue:
-                next_track = queue.pop(0)
-                await player.play(next_track)
-                return await ctx.reply(f"▶️ Bot connected and playing next track: **{next_track.title}**")
+                next_track = queue.popleft()
+                await self.start_track(player, next_track)
+                if reconnected:
+                    return await ctx.reply(f"▶️ Bot connected and playing next track: **{next_track.title}**")
+                return await ctx.reply(f"▶️ Playing next track: **{next_track.title}**")
             else:
                 return await ctx.reply("📜 The queue is empty. Use `!play <title>` to add music.")
 
@@ -315,7 +625,7 @@ class Music(commands.Cog):
     @commands.command(name="pause", aliases=["=", "!="])
     async def pause(self, ctx: commands.Context):
         """Pause the current track."""
-        player = wavelink.Pool.get_node().get_player(ctx.guild.id)
+        player = nodes.get_player(ctx.guild.id)
         if not player or not player.playing:
             return await ctx.reply("❌ No track is currently playing.")
         if player.paused:
@@ -337,8 +647,7 @@ class Music(commands.Cog):
         - Upcoming tracks normally
         """
         guild_id = ctx.guild.id
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        player = nodes.get_player(guild_id)
 
         history = self.get_history(guild_id)
         queue = self.get_queue(guild_id)
@@ -391,41 +700,43 @@ class Music(commands.Cog):
         If nothing is playing, play immediately.
         """
         guild_id = ctx.guild.id
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        self.clear_stopped(guild_id)
+        player = nodes.get_player(guild_id)
 
         if player is None:
             if not ctx.author.voice or not ctx.author.voice.channel:
                 return await ctx.reply("❌ You must be in a voice channel.")
-            player = await ctx.author.voice.channel.connect(cls=wavelink.Player)
+            player = await nodes.connect_player(ctx.author.voice.channel)
 
-        tracks = await wavelink.Playable.search(query)
-        if not tracks:
+        track = await self.search_title(query)
+        if not track:
             return await ctx.reply("❌ No results found.")
-        track = tracks[0]
 
         if not player.playing and not player.paused:
-            await player.play(track)
+            await self.start_track(player, track)
             return await ctx.reply(f"▶️ Now playing: **{track.title}**")
 
         queue = self.get_queue(guild_id)
-        queue.append(track)
+        try:
+            queue.append(track)
+        except QueueFull as e:
+            return await ctx.reply(f"❌ Could not add **{track.title}**: {e}.")
         await ctx.reply(f"➕ **{track.title}** added to the queue")
 
     @commands.command(name="remove", aliases=["re", "rm"])
     async def remove(self, ctx: commands.Context, *, identifier: str):
         """
         Remove a track from the queue by matching part of its title or URL.
+        Whole title words win over partial ones (see TrackQueue.find).
         """
         queue = self.get_queue(ctx.guild.id)
         if not queue:
             return await ctx.reply("📜 The queue is empty.")
-        lowered = identifier.lower()
-        for i, track in enumerate(queue):
-            if lowered in track.title.lower() or (track.uri and lowered in track.uri.lower()):
-                removed = queue.pop(i)
-                return await ctx.reply(f"❌ **{removed.title}** removed from the queue")
-        await ctx.reply("❌ No matching track found in the queue.")
+        removed = queue.remove_match(identifier)
+        if removed is None:
+            return await ctx.reply("❌ No matching track found in the queue.")
+        self.schedule_lookahead(ctx.guild.id)
+        await ctx.reply(f"❌ **{removed.title}** removed from the queue")
 
     @commands.command(name="shuffle", aliases=["sh"])
     async def shuffle(self, ctx: commands.Context):
@@ -439,7 +750,8 @@ class Music(commands.Cog):
         queue = self.get_queue(guild_id)
         if len(queue) < 2:
             return await ctx.reply("📜 Not enough tracks in the queue to shuffle.")
-        random.shuffle(queue)
+        queue.shuffle()
+        self.schedule_lookahead(guild_id)
         await ctx.reply("🔀 Queue shuffled.")
 
     @commands.command(name="empty")
@@ -450,13 +762,13 @@ class Music(commands.Cog):
         queue = self.get_queue(ctx.guild.id)
         if not queue:
             return await ctx.reply("📜 The queue is already empty.")
-        self.queues[ctx.guild.id] = []
+        queue.clear()
         await ctx.reply("🗑️ Queue emptied.")
 
     @commands.command(name="previous", aliases=["<<"])
     async def previous(self, ctx: commands.Context):
         """
-        Play the previous track (from history). History is limited to 3 tracks.
+        Play the previous track (from history). History is limited to HISTORY_SIZE tracks (3 by default).
         Clears any active loop.
         """
         guild_id = ctx.guild.id
@@ -465,12 +777,11 @@ class Music(commands.Cog):
             return await ctx.reply("❌ No tracks in history yet.")
         prev_track = hist.pop()
 
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        player = nodes.get_player(guild_id)
         if player is None:
             if not ctx.author.voice or not ctx.author.voice.channel:
                 return await ctx.reply("❌ You must be in a voice channel.")
-            player = await ctx.author.voice.channel.connect(cls=wavelink.Player)
+            player = await nodes.connect_player(ctx.author.voice.channel)
 
         # Clear the loop
         self.set_loop(guild_id, None)
@@ -478,13 +789,9 @@ class Music(commands.Cog):
         current = player.current if player and player.current else None
         if current:
             queue = self.get_queue(guild_id)
-            queue.insert(0, current)
+            queue.appendleft(current)
 
-        self.set_skip_flag(guild_id, True)
-        if player.playing or player.paused:
-            await player.stop()
-
-        await player.play(prev_track)
+        await self.start_track(player, prev_track)
         await ctx.reply(f"↩️ Now playing previous track: **{prev_track.title}**")
 
     @commands.command(name="next", aliases=[">>"])
@@ -503,139 +810,152 @@ class Music(commands.Cog):
     @commands.command(name="playlist", aliases=["pl"])
     async def playlist(self, ctx: commands.Context, *, url: str):
         """
-        Add all tracks from a YouTube or Spotify playlist to the queue.
-        For Spotify, play the first track immediately and load the rest in the background.
+        Add all tracks from a playlist (YouTube, Spotify, SoundCloud set, Bandcamp album) to the queue.
+        Tracks are streamed from the source: the first one plays as soon as it is found
+        and the rest are queued in the background as they arrive.
         """
         guild_id = ctx.guild.id
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        found = playlist.find_source(url)
+        if found is None:
+            return await ctx.reply(
+                "❌ Unrecognized URL. Supported playlists: YouTube (with 'list='), Spotify, SoundCloud sets and Bandcamp albums."
+            )
+        name, source = found
 
+        player = nodes.get_player(guild_id)
         if player is None:
             if not ctx.author.voice or not ctx.author.voice.channel:
                 return await ctx.reply("❌ You must be in a voice channel to load a playlist.")
-            player = await ctx.author.voice.channel.connect(cls=wavelink.Player)
+            player = await nodes.connect_player(ctx.author.voice.channel)
 
         self.set_loading(guild_id, True)
         self.set_pending_shuffle(guild_id, False)
-        await ctx.reply("🔄 Loading playlist… This may take a while if it’s large.")
+        self.clear_stopped(guild_id)
+        status = await ctx.reply(f"🔄 Loading {name} playlist… This may take a while if it’s large.")
 
+        # Launch the ingestion in the background: the command returns right away
+        progress = resolver.ResolveProgress()
+        self.bot.loop.create_task(
+            self.ingest_playlist(ctx, player, f"{name} playlist", source(url, progress), progress, status)
+        )
+
+    async def ingest_playlist(self, ctx: commands.Context, player: wavelink.Player, label: str, tracks,
+                              progress: resolver.ResolveProgress, status: discord.Message):
+        """
+        Consume a playlist source (see playlist.py): play the first track if nothing is playing,
+        queue the others as they arrive (lazy entries are resolved by the look-ahead)
+        and keep the status message up to date.
+        `label` names what is loaded in the messages ("Spotify playlist", "queue file"),
+        `tracks` is the source's async generator, `progress` the ResolveProgress it updates.
+        The source is only asked for the next track once the previous one is queued (backpressure).
+        The status message is edited at most every PROGRESS_INTERVAL seconds, in the background:
+        loading never waits on Discord's rate limits.
+        """
+        guild_id = ctx.guild.id
+        state = self.get_state(guild_id)
+        queue = state.queue
         added_count = 0
+        last_edit = time.perf_counter()
+        edit_task = None
+        try:
+            async for track in tracks:
+                if player.connected and not state.stopped and not (player.playing or player.paused):
+                    # Nothing playing (first track, or the queue ran dry while loading): play it now
+                    if await self.start_track(player, track) is None:
+                        continue
+                else:
+                    try:
+                        queue.append(track)
+                    except QueueFull as e:
+                        await ctx.reply(f"⚠️ Stopped adding tracks: {e}.")
+                        break
+                    self.schedule_lookahead(guild_id)
+                added_count += 1
+                now = time.perf_counter()
+                if now - last_edit >= PROGRESS_INTERVAL and (edit_task is None or edit_task.done()):
+                    last_edit = now
+                    edit_task = asyncio.create_task(
+                        _edit_status(status, f"🔄 Loading {label}… {progress}")
+                    )
+        except playlist.PlaylistError as e:
+            return await status.edit(content=f"❌ {e}")
+        except Exception as e:
+            logger.error(f"❌ Error while loading {label}: {e}")
+            return await status.edit(content=f"❌ Error while loading {label} ({progress} tracks).")
+        finally:
+            await tracks.aclose()
+            self.set_loading(guild_id, False)
+            if edit_task is not None:
+                edit_task.cancel()   # superseded by the final status
 
-        # ─── YouTube playlist case ─────────────────────────────────────────
-        if "youtube.com/playlist" in url or ("youtu.be" in url and "list=" in url):
-            tracks = await playlist.load_youtube_playlist(node, url)
-            if not tracks:
-                self.set_loading(guild_id, False)
-                return await ctx.reply("❌ Could not load YouTube playlist.")
-            queue = self.get_queue(guild_id)
+        if not added_count:
+            return await status.edit(content=f"❌ Could not load {label}.")
+        await status.edit(content=f"✅ Loaded {label}: {progress}")
 
-            for idx, t in enumerate(tracks):
-                if idx == 0:
-                    await player.play(t)
-                    added_count += 1
-                else:
-                    queue.append(t)
-                    added_count += 1
+        if self.get_pending_shuffle(guild_id):
+            queue.shuffle()
+            self.schedule_lookahead(guild_id)
+            await ctx.reply("🔀 Queue shuffled after loading (shuffle requested).")
 
-            self.set_loading(guild_id, False)
-            if self.get_pending_shuffle(guild_id):
-                random.shuffle(self.get_queue(guild_id))
-                await ctx.reply("🔀 Queue shuffled after loading (shuffle requested).")
-
-            return await ctx.reply(f"✅ **{added_count}** YouTube playlist track(s) added.")
-
-        # ─── Spotify playlist case ─────────────────────────────────────────
-        if "spotify.com" in url and "playlist" in url:
-            if not playlist.SPOTIPY_AVAILABLE:
-                self.set_loading(guild_id, False)
-                return await ctx.reply("❌ Spotipy is not available; cannot load Spotify playlists.")
-
-            match = re.search(r"playlist/([A-Za-z0-9]+)", url)
-            if not match:
-                self.set_loading(guild_id, False)
-                return await ctx.reply("❌ Invalid Spotify playlist URL.")
-            playlist_id = match.group(1)
-
-            # ─── Spotify client credentials ───────────────────────────────
-            credentials = SpotifyClientCredentials(
-                client_id=config.SPOTIPY_CLIENT_ID,
-                client_secret=config.SPOTIPY_CLIENT_SECRET
-            )
-            sp = spotipy.Spotify(auth_manager=credentials)
-
-            response = sp.playlist_items(playlist_id, additional_types=["track"])
-            if not response or not response.get("items"):
-                self.set_loading(guild_id, False)
-                return await ctx.reply("❌ Spotify playlist is empty or not found.")
-
-            first_item = response["items"][0].get("track")
-            if not first_item:
-                self.set_loading(guild_id, False)
-                return await ctx.reply("❌ Could not play the first Spotify track.")
-            name = first_item.get("name", "")
-            artists = ", ".join(artist["name"] for artist in first_item.get("artists", []))
-            search_query = f"{name} {artists}"
-
-            youtube_results = await wavelink.Playable.search(search_query)
-            if not youtube_results:
-                self.set_loading(guild_id, False)
-                return await ctx.reply(f"❌ Could not find on YouTube: **{name}**.")
-            first_track = youtube_results[0]
-
-            await player.play(first_track)
-            added_count = 1
+        if progress.failures:
+            missing = ", ".join(f"**{item.get('name', '?')}**" for _, item, _ in progress.failures[:5])
+            if len(progress.failures) > 5:
+                missing += f" and {len(progress.failures) - 5} more"
+            where = " on YouTube" if label == "Spotify playlist" else ""
+            await ctx.reply(f"⚠️ Not found{where}: {missing}.")
 
-            queue = self.get_queue(guild_id)
+        await ctx.reply(f"✅ **{added_count}** track(s) added from the {label}.")
 
-            async def load_rest_of_spotify():
-                nonlocal added_count, queue
-                items = response["items"][1:]
-                for item in items:
-                    track_info = item.get("track")
-                    if not track_info:
-                        continue
-                    name2 = track_info.get("name", "")
-                    artists2 = ", ".join(artist["name"] for artist in track_info.get("artists", []))
-                    query2 = f"{name2} {artists2}"
-                    results2 = await wavelink.Playable.search(query2)
-                    if results2:
-                        queue.append(results2[0])
-                        added_count += 1
-
-                next_page = response.get("next")
-                current_response = response
-                while next_page:
-                    response2 = sp.next(current_response)
-                    items2 = response2.get("items", [])
-                    for item in items2:
-                        track_info = item.get("track")
-                        if not track_info:
-                            continue
-                        name3 = track_info.get("name", "")
-                        artists3 = ", ".join(artist["name"] for artist in track_info.get("artists", []))
-                        query3 = f"{name3} {artists3}"
-                        results3 = await wavelink.Playable.search(query3)
-                        if results3:
-                            queue.append(results3[0])
-                            added_count += 1
-                    next_page = response2.get("next")
-                    current_response = response2
-
-                self.set_loading(guild_id, False)
-
-                if self.get_pending_shuffle(guild_id):
-                    random.shuffle(queue)
-                    await ctx.reply("🔀 Queue shuffled after loading (shuffle requested).")
-
-                await ctx.reply(f"✅ **{added_count}** Spotify playlist track(s) added.")
-
-            # Launch background task to load the rest of the Spotify tracks
-            self.bot.loop.create_task(load_rest_of_spotify())
-            return
+    @commands.command(name="export")
+    async def export(self, ctx: commands.Context):
+        """
+        Send the current track and the queue as a file that `!import` loads back (see queue_file.py),
+        e.g. to save a session or move it to another server.
+        """
+        guild_id = ctx.guild.id
+        player = nodes.get_player(guild_id)
+        current = player.current if player and player.current else None
+        entries = ([current] if current else []) + list(self.get_queue(guild_id))
+        if not entries:
+            return await ctx.reply("📜 Nothing to export: no music playing and the queue is empty.")
+
+        data = queue_file.dump(entries)
+        await ctx.reply(
+            f"💾 **{len(entries)}** track(s) exported. Load them back with `!import` and this file attached.",
+            file=discord.File(io.BytesIO(data), filename=f"queue-{guild_id}.txt")
+        )
+
+    @commands.command(name="import")
+    async def import_(self, ctx: commands.Context):
+        """
+        Add the tracks of a file written by `!export` (attached to the command) to the queue.
+        The tracks are decoded by Lavalink in a few batched requests instead of being searched again;
+        like a playlist, the first one plays at once if nothing is playing.
+        """
+        guild_id = ctx.guild.id
+        if not ctx.message.attachments:
+            return await ctx.reply("❌ Attach a queue file written by `!export` to the command.")
+        attachment = ctx.message.attachments[0]
+        max_bytes = getattr(config, "QUEUE_FILE_MAX_BYTES", 5_000_000)
+        if attachment.size > max_bytes:
+            return await ctx.reply(f"❌ Queue files are limited to {max_bytes // 1_000_000} MB.")
+
+        player = nodes.get_player(guild_id)
+        if player is None:
+            if not ctx.author.voice or not ctx.author.voice.channel:
+                return await ctx.reply("❌ You must be in a voice channel to import a queue.")
+            player = await nodes.connect_player(ctx.author.voice.channel)
 
-        # If the URL is neither YouTube nor Spotify playlist
-        self.set_loading(guild_id, False)
-        return await ctx.reply("❌ Unrecognized URL. Only YouTube (with 'list=') or Spotify playlists are supported.")
+        data = await attachment.read()
+        self.set_loading(guild_id, True)
+        self.set_pending_shuffle(guild_id, False)
+        self.clear_stopped(guild_id)
+        status = await ctx.reply("🔄 Importing queue…")
+
+        progress = resolver.ResolveProgress()
+        self.bot.loop.create_task(
+            self.ingest_playlist(ctx, player, "queue file", queue_file.stream_queue_file(data, progress), progress, status)
+        )
 
     @commands.command(name="help")
     async def help(self, ctx: commands.Context):
@@ -710,17 +1030,27 @@ class Music(commands.Cog):
         )
         embed.add_field(
             name="⏹️ stop",
-            value="Stop playback and disconnect. Queue remains in memory (loop cleared).",
+            value="Stop playback; the bot leaves the voice channel after a few idle minutes. Queue remains in memory (loop cleared).",
             inline=False
         )
         embed.add_field(
             name="↩️ previous (alias `<<`)",
-            value="Play the previous track from history (up to 3 saved), clears loop.",
+            value=f"Play the previous track from history (up to {self.guilds.history_size} saved), clears loop.",
             inline=False
         )
         embed.add_field(
-            name="🎵 playlist `<YouTube or Spotify URL>` (alias `pl`)",
-            value="Add all tracks from a YouTube or Spotify playlist to the queue.",
+            name="🎵 playlist `<playlist URL>` (alias `pl`)",
+            value="Add all tracks from a YouTube, Spotify or SoundCloud playlist (or a Bandcamp album) to the queue.",
+            inline=False
+        )
+        embed.add_field(
+            name="💾 export",
+            value="Send the current track and the queue as a file, to load them back later with `!import`.",
+            inline=False
+        )
+        embed.add_field(
+            name="📂 import",
+            value="Add the tracks of a file written by `!export` (attach it to the command) to the queue.",
             inline=False
         )
         embed.set_footer(text=f"Prefix: {prefix}")
@@ -729,69 +1059,108 @@ class Music(commands.Cog):
     @commands.Cog.listener()
     async def on_wavelink_node_ready(self, event):
         logger.info(f"✅ Node ready: {event.node.identifier}")
+        await nodes.get_balancer().refresh()
+
+    @commands.Cog.listener()
+    async def on_wavelink_node_disconnected(self, event):
+        # The node's websocket dropped (wavelink keeps retrying in the background):
+        # move its players to the other nodes instead of waiting for it
+        logger.warning(f"⚠️ Node disconnected: {event.node.identifier}")
+        await nodes.get_balancer().failover(event.node)
 
     @commands.Cog.listener()
     async def on_wavelink_track_start(self, event):
         # Log the start of playback; the Player embed is updated elsewhere if used
-        logger.info(f"▶️ Track start: {event.track.title}")
+        if nodes.get_balancer().resumed(event.player.guild.id):
+            logger.info(f"🔀 Track resumed on node {event.player.node.identifier}: {event.track.title}")
+            return
+        state = self.guilds.peek(event.player.guild.id)
+        if state is None or state.ended_at is None:
+            logger.info(f"▶️ Track start: {event.track.title}")
+        else:
+            # Right after a finished track: measure the silence between the two
+            gap = time.perf_counter() - state.ended_at
+            state.ended_at = None
+            state.transitions += 1
+            state.dead_air += gap
+            metrics.TRACK_START_GAP.observe(gap)
+            logger.info(f"▶️ Track start: {event.track.title} (after {gap * 1000:.0f} ms of silence)")
+        # Popularity counts of the track library
+        await library.get_library().add(event.track, played=True)
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, event):
         """
-        Handle the end of a track:
-        - If skip_flag is True (manual skip), reset it and return.
+        Handle the end of a track. Only a track that finished (or could not be loaded) moves playback on:
+        skips, !previous and the player buttons start their track themselves, which ends the current one
+        with the reason "replaced" ("stopped" for !stop or a skip with an empty queue).
         - If a loop is active, replay or decrement loop count.
-        - Otherwise, add the finished track to history and play the next track in queue.
+        - Otherwise, add the finished track to history and play the next track in queue
+          (already resolved by the look-ahead, so it is sent to Lavalink right away).
         """
-        guild_id = event.player.guild.id
-
-        if self.get_skip_flag(guild_id):
-            self.set_skip_flag(guild_id, False)
+        if event.reason not in ("finished", "loadFailed"):
             return
+        state = self.guilds.get(event.player.guild.id)
+        state.ended_at = time.perf_counter()
 
-        loop_flag = self.get_loop(guild_id)
+        loop_flag = state.loop if event.reason == "finished" else None
 
         # If loop_flag == -1 => infinite loop
         if loop_flag == -1:
-            await event.player.play(event.track)
+            await self.start_track(event.player, event.track)
             logger.info(f"🔁 Infinite loop: replaying {event.track.title}")
             return
 
         # If loop_flag > 0 => finite loop, decrement then replay
         if isinstance(loop_flag, int) and loop_flag > 0:
-            self.set_loop(guild_id, loop_flag - 1)
-            await event.player.play(event.track)
+            state.loop = loop_flag - 1
+            await self.start_track(event.player, event.track)
             logger.info(f"🔁 Loop x{loop_flag} remaining: replaying {event.track.title}")
             return
 
         # If loop_flag == 0, clear the loop
         if loop_flag == 0:
-            self.set_loop(guild_id, None)
+            state.loop = None
 
-        # Add the finished track to history
-        finished_track = event.track
-        hist = self.get_history(guild_id)
-        hist.append(finished_track)
-        if len(hist) > 3:
-            hist.pop(0)
+        # Add the finished track to history (a track that failed to load never played: "previous" skips it)
+        if event.reason == "finished":
+            state.history.append(event.track)
 
         # Play the next track if the queue is not empty
-        queue = self.get_queue(guild_id)
-        if queue:
-            next_track = queue.pop(0)
-            self.set_skip_flag(guild_id, True)
-            await event.player.play(next_track)
+        if state.queue:
+            next_track = state.queue.popleft()
+            if await self.start_track(event.player, next_track) is None:
+                state.ended_at = None
             logger.info(f"➔ Playing next track from queue: {next_track.title}")
         else:
+            state.ended_at = None
             logger.info("📭 Queue is empty, playback ended.")
 
+    @commands.Cog.listener()
+    async def on_wavelink_inactive_player(self, player: wavelink.Player):
+        # wavelink: nothing played for IDLE_TIMEOUT seconds (after !stop or the end of the queue)
+        if player.playing or not player.connected:
+            return
+        logger.info(f"💤 Nothing played for {player.inactive_timeout}s, leaving voice in guild {player.guild.id}.")
+        await player.disconnect()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        # The bot left (or was kicked from) this guild: its state is no longer needed
+        self.guilds.discard(guild.id)
+        await self.snapshots.delete([guild.id])
+
     @commands.Cog.listener()
     async def on_wavelink_track_exception(self, event):
         logger.error(f"❌ Exception on {event.track.title}: {event.exception}")
+        # Don't hand this track out again from the caches: the next request searches afresh
+        await spotify_index.get_index().invalidate(event.track.identifier)
+        await search_cache.get_cache().invalidate_track(event.track.identifier)
+        await library.get_library().invalidate(event.track.identifier)
 
 @bot.event
 async def on_ready():
-    logger.info(f"Logged in as {bot.user}")
+    logger.info(f"Logged in as {bot.user} ({time.perf_counter() - bot.started:.2f}s after start)")
 
 if __name__ == "__main__":
     bot.run(config.TOKEN)
@@ -0,0 +1,220 @@
+# metrics.py
+import asyncio
+import bisect
+import logging
+import time
+
+from aiohttp import web
+
+logger = logging.getLogger("Anakin")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ─── Metric types ───────────────────────────────────────────────────
+# Minimal Prometheus-compatible metrics: updating one is a dict lookup and an addition,
+# so they can stay on in production. Label values are passed positionally, in `labelnames` order.
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    A value updated by the code, or read at scrape time from `collect()` -> {label values tuple: value}
+    (for totals some other object already keeps, e.g. the search cache's hit counters).
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        values = self._values
+        if self.collect is not None:
+            try:
+                values = self.collect()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not collect metric {self.name}: {e}")
+                values = {}
+        for labels, value in values.items():
+            yield f"{self.name}{self._label_text(labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {}   # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                yield f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(labels)} {total}"
+            yield f"{self.name}_count{self._label_text(labels)} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ─── Bot metrics ────────────────────────────────────────────────────
+SEARCH_SECONDS = Histogram("anakin_search_seconds", "Lavalink searches that missed the cache, by source", ("source",))
+SPOTIFY_SECONDS = Histogram("anakin_spotify_seconds", "Spotify Web API calls, by method", ("method",))
+SPOTIFY_RATE_LIMITED = Counter("anakin_spotify_rate_limited_total", "Spotify Web API calls answered with a 429")
+TRACK_START_GAP = Histogram(
+    "anakin_track_start_gap_seconds", "Silence between the end of a track and the start of the next one",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+)
+EMBED_EDIT_SECONDS = Histogram("anakin_embed_edit_seconds", "Player/queue embed edits, by message", ("message",))
+EMBED_EDITS_SUPERSEDED = Counter("anakin_embed_edits_superseded_total", "Embed edits dropped for a newer one")
+EMBED_RATE_LIMITED = Counter("anakin_embed_rate_limited_total", "Message edits answered with a 429 by Discord")
+DISCORD_RATE_LIMITED = Counter(
+    "anakin_discord_rate_limited_total", "Discord API requests answered with a 429, by HTTP method", ("method",)
+)
+COMMAND_SECONDS = Histogram("anakin_command_seconds", "Music cog commands, by command", ("command",))
+BUTTON_CLICKS = Counter("anakin_button_clicks_total", "Player control buttons clicked, by button", ("button",))
+LOOP_LAG = Histogram(
+    "anakin_event_loop_lag_seconds", "Delay of the event loop in waking up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+LOOP_BLOCKS = Counter("anakin_event_loop_blocks_total", "Event loop stalls over the watchdog threshold, by site", ("site",))
+# Read at scrape time from counters kept elsewhere (`collect` is set by search_cache.py, spotify_index.py,
+# library.py, main.py)
+SEARCH_CACHE = Counter("anakin_search_cache_total", "Search cache lookups, by result", ("result",))
+SEARCHES_COALESCED = Counter(
+    "anakin_searches_coalesced_total", "Searches answered by an identical Lavalink load already in flight"
+)
+SPOTIFY_INDEX = Counter("anakin_spotify_index_total", "Spotify index lookups, by result", ("result",))
+LIBRARY = Counter("anakin_library_total", "Track library lookups for typed titles, by result", ("result",))
+LIBRARY_TRACKS = Gauge("anakin_library_tracks", "Tracks in the track library")
+QUEUED_TRACKS = Gauge("anakin_queued_tracks", "Tracks waiting in all guild queues")
+LONGEST_QUEUE = Gauge("anakin_longest_queue_tracks", "Length of the longest guild queue")
+GUILD_STATES = Gauge("anakin_guild_states", "Guilds with state in memory")
+PLAYERS = Gauge("anakin_players", "Players connected, by Lavalink node", ("node",))
+GUILDS = Gauge("anakin_guilds", "Guilds the bot is in, by shard", ("shard",))
+TRACK_TRANSITIONS = Counter(
+    "anakin_track_transitions_total", "Tracks started right after the previous one finished, by guild", ("guild",)
+)
+DEAD_AIR = Counter(
+    "anakin_dead_air_seconds_total", "Silence between a finished track and the start of the next one, by guild",
+    ("guild",)
+)
+
+
+# ─── Discord rate limits ────────────────────────────────────────────
+class _RateLimitLog(logging.Handler):
+    """
+    Counts the 429 responses discord.py reports on the "discord.http" logger. discord.py waits them out
+    itself (it only raises discord.RateLimited for waits over max_ratelimit_timeout, at least 30 s),
+    so its log is the only place every rate-limit hit shows up.
+    """
+
+    def emit(self, record: logging.LogRecord):
+        if not isinstance(record.msg, str) or not record.msg.startswith("We are being rate limited.") \
+                or len(record.args or ()) < 2:
+            return
+        method, url = str(record.args[0]), str(record.args[1])
+        DISCORD_RATE_LIMITED.inc(method)
+        if method == "PATCH" and "/messages/" in url:
+            EMBED_RATE_LIMITED.inc()
+
+
+logging.getLogger("discord.http").addHandler(_RateLimitLog(logging.WARNING))
+
+
+# ─── Event loop lag and HTTP endpoint ───────────────────────────────
+async def monitor_loop_lag(interval: float = 0.5):
+    """Sleep `interval` seconds in a loop and record how late each wake-up is."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+async def _handle_metrics(request: web.Request):
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """Serve every metric at http://host:port/metrics in the Prometheus text format."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Metrics available on http://{host}:{port}/metrics")
+    return runner
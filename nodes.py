@@ -0,0 +1,179 @@
+# nodes.py
+import functools
+import logging
+import math
+
+import discord
+import wavelink
+
+import config
+
+logger = logging.getLogger("Anakin")
+
+
+def penalty(stats) -> float:
+    """
+    Load score of a Lavalink node from its stats (lower is better), as used by the usual Lavalink clients:
+    - one point per playing player
+    - CPU: grows exponentially with the system load
+    - frames: nulled and missing (deficit) audio frames, i.e. the node is already struggling to keep up
+    """
+    score = stats.playing
+    score += 1.05 ** (100 * stats.cpu.system_load) * 10 - 10
+    if stats.frames:
+        score += 1.03 ** (500 * (stats.frames.deficit / 3000)) * 600 - 600
+        score += (1.03 ** (500 * (stats.frames.nulled / 3000)) * 300 - 300) * 2
+    return score
+
+
+class NodeBalancer:
+    """
+    Places players on the least-loaded Lavalink node of the wavelink.Pool and moves them when a node drops.
+    - refresh() polls /v4/stats of every connected node and computes its penalty;
+      a node that does not answer gets no new players, and has its players moved away
+      once it missed `max_failures` polls in a row (a dropped websocket moves them at once, see failover)
+    - best_node() also counts the players placed since the last poll, so a burst of joins is spread out
+    - failover(node) switches every player of a dropped node to the best remaining one,
+      keeping the current track, position, volume, filters and pause state;
+      the track is resumed, not played again: no history entry, and resumed() tells its start event apart
+    The balancer remembers the players it placed or moved: wavelink empties node.players of a node whose
+    websocket is gone before dispatching node_disconnected, so failover cannot rely on it.
+    """
+
+    def __init__(self, max_failures: int = 3):
+        self.max_failures = max(1, max_failures)
+        self._penalties: dict[str, float] = {}   # node identifier -> penalty at the last poll
+        self._players: dict[str, int] = {}       # node identifier -> our players on it at the last poll
+        self._failures: dict[str, int] = {}      # node identifier -> stats polls missed in a row
+        self._resuming: set[int] = set()         # guild IDs whose track was resumed on another node
+        self._placed: dict[int, wavelink.Player] = {}   # guild ID -> player placed or moved by the balancer
+
+    @staticmethod
+    def connected_nodes(exclude: wavelink.Node | None = None) -> list[wavelink.Node]:
+        return [
+            node for node in wavelink.Pool.nodes.values()
+            if node.status is wavelink.NodeStatus.CONNECTED and node is not exclude
+        ]
+
+    async def refresh(self):
+        for node in self.connected_nodes():
+            try:
+                stats = await node.fetch_stats()
+            except Exception as e:
+                # Also catches a node whose websocket closed cleanly, which wavelink keeps reporting as connected
+                failures = self._failures.get(node.identifier, 0) + 1
+                logger.warning(
+                    f"⚠️ Could not fetch stats of Lavalink node {node.identifier} "
+                    f"({failures}/{self.max_failures}): {e}"
+                )
+                if failures >= self.max_failures and self.players_of(node):
+                    await self.failover(node)
+                    failures = 0
+                self._failures[node.identifier] = failures
+                self._penalties[node.identifier] = math.inf
+                continue
+            self._failures.pop(node.identifier, None)
+            self._penalties[node.identifier] = penalty(stats)
+            self._players[node.identifier] = len(node.players)
+
+    def score(self, node: wavelink.Node) -> float:
+        placed = len(node.players) - self._players.get(node.identifier, 0)
+        return self._penalties.get(node.identifier, 0.0) + max(0, placed)
+
+    def best_node(self, exclude: wavelink.Node | None = None) -> wavelink.Node | None:
+        """Connected node with the lowest score, or None if no node is available."""
+        nodes = self.connected_nodes(exclude)
+        return min(nodes, key=self.score) if nodes else None
+
+    async def connect(self, channel: discord.abc.Connectable) -> wavelink.Player:
+        """Join a voice channel with a player placed on the best node."""
+        node = self.best_node()
+        if node is None:
+            raise wavelink.InvalidNodeException("No Lavalink node is currently connected.")
+        player = await channel.connect(cls=functools.partial(wavelink.Player, nodes=[node]))
+        self._forget_disconnected()
+        self._placed[player.guild.id] = player
+        return player
+
+    def _forget_disconnected(self):
+        self._placed = {guild_id: player for guild_id, player in self._placed.items() if player.connected}
+
+    def players_of(self, node: wavelink.Node) -> list[wavelink.Player]:
+        """Connected players on `node`, including those wavelink already dropped from node.players."""
+        self._forget_disconnected()
+        players = {guild_id: player for guild_id, player in self._placed.items() if player.node is node}
+        players.update(node.players)
+        return list(players.values())
+
+    async def failover(self, node: wavelink.Node) -> int:
+        """Move every player of `node` to other nodes. Returns the number of players moved."""
+        self._penalties.pop(node.identifier, None)
+        moved = 0
+        for player in self.players_of(node):
+            target = self.best_node(exclude=node)
+            if target is None:
+                logger.error(f"❌ Lavalink node {node.identifier} dropped and no other node is available.")
+                break
+            try:
+                await self._switch(player, target)
+                moved += 1
+            except Exception as e:
+                self._resuming.discard(player.guild.id)
+                self._placed.pop(player.guild.id, None)
+                logger.error(f"❌ Could not move player of guild {player.guild.id} to node {target.identifier}: {e}")
+                try:
+                    await player.disconnect()
+                except Exception:
+                    pass
+        if moved:
+            logger.info(f"🔀 Moved {moved} player(s) from Lavalink node {node.identifier}.")
+        return moved
+
+    async def _switch(self, player: wavelink.Player, node: wavelink.Node):
+        """
+        Player.switch_node(), which plays the current track again on the new node: its start event is
+        flagged for resumed(), and the history entry switch_node() adds is taken back out.
+        """
+        history = player.queue.history
+        recorded = history.count if history is not None else 0
+        if player.current:
+            self._resuming.add(player.guild.id)
+        await player.switch_node(node)
+        if history is not None and history.count > recorded:
+            history.delete(-1)
+        self._placed[player.guild.id] = player
+
+    def resumed(self, guild_id: int) -> bool:
+        """Whether the guild's track start is a track moved to another node (answers once per move)."""
+        if guild_id in self._resuming:
+            self._resuming.discard(guild_id)
+            return True
+        return False
+
+
+def get_player(guild_id: int) -> wavelink.Player | None:
+    """The guild's player, whichever node it lives on."""
+    for node in wavelink.Pool.nodes.values():
+        player = node.get_player(guild_id)
+        if player is not None:
+            return player
+    return None
+
+
+_balancer: NodeBalancer | None = None
+
+
+def get_balancer() -> NodeBalancer:
+    """Return the process-wide node balancer, creating it on first use."""
+    global _balancer
+    if _balancer is None:
+        _balancer = NodeBalancer(max_failures=getattr(config, "NODE_STATS_FAILURES", 3))
+    return _balancer
+
+
+async def connect_player(channel: discord.abc.Connectable) -> wavelink.Player:
+    return await get_balancer().connect(channel)
+
+
+def best_node() -> wavelink.Node | None:
+    return get_balancer().best_node()
@@ -1,144 +1,123 @@
 # player.py
+import asyncio
+import functools
+import logging
+import time
 import discord
 from discord.ext import commands
-import wavelink
 import config
+import metrics
+import nodes
+import watchdog
+from embed_scheduler import EmbedScheduler
+
+logger = logging.getLogger("Anakin")
+
+
+class GuildMessages:
+    """
+    The messages PlayerEmbed keeps up to date in one guild:
+    - channel: the guild's player channel
+    - player_message: the "Anakin Player" embed with the controls
+    - queue_message: the queue embed opened with the 🕑 Queue button, if any
+    """
+    __slots__ = ("guild_id", "channel", "player_message", "queue_message")
+
+    def __init__(self, guild_id: int, channel: discord.abc.Messageable):
+        self.guild_id = guild_id
+        self.channel = channel
+        self.player_message: discord.Message | None = None
+        self.queue_message: discord.Message | None = None
+
 
 class PlayerControls(discord.ui.View):
-    def __init__(self, bot: commands.Bot, guild_id: int):
+    """
+    Buttons of the player embed. A single instance serves every guild:
+    each click acts on the guild it comes from (interaction.guild_id).
+    Each click is answered by editing the player embed in the interaction response itself
+    (see PlayerEmbed.respond), so it costs one API call instead of defer + edit.
+    """
+    def __init__(self, bot: commands.Bot):
         super().__init__(timeout=None)
         self.bot = bot
-        self.guild_id = guild_id
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        custom_id = interaction.data.get("custom_id", "unknown")
+        metrics.BUTTON_CLICKS.inc(custom_id)
+        watchdog.set_activity(f"{custom_id} button in guild {interaction.guild_id}")
+        return True
+
+    async def _respond(self, interaction: discord.Interaction):
+        parent_cog: PlayerEmbed = self.bot.get_cog("PlayerEmbed")
+        if parent_cog:
+            await parent_cog.respond(interaction)
+        elif not interaction.response.is_done():
+            await interaction.response.defer()
 
     @discord.ui.button(label="⏹️ Stop", style=discord.ButtonStyle.red, custom_id="player_stop")
     async def stop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer()
-        player = wavelink.Pool.get_node().get_player(self.guild_id)
-        if player:
-            if player.playing:
-                await player.stop()
-            if player.connected:
-                await player.disconnect()
+        player = nodes.get_player(interaction.guild_id)
+        music_cog: Music = self.bot.get_cog("Music")
+        if player and music_cog:
+            await music_cog.stop_player(player)
 
-        embed = discord.Embed(
-            title="▶️ Anakin Player",
-            description="**No music is currently playing**\n\n__Next:__\nNothing for now",
-            color=0xFFA500
-        )
-        await interaction.message.edit(embed=embed, view=self)
+        await self._respond(interaction)
 
     @discord.ui.button(label="⏮️ Prev", style=discord.ButtonStyle.gray, custom_id="player_prev")
     async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer()
         music_cog: Music = self.bot.get_cog("Music")
         if not music_cog:
-            return
+            return await self._respond(interaction)
 
-        guild_id = self.guild_id
+        guild_id = interaction.guild_id
         hist = music_cog.get_history(guild_id)
         if not hist:
-            return
+            return await self._respond(interaction)
 
-        prev_track = hist.pop()
-        node = wavelink.Pool.get_node()
-        player = node.get_player(guild_id)
+        player = nodes.get_player(guild_id)
         if player is None:
             member = interaction.user
-            if member.voice and member.voice.channel:
-                player = await member.voice.channel.connect(cls=wavelink.Player)
-            else:
-                return
+            if not (member.voice and member.voice.channel):
+                return await self._respond(interaction)
+            # Joining voice can take longer than the interaction allows: acknowledge first
+            await interaction.response.defer()
+            player = await nodes.connect_player(member.voice.channel)
 
+        music_cog.clear_stopped(guild_id)
+        prev_track = hist.pop()
         current = player.current if player and player.current else None
         if current:
             queue = music_cog.get_queue(guild_id)
-            queue.insert(0, current)
+            queue.appendleft(current)
 
-        music_cog.set_skip_flag(guild_id, True)
-        if player.playing or player.paused:
-            await player.stop()
-
-        await player.play(prev_track)
-
-        minutes = prev_track.length // 60000
-        seconds = (prev_track.length // 1000) % 60
-        queue_after = music_cog.get_queue(guild_id)
-        next_title = queue_after[0].title if queue_after else "None"
-        embed = discord.Embed(
-            title="▶️ Anakin Player",
-            description=f"**{prev_track.title}** - ({minutes}:{seconds:02d})\n\n__Next:__\n{next_title}",
-            color=0xFFA500
-        )
-        thumb = getattr(prev_track, "thumbnail", None) or getattr(prev_track, "thumbnail_url", None)
-        if thumb:
-            embed.set_thumbnail(url=thumb)
-
-        await interaction.message.edit(embed=embed, view=self)
-
-        parent_cog: PlayerEmbed = self.bot.get_cog("PlayerEmbed")
-        if parent_cog and parent_cog.queue_message:
-            await parent_cog.queue_message.edit(embed=parent_cog._build_queue_embed(guild_id))
+        await music_cog.start_track(player, prev_track)
+        await self._respond(interaction)
 
     @discord.ui.button(label="⏸️ Pause", style=discord.ButtonStyle.blurple, custom_id="player_pause")
     async def pause_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer()
-        guild_id = self.guild_id
-        player = wavelink.Pool.get_node().get_player(guild_id)
-        if not player or not player.playing or player.paused:
-            return
-
-        await player.pause(True)
-        embed = interaction.message.embeds[0]
-        desc = embed.description
-        if desc.startswith("**"):
-            embed.description = desc.replace("**", "⏸️ **", 1)
-        else:
-            embed.description = "⏸️ Music paused.\n\n" + desc
-
-        await interaction.message.edit(embed=embed, view=self)
-        parent_cog: PlayerEmbed = self.bot.get_cog("PlayerEmbed")
-        if parent_cog and parent_cog.queue_message:
-            await parent_cog.queue_message.edit(embed=parent_cog._build_queue_embed(guild_id))
+        player = nodes.get_player(interaction.guild_id)
+        if player and player.playing and not player.paused:
+            await player.pause(True)
+        await self._respond(interaction)
 
     @discord.ui.button(label="▶️ Play", style=discord.ButtonStyle.green, custom_id="player_play")
     async def play_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer()
-        guild_id = self.guild_id
-        player = wavelink.Pool.get_node().get_player(guild_id)
-        if not player or not player.paused:
-            return
-
-        await player.pause(False)
-        embed = interaction.message.embeds[0]
-        desc = embed.description
-        if desc.startswith("⏸️ "):
-            embed.description = desc.replace("⏸️ ", "", 1)
-
-        await interaction.message.edit(embed=embed, view=self)
-        parent_cog: PlayerEmbed = self.bot.get_cog("PlayerEmbed")
-        if parent_cog and parent_cog.queue_message:
-            await parent_cog.queue_message.edit(embed=parent_cog._build_queue_embed(guild_id))
+        player = nodes.get_player(interaction.guild_id)
+        if player and player.paused:
+            await player.pause(False)
+        await self._respond(interaction)
 
     @discord.ui.button(label="⏭️ Next", style=discord.ButtonStyle.gray, custom_id="player_next")
     async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer()
         music_cog: Music = self.bot.get_cog("Music")
-        if not music_cog:
-            return
-
-        guild_id = self.guild_id
-        played = await music_cog.skip_track(guild_id)
-        if not played:
-            embed = discord.Embed(
-                title="▶️ Anakin Player",
-                description="**No music is currently playing**\n\n__Next:__\nNothing for now",
-                color=0xFFA500
-            )
-            await interaction.message.edit(embed=embed, view=self)
-
-        parent_cog: PlayerEmbed = self.bot.get_cog("PlayerEmbed")
-        if parent_cog and parent_cog.queue_message:
-            await parent_cog.queue_message.edit(embed=parent_cog._build_queue_embed(guild_id))
+        if music_cog:
+            upcoming = music_cog.get_queue(interaction.guild_id).peek()
+            if upcoming is not None and not (upcoming.resolved and upcoming.playable):
+                # The next track has to be searched first (lazy Spotify entry, or failed ones to skip),
+                # which can take longer than the interaction allows: acknowledge first
+                await interaction.response.defer()
+            await music_cog.skip_track(interaction.guild_id)
+        await self._respond(interaction)
 
     @discord.ui.button(label="🕑 Queue", style=discord.ButtonStyle.secondary, custom_id="player_queue")
     async def queue_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -147,20 +126,64 @@ class PlayerControls(discord.ui.View):
         if not parent_cog:
             return
 
-        if parent_cog.queue_message is None:
-            q_embed = parent_cog._build_queue_embed(self.guild_id)
+        guild_id = interaction.guild_id
+        messages = parent_cog.get_messages(guild_id, interaction.channel)
+        if messages.queue_message is None:
+            q_embed = parent_cog._build_queue_embed(guild_id)
             q_msg = await interaction.channel.send(embed=q_embed)
-            parent_cog.queue_message = q_msg
+            messages.queue_message = q_msg
             await q_msg.add_reaction("❌")
         else:
-            await parent_cog.queue_message.edit(embed=parent_cog._build_queue_embed(self.guild_id))
+            parent_cog.render(guild_id, player=False)
 
 
 class PlayerEmbed(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.player_message: discord.Message | None = None
-        self.queue_message: discord.Message | None = None
+        self.guild_messages: dict[int, GuildMessages] = {}   # guild_id -> that guild's player/queue messages
+        self.controls = PlayerControls(bot)                  # shared by every player message
+        # Every embed edit goes through the scheduler: at most one edit per message per EMBED_EDIT_INTERVAL
+        self.scheduler = EmbedScheduler(interval=getattr(config, "EMBED_EDIT_INTERVAL", 1.0))
+        self._ready = False
+
+    async def cog_load(self):
+        # Persistent view: the buttons of player messages sent by a previous run keep working
+        self.bot.add_view(self.controls)
+
+    def get_messages(self, guild_id: int, channel: discord.abc.Messageable) -> GuildMessages:
+        """Return the messages of a guild, registering `channel` as its player channel if it has none yet."""
+        messages = self.guild_messages.get(guild_id)
+        if messages is None:
+            messages = self.guild_messages[guild_id] = GuildMessages(guild_id, channel)
+        return messages
+
+    # ─── Rendering ──────────────────────────────────────────────────────
+    def _build_player_embed(self, guild_id: int) -> discord.Embed:
+        player = nodes.get_player(guild_id)
+        current = player.current if player else None
+        if current is None:
+            return discord.Embed(
+                title="▶️ Anakin Player",
+                description="**No music is currently playing**\n\n__Next:__\nNothing for now",
+                color=0xFFA500
+            )
+
+        music_cog: Music = self.bot.get_cog("Music")
+        next_track = music_cog.get_queue(guild_id).peek() if music_cog else None
+        next_title = next_track.title if next_track else "None"
+
+        minutes = current.length // 60000
+        seconds = (current.length // 1000) % 60
+        paused = "⏸️ " if player.paused else ""
+        embed = discord.Embed(
+            title="▶️ Anakin Player",
+            description=f"{paused}**{current.title}** - ({minutes}:{seconds:02d})\n\n__Next:__\n{next_title}",
+            color=0xFFA500
+        )
+        artwork = getattr(current, "artwork", None)
+        if artwork:
+            embed.set_thumbnail(url=artwork)
+        return embed
 
     def _build_queue_embed(self, guild_id: int) -> discord.Embed:
         music_cog: Music = self.bot.get_cog("Music")
@@ -175,98 +198,146 @@ class PlayerEmbed(commands.Cog):
             embed.description = "No tracks in the queue."
         return embed
 
+    async def _edit_player(self, guild_id: int):
+        messages = self.guild_messages.get(guild_id)
+        if messages and messages.player_message:
+            await messages.player_message.edit(embed=self._build_player_embed(guild_id))
+
+    async def _edit_queue(self, guild_id: int):
+        messages = self.guild_messages.get(guild_id)
+        if messages and messages.queue_message:
+            await messages.queue_message.edit(embed=self._build_queue_embed(guild_id))
+
+    def render(self, guild_id: int, *, player: bool = True, queue: bool = True):
+        """
+        Bring the guild's embeds up to date with its current state.
+        The edits are coalesced: a burst of calls results in at most one edit per message per interval,
+        built from the state at the time of the edit.
+        """
+        messages = self.guild_messages.get(guild_id)
+        if messages is None:
+            return
+        if player and messages.player_message:
+            self.scheduler.schedule((guild_id, "player"), functools.partial(self._edit_player, guild_id))
+        if queue and messages.queue_message:
+            self.scheduler.schedule((guild_id, "queue"), functools.partial(self._edit_queue, guild_id))
+
+    async def respond(self, interaction: discord.Interaction):
+        """
+        Answer a button click on a player message with the up-to-date player embed:
+        the interaction response edits the message itself, then the queue embed is scheduled.
+        """
+        guild_id = interaction.guild_id
+        embed = self._build_player_embed(guild_id)
+        if interaction.response.is_done():
+            await interaction.edit_original_response(embed=embed)
+        else:
+            await interaction.response.edit_message(embed=embed)
+        self.scheduler.mark_edited((guild_id, "player"))
+        self.render(guild_id, player=False)
+
+    # ─── Events ─────────────────────────────────────────────────────────
     @commands.Cog.listener()
     async def on_ready(self):
         """
-        When the bot is ready:
-        1) Purge the channel completely (100 messages at a time)
-        2) Send the initial “Player” embed
+        Set up the player channel of every guild (PLAYER_CHANNEL_ID, plus PLAYER_CHANNEL_IDS for the other guilds).
+        Runs once: on_ready fires again after every gateway reconnect, when the messages are already in place.
         """
-        channel_id = getattr(config, "PLAYER_CHANNEL_ID", None)
-        if channel_id is None:
-            print("❌ config.PLAYER_CHANNEL_ID is not defined.")
+        if self._ready:
             return
+        self._ready = True
 
-        channel = self.bot.get_channel(channel_id)
-        if channel is None:
-            print(f"❌ Could not fetch channel with ID {channel_id}.")
+        channel_ids = list(getattr(config, "PLAYER_CHANNEL_IDS", []))
+        channel_id = getattr(config, "PLAYER_CHANNEL_ID", None)
+        if channel_id:
+            channel_ids.insert(0, channel_id)
+        if not channel_ids:
+            logger.error("❌ config.PLAYER_CHANNEL_ID is not defined.")
             return
 
-        # ─── 1) Complete channel purge ──────────────────────────────
-        deleted = await channel.purge(limit=100)
-        while len(deleted) == 100:
-            deleted = await channel.purge(limit=100)
-
-        # ─── 2) Send the initial “Player” embed ───────────────────
-        embed = discord.Embed(
-            title="▶️ Anakin Player",
-            description="**No music is currently playing**\n\n__Next:__\nNothing for now",
-            color=0xFFA500
+        start = time.perf_counter()
+        channels = []
+        for channel_id in dict.fromkeys(channel_ids):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                # Under cluster.py, the channels of the other processes' guilds are not visible here
+                if not getattr(self.bot, "shard_ids", None):
+                    logger.error(f"❌ Could not fetch channel with ID {channel_id}.")
+                continue
+            channels.append(channel)
+
+        results = await asyncio.gather(*(self._setup_channel(channel) for channel in channels), return_exceptions=True)
+        reused = 0
+        for channel, result in zip(channels, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Could not set up the player in channel {channel.id}: {result}")
+            elif result:
+                reused += 1
+
+        started = getattr(self.bot, "started", None)
+        since_start = f"{time.perf_counter() - started:.2f}s after start, " if started else ""
+        logger.info(
+            f"⏱️ Player ready in {len(channels)} channel(s) ({reused} message(s) reused): "
+            f"{since_start}{time.perf_counter() - start:.2f}s for the channels."
         )
-        msg = await channel.send(embed=embed)
-        controls = PlayerControls(self.bot, guild_id=channel.guild.id)
-        await msg.edit(view=controls)
-        self.player_message = msg
+
+    async def _setup_channel(self, channel: discord.TextChannel) -> bool:
+        """
+        Adopt the player (and queue) message left in `channel` by a previous run, or send a new one.
+        Nothing is deleted: only the last PLAYER_HISTORY_SCAN messages are read, in a single request.
+        Returns True if an existing player message was reused.
+        """
+        guild_id = channel.guild.id
+        messages = self.guild_messages[guild_id] = GuildMessages(guild_id, channel)
+        async for message in channel.history(limit=getattr(config, "PLAYER_HISTORY_SCAN", 50)):
+            if message.author.id != self.bot.user.id or not message.embeds:
+                continue
+            title = message.embeds[0].title
+            if title == "▶️ Anakin Player" and messages.player_message is None:
+                messages.player_message = message
+            elif title == "🕑 Queue" and messages.queue_message is None:
+                messages.queue_message = message
+            if messages.player_message and messages.queue_message:
+                break
+
+        embed = self._build_player_embed(guild_id)
+        if messages.player_message is None:
+            messages.player_message = await channel.send(embed=embed, view=self.controls)
+            return False
+
+        # The persistent view already answers its buttons: only edit if what it shows is out of date
+        if messages.player_message.embeds[0].description != embed.description:
+            self.render(guild_id, queue=False)
+        if messages.queue_message:
+            self.render(guild_id, player=False)
+        return True
 
     @commands.Cog.listener()
-    async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
-        if user.bot:
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        # Raw event: the queue message adopted after a restart comes from channel.history(),
+        # so it is not in the message cache that on_reaction_add depends on
+        if payload.guild_id is None:
             return
-        if self.queue_message and reaction.message.id == self.queue_message.id:
-            if reaction.emoji == "❌":
+        if (payload.member.bot if payload.member else payload.user_id == self.bot.user.id):
+            return
+        messages = self.guild_messages.get(payload.guild_id)
+        if messages and messages.queue_message and payload.message_id == messages.queue_message.id:
+            if str(payload.emoji) == "❌":
+                self.scheduler.cancel((messages.guild_id, "queue"))
                 try:
-                    await self.queue_message.delete()
+                    await messages.queue_message.delete()
                 except:
                     pass
-                self.queue_message = None
+                messages.queue_message = None
 
     @commands.Cog.listener()
     async def on_wavelink_track_start(self, event):
-        current = event.track
-        guild_id = event.player.guild.id
-        music_cog: Music = self.bot.get_cog("Music")
-        if not music_cog:
-            return
-
-        queue_list = music_cog.get_queue(guild_id)
-        next_title = queue_list[0].title if queue_list else "None"
-
-        minutes = current.length // 60000
-        seconds = (current.length // 1000) % 60
-        embed = discord.Embed(
-            title="▶️ Anakin Player",
-            description=f"**{current.title}** - ({minutes}:{seconds:02d})\n\n__Next:__\n{next_title}",
-            color=0xFFA500
-        )
-        thumb = getattr(current, "thumbnail", None) or getattr(current, "thumbnail_url", None)
-        if thumb:
-            embed.set_thumbnail(url=thumb)
-
-        if self.player_message:
-            await self.player_message.edit(embed=embed)
-
-        if self.queue_message:
-            await self.queue_message.edit(embed=self._build_queue_embed(guild_id))
+        self.render(event.player.guild.id)
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, event):
-        guild_id = event.player.guild.id
-        music_cog: Music = self.bot.get_cog("Music")
-        if not music_cog:
-            return
-
-        if music_cog.get_skip_flag(guild_id):
-            return
-
-        queue_list = music_cog.get_queue(guild_id)
-        if not queue_list:
-            embed = discord.Embed(
-                title="▶️ Anakin Player",
-                description="**No music is currently playing**\n\n__Next:__\nNothing for now",
-                color=0xFFA500
-            )
-            if self.player_message:
-                await self.player_message.edit(embed=embed)
+        # Usually followed by the next track's start: both are coalesced into one edit
+        self.render(event.player.guild.id)
 
     @commands.Cog.listener()
     async def on_wavelink_track_exception(self, event):
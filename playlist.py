@@ -1,85 +1,150 @@
+import asyncio
+import collections
 import re
-import wavelink
-
-# Optional for Spotify:
-# If you want to support Spotify playlists, install spotipy and set
-# SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in config.py or as environment variables.
-try:
-    import spotipy
-    from spotipy.oauth2 import SpotifyClientCredentials
-    SPOTIPY_AVAILABLE = True
-except ImportError:
-    SPOTIPY_AVAILABLE = False
-
-# If you store your Spotify credentials in config.py, import them here:
-import config 
-
-async def load_youtube_playlist(node, playlist_url):
+
+import config
+import resolver
+import search_cache
+from track_queue import QueueEntry
+
+# Spotify access goes through the shared async client in spotify.py
+# (SPOTIPY_AVAILABLE is False when spotipy is not installed).
+import spotify
+from spotify import SPOTIPY_AVAILABLE
+
+
+class PlaylistError(Exception):
+    """Raised by a playlist source when the playlist cannot be loaded at all (the message is shown to the user)."""
+
+
+# ─── Sources ────────────────────────────────────────────────────────
+# A source is an async generator function `(url, progress)` that yields the playlist's tracks in order,
+# as soon as each one is available, and keeps `progress` (a resolver.ResolveProgress) up to date.
+# Tracks are only produced when the consumer asks for the next one, so a slow consumer slows the source down.
+
+async def stream_lavalink_playlist(url, progress):
     """
-    Load all tracks from a YouTube playlist using Lavalink/Wavelink.
-    Returns a list of wavelink.Track if the playlist is loaded, otherwise None.
-    Example usage in main.py:
-        tracks = await playlist.load_youtube_playlist(node, url)
+    Playlists Lavalink loads by itself in one request (YouTube, SoundCloud sets, Bandcamp albums).
+    Always loaded fresh (a playlist can change at any time); simultaneous loads of one URL share a request.
     """
-    # Lavalink will interpret the playlist URL and return a LoadResult
-    result = await node.get_tracks(playlist_url)
-    if not result or not getattr(result, "tracks", None):
+    tracks = await search_cache.load_tracks(url)
+    if not tracks:
         # No tracks found or the URL wasn't recognized as a playlist
-        return None
+        raise PlaylistError("Could not load this playlist.")
 
-    return result.tracks
+    progress.total = len(tracks)
+    for track in tracks:
+        progress.done += 1
+        progress.resolved += 1
+        yield track
 
 
-async def load_spotify_playlist(node, playlist_url):
+async def stream_spotify_playlist(url, progress, lazy=None):
     """
-    Load all tracks from a Spotify playlist by searching each track on YouTube.
+    Spotify playlists. With `lazy` (default: config.SPOTIFY_LAZY_PLAYLISTS), every track is yielded at once
+    as an unresolved QueueEntry, searched on YouTube only when it gets close to playing (Music.schedule_lookahead).
+    Otherwise every track is searched up front (concurrently, order is kept, see resolver.py)
+    while the following pages are fetched, and tracks that cannot be found end up in `progress.failures`.
     Requires spotipy to be installed and config.SPOTIPY_CLIENT_ID / config.SPOTIPY_CLIENT_SECRET to be set.
-    Returns a list of corresponding wavelink.Track objects, or None on error / if spotipy is unavailable.
-    Example usage in main.py:
-        tracks = await playlist.load_spotify_playlist(node, url)
     """
+    if lazy is None:
+        lazy = getattr(config, "SPOTIFY_LAZY_PLAYLISTS", True)
     if not SPOTIPY_AVAILABLE:
-        # Spotipy not installed → cannot load Spotify playlists
-        return None
+        raise PlaylistError("Spotipy is not available; cannot load Spotify playlists.")
 
     # Extract the Spotify playlist ID from the URL
-    match = re.search(r"playlist/([A-Za-z0-9]+)", playlist_url)
+    match = re.search(r"playlist/([A-Za-z0-9]+)", url)
     if not match:
-        return None
+        raise PlaylistError("Invalid Spotify playlist URL.")
+
+    # Shared client: one authenticated session, token cached between calls
+    sp = spotify.get_client()
     playlist_id = match.group(1)
+    response = await sp.playlist_page(playlist_id)
+    if not response or not response.get("items"):
+        raise PlaylistError("Spotify playlist is empty or not found.")
+
+    progress.total = response.get("total")
+    items = iter_spotify_tracks(sp, playlist_id, response)
+    if lazy:
+        async for track_info in items:
+            progress.done += 1
+            progress.resolved += 1
+            yield QueueEntry.lazy(track_info)
+        return
+    async for _, track in resolver.resolve_ordered(items, resolver.resolve_spotify_track, progress=progress):
+        if track is not None:
+            yield track
+
+
+def _is_youtube_playlist(url: str) -> bool:
+    return "youtube.com/playlist" in url or (("youtube.com" in url or "youtu.be" in url) and "list=" in url)
+
+
+def _is_spotify_playlist(url: str) -> bool:
+    return "spotify.com" in url and "playlist" in url
+
+
+def _is_soundcloud_playlist(url: str) -> bool:
+    return "soundcloud.com" in url and "/sets/" in url
+
+
+def _is_bandcamp_album(url: str) -> bool:
+    return "bandcamp.com/album/" in url
+
+
+# (name shown to users, URL test, source), checked in order
+SOURCES = [
+    ("YouTube", _is_youtube_playlist, stream_lavalink_playlist),
+    ("Spotify", _is_spotify_playlist, stream_spotify_playlist),
+    ("SoundCloud", _is_soundcloud_playlist, stream_lavalink_playlist),
+    ("Bandcamp", _is_bandcamp_album, stream_lavalink_playlist),
+]
+
+
+def find_source(url: str):
+    """Return (name, source) for a playlist URL, or None if no source handles it."""
+    for name, matches, source in SOURCES:
+        if matches(url):
+            return name, source
+    return None
+
+
+async def iter_spotify_tracks(sp, playlist_id, response, concurrency=None):
+    """
+    Yield every track object of a Spotify playlist in order, starting from its first page `response`.
+    That page gives the playlist's `total`, so the following pages are requested by offset, up to
+    `concurrency` (default: config.SPOTIFY_PAGE_CONCURRENCY) at once and ahead of the consumer,
+    instead of one after the other through each page's `next` link.
+    Local files and removed tracks (items without a track) are skipped.
+    """
+    if concurrency is None:
+        concurrency = getattr(config, "SPOTIFY_PAGE_CONCURRENCY", 4)
+    limit = response.get("limit") or len(response.get("items", []))
+    offsets = iter(range(response.get("offset", 0) + limit, response.get("total") or 0, limit) if limit else ())
+    pages = collections.deque()
+
+    def fetch_more():
+        while len(pages) < max(1, concurrency):
+            offset = next(offsets, None)
+            if offset is None:
+                return
+            pages.append(asyncio.create_task(sp.playlist_page(playlist_id, offset)))
 
-    # Instantiate SpotifyClientCredentials with credentials from config.py
-    credentials = SpotifyClientCredentials(
-        client_id=config.SPOTIPY_CLIENT_ID,
-        client_secret=config.SPOTIPY_CLIENT_SECRET
-    )
-    sp = spotipy.Spotify(auth_manager=credentials)
-
-    tracks_loaded = []
-
-    # Fetch playlist items page by page (100 per page)
-    response = sp.playlist_items(playlist_id, additional_types=["track"])
-    while response:
-        for item in response["items"]:
-            track_info = item.get("track")
-            if not track_info:
-                continue
-
-            # Build the YouTube search query: "Title Artist1, Artist2"
-            name = track_info.get("name", "")
-            artists = ", ".join(artist["name"] for artist in track_info.get("artists", []))
-            search_query = f"{name} {artists}"
-
-            # Search on YouTube (via Wavelink)
-            results = await wavelink.Playable.search(search_query)
-            if results:
-                # Take the first result
-                tracks_loaded.append(results[0])
-
-        # Move to the next page if it exists
-        if response.get("next"):
-            response = sp.next(response)
-        else:
-            response = None
-
-    return tracks_loaded
+    fetch_more()
+    try:
+        while True:
+            for item in response.get("items", []):
+                track_info = item.get("track")
+                if track_info:
+                    yield track_info
+            if not pages:
+                return
+            response = await pages.popleft()
+            if not response:
+                return
+            fetch_more()
+    finally:
+        # Consumer stopped early: drop the pages still in flight
+        for page in pages:
+            page.cancel()
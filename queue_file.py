@@ -0,0 +1,212 @@
+# queue_file.py
+import asyncio
+import base64
+import binascii
+import json
+import logging
+
+import wavelink
+
+import config
+import nodes
+import snapshot
+from playlist import PlaylistError
+from track_queue import QueueEntry
+
+logger = logging.getLogger("Anakin")
+
+# Tracks per POST /v4/decodetracks request
+DECODE_BATCH = 500
+# Rejected decode requests allowed per batch (each invalid track costs about log2(DECODE_BATCH) of them)
+MAX_DECODE_ERRORS = 50
+
+# ─── File format ────────────────────────────────────────────────────
+# Plain text, one queue entry per line:
+# - a Lavalink encoded track (everything else about the track is in it)
+# - a JSON array in snapshot.pack form for a lazy entry not searched yet (it only has Spotify metadata)
+# Blank lines and lines starting with "#" are ignored. Entries that could not be found are not written.
+# The file comes from a user: every line is checked locally before anything is sent to Lavalink.
+
+
+def dump(entries) -> bytes:
+    """The queue file of `entries` (QueueEntry or wavelink.Playable), in order."""
+    lines = []
+    for track in entries:
+        entry = QueueEntry.of(track)
+        if entry.pending is not None:
+            lines.append(json.dumps(snapshot.pack(entry), separators=(",", ":")))
+        elif entry.playable:
+            lines.append(entry.encoded)
+    header = f"# Anakin queue: {len(lines)} track(s)"
+    return "\n".join([header] + lines).encode() + b"\n"
+
+
+def is_encoded_track(line: str) -> bool:
+    """
+    Whether `line` is shaped like a Lavalink encoded track: base64 of a lavaplayer message
+    (a 4-byte header holding flags and the size of the rest, then an optional version byte
+    and the title as a length-prefixed UTF string). Lavalink still decides if it can decode it.
+    """
+    try:
+        raw = base64.b64decode(line, validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    if len(raw) < 7:
+        return False
+    header = int.from_bytes(raw[:4], "big")
+    flags, size = header >> 30, header & 0x3FFFFFFF
+    if flags > 1 or size != len(raw) - 4:
+        return False
+    position = 4
+    if flags & 1:   # versioned track info
+        if raw[4] not in (1, 2, 3):
+            return False
+        position = 5
+    title_length = int.from_bytes(raw[position:position + 2], "big")
+    return position + 2 + title_length <= len(raw)
+
+
+def _lazy_entry(data) -> QueueEntry | None:
+    """The unresolved entry of a JSON line, or None if it is not exactly what dump() writes for one."""
+    if not isinstance(data, list) or len(data) != 5:
+        return None
+    encoded, title, length, uri, pending = data
+    if encoded is not None or not isinstance(title, str) or type(length) is not int or length < 0:
+        return None
+    if uri is not None and not isinstance(uri, str):
+        return None
+    if not isinstance(pending, dict) or not isinstance(pending.get("name"), str):
+        return None
+    artists = pending.get("artists", [])
+    if not isinstance(artists, list) or not all(isinstance(a, dict) and isinstance(a.get("name"), str) for a in artists):
+        return None
+    if pending.get("id") is not None and not isinstance(pending["id"], str):
+        return None
+    return snapshot.unpack(data)
+
+
+def parse(data: bytes, limit: int | None = None) -> list:
+    """
+    The entries of a queue file, in order: encoded track strings, unresolved QueueEntry objects,
+    and None for every line that is neither. Only the first `limit` entries are read.
+    """
+    try:
+        text = data.decode()
+    except UnicodeDecodeError:
+        raise PlaylistError("This is not a queue file.")
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if limit is not None and len(items) >= limit:
+            break
+        if line.startswith("["):
+            try:
+                items.append(_lazy_entry(json.loads(line)))
+            except ValueError:
+                items.append(None)
+        else:
+            items.append(line if is_encoded_track(line) else None)
+    return items
+
+
+# ─── Decoding ───────────────────────────────────────────────────────
+async def decode_tracks(node: wavelink.Node, encoded: list[str], failures: list,
+                        max_errors: int = MAX_DECODE_ERRORS) -> list:
+    """
+    Lavalink track objects for `encoded`, in one request. Lavalink rejects the whole batch if one
+    track is invalid: the batch is then split in halves until the invalid tracks are isolated,
+    which are left out (None in the result) and added to `failures`.
+    Raises PlaylistError once `max_errors` requests were rejected (e.g. a whole batch is invalid),
+    instead of bisecting the batch down to every single track.
+    """
+    errors = 0
+
+    async def decode(batch):
+        nonlocal errors
+        try:
+            return await node.send("POST", path="v4/decodetracks", data=batch)
+        except (wavelink.LavalinkException, wavelink.NodeException):
+            errors += 1
+            if errors >= max_errors:
+                raise PlaylistError("Too many tracks of this queue file could not be decoded.")
+            if len(batch) == 1:
+                failures.append(batch[0])
+                return [None]
+        middle = len(batch) // 2
+        return await decode(batch[:middle]) + await decode(batch[middle:])
+
+    return await decode(encoded)
+
+
+def _entry(track: dict) -> QueueEntry:
+    info = track["info"]
+    return QueueEntry(track["encoded"], info["title"], info["length"], info.get("uri"))
+
+
+async def stream_queue_file(data: bytes, progress):
+    """
+    Playlist source (see playlist.py) for the contents of a queue file.
+    Encoded tracks are decoded by Lavalink DECODE_BATCH at a time instead of being searched again;
+    the next batch is decoded while the current one is being queued. At most MAX_QUEUE_LENGTH
+    entries are read, and lines that are not queue entries are skipped without asking Lavalink.
+    """
+    items = parse(data, getattr(config, "MAX_QUEUE_LENGTH", None))
+    if not items:
+        raise PlaylistError("The queue file is empty.")
+    if not any(item is not None for item in items):
+        raise PlaylistError("This is not a queue file.")
+    node = nodes.best_node()
+    if node is None:
+        raise PlaylistError("No Lavalink node is available.")
+    progress.total = len(items)
+
+    # Split the file in batches of consecutive encoded tracks; lazy entries pass through as they are,
+    # invalid lines are reported right away
+    batches, run = [], []
+    for line, item in enumerate(items, start=1):
+        if item is None:
+            progress.done += 1
+            progress.failures.append((line - 1, {"name": f"line {line}"}, "invalid"))
+        elif isinstance(item, str):
+            run.append(item)
+            if len(run) == DECODE_BATCH:
+                batches.append(run)
+                run = []
+        else:
+            if run:
+                batches.append(run)
+                run = []
+            batches.append(item)
+    if run:
+        batches.append(run)
+
+    invalid: list[str] = []
+
+    def start(index):
+        batch = batches[index] if index < len(batches) else None
+        if isinstance(batch, list):
+            return asyncio.create_task(decode_tracks(node, batch, invalid))
+
+    following = start(0)
+    try:
+        for index, batch in enumerate(batches):
+            current, following = following, start(index + 1)
+            if current is None:
+                progress.done += 1
+                progress.resolved += 1
+                yield batch
+                continue
+            for track in await current:
+                progress.done += 1
+                if track is None:
+                    progress.failures.append((progress.done - 1, {"name": f"track {progress.done}"}, "invalid"))
+                    continue
+                progress.resolved += 1
+                yield _entry(track)
+    finally:
+        if following is not None:
+            following.cancel()
+    if invalid:
+        logger.warning(f"⚠️ {len(invalid)} invalid track(s) skipped in a queue file.")
@@ -0,0 +1,159 @@
+# resolver.py
+import asyncio
+import collections
+import logging
+
+import wavelink
+
+import config
+import search_cache
+import spotify_index
+
+logger = logging.getLogger("Anakin")
+
+
+def spotify_query(track_info: dict) -> str:
+    """Build the YouTube search query for a Spotify track: "Title Artist1, Artist2"."""
+    name = track_info.get("name", "")
+    artists = ", ".join(artist["name"] for artist in track_info.get("artists", []))
+    return f"{name} {artists}"
+
+
+async def search_first(query: str):
+    """Search a title or URL and return the first result, or None (goes through the search cache)."""
+    return await search_cache.search_track(query)
+
+
+class ResolveProgress:
+    """
+    Running totals of a resolution pipeline, updated in place while it runs.
+    `failures` holds (index, item, reason) for every item that could not be resolved.
+    """
+    __slots__ = ("total", "done", "resolved", "failures")
+
+    def __init__(self, total: int | None = None):
+        self.total = total
+        self.done = 0
+        self.resolved = 0
+        self.failures = []
+
+    def __str__(self):
+        total = self.total if self.total is not None else "?"
+        text = f"{self.done}/{total}"
+        if self.failures:
+            text += f" ({len(self.failures)} failed)"
+        return text
+
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def resolve_ordered(items, resolve, *, concurrency: int | None = None, progress: ResolveProgress | None = None):
+    """
+    Resolve `items` with the coroutine function `resolve`, running up to `concurrency` calls at once,
+    and yield (item, result) pairs in the original order of `items`.
+    `items` can be a regular or an async iterable. A failed item (exception or None result)
+    is yielded with result None and recorded in `progress.failures`.
+    Example usage:
+        async for item, track in resolver.resolve_ordered(queries, resolver.search_first):
+            queue.append(track)
+    """
+    if concurrency is None:
+        concurrency = getattr(config, "RESOLVE_CONCURRENCY", 8)
+    concurrency = max(1, concurrency)
+    if progress is None:
+        progress = ResolveProgress()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Keep a few more tasks than workers so one slow item at the head does not idle the others
+    window_size = concurrency * 4
+    window = collections.deque()
+
+    async def run(item):
+        async with semaphore:
+            return await resolve(item)
+
+    def finish(index, item, task):
+        reason = None
+        result = None
+        try:
+            result = task.result()
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+        else:
+            if result is None:
+                reason = "no results"
+
+        progress.done += 1
+        if reason is None:
+            progress.resolved += 1
+        else:
+            progress.failures.append((index, item, reason))
+            logger.warning(f"⚠️ Could not resolve item #{index + 1}: {reason}")
+        return result
+
+    try:
+        index = 0
+        async for item in _aiter(items):
+            window.append((index, item, asyncio.ensure_future(run(item))))
+            index += 1
+            while len(window) >= window_size:
+                head_index, head_item, head_task = window.popleft()
+                await asyncio.wait([head_task])
+                yield head_item, finish(head_index, head_item, head_task)
+
+        while window:
+            head_index, head_item, head_task = window.popleft()
+            await asyncio.wait([head_task])
+            yield head_item, finish(head_index, head_item, head_task)
+    finally:
+        # Consumer stopped early (or was cancelled): drop whatever is still in flight
+        for _, _, task in window:
+            task.cancel()
+
+
+async def resolve_spotify_track(track_info: dict):
+    """
+    Find the YouTube equivalent of a Spotify track object, or None.
+    Tracks already seen (same Spotify ID or ISRC) come straight from the Spotify index.
+    """
+    index = spotify_index.get_index()
+    spotify_id = track_info.get("id")
+    isrc = track_info.get("external_ids", {}).get("isrc")
+
+    data = await index.get(spotify_id, isrc)
+    if data is not None:
+        return wavelink.Playable(data)
+
+    track = await search_first(spotify_query(track_info))
+    if track is not None and spotify_id:
+        await index.put(spotify_id, isrc, track.raw_data)
+    return track
+
+
+async def resolve_entry(entry) -> bool:
+    """
+    Resolve a lazy queue entry (track_queue.QueueEntry.lazy) in place.
+    Returns True if the entry is playable; an entry that cannot be found is marked as failed.
+    """
+    if entry.resolved:
+        return entry.playable
+    try:
+        track = await resolve_spotify_track(entry.pending)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not resolve {entry.title}: {e}")
+        return False
+    if entry.resolved:
+        # Resolved by someone else in the meantime (look-ahead vs. playback)
+        return entry.playable
+    if track is None:
+        entry.fail()
+        return False
+    entry.resolve(track)
+    return True
@@ -0,0 +1,275 @@
+# search_cache.py
+import asyncio
+import collections
+import json
+import logging
+import re
+import time
+
+import wavelink
+import yarl
+
+import config
+import metrics
+import nodes
+from storage import SQLiteStore
+
+logger = logging.getLogger("Anakin")
+
+# Metrics labels (search_source): sites and search prefixes the bot knows, anything else is "other"
+SOURCE_SITES = frozenset(("youtube", "spotify", "soundcloud", "bandcamp", "twitch", "vimeo", "deezer", "apple"))
+SEARCH_PREFIXES = frozenset(("ytsearch", "ytmsearch", "scsearch", "spsearch", "amsearch", "dzsearch"))
+
+
+def url_host(text: str) -> str | None:
+    """The host of `text` if it is a URL, else None (also for text that only looks like a broken URL)."""
+    try:
+        return yarl.URL(text).host
+    except ValueError:
+        return None
+
+
+def search_term(query: str) -> str:
+    """
+    `query` as wavelink.Playable.search takes it: wavelink parses every query as a URL first, so text
+    that is not a valid one (e.g. "http://[x") is searched as plain text instead of raising ValueError.
+    """
+    try:
+        yarl.URL(query)
+    except ValueError:
+        return f"ytmsearch:{query}"
+    return query
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a search: URLs are kept as-is (minus surrounding spaces),
+    plain text is case-folded with whitespace collapsed, so "Get  Lucky" and "get lucky" share an entry.
+    """
+    query = query.strip()
+    if url_host(query):
+        return query
+    return re.sub(r"\s+", " ", query).casefold()
+
+
+def search_source(query: str) -> str:
+    """Metrics label for a search: the site of a URL ("youtube", "spotify"...), else the search prefix."""
+    host = url_host(query)
+    if host:
+        parts = host.removeprefix("www.").removeprefix("m.").split(".")
+        site = "youtube" if parts[0] == "youtu" else parts[-2] if len(parts) > 1 else host
+        return site if site in SOURCE_SITES else "other"
+    prefix, sep, _ = query.partition(":")
+    if not sep or not prefix.endswith("search"):
+        return "ytmsearch"
+    return prefix if prefix in SEARCH_PREFIXES else "other"
+
+
+class SearchCache(SQLiteStore):
+    """
+    Two-level cache of Lavalink search results (single tracks: playlists change, they are not cached).
+    Level 1 is an in-memory LRU of `capacity` entries, level 2 a SQLite file that survives restarts.
+    Each entry stores the raw track payloads (encoded track + info) so a hit rebuilds the
+    wavelink.Playable objects without contacting Lavalink. Entries expire after `ttl` seconds.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS searches (key TEXT PRIMARY KEY, tracks TEXT NOT NULL, expires REAL NOT NULL)",
+    )
+
+    def __init__(self, path: str, capacity: int = 5000, ttl: float = 7 * 24 * 3600):
+        super().__init__(path)
+        self.capacity = capacity
+        self.ttl = ttl
+        self._memory: collections.OrderedDict[str, tuple[float, list]] = collections.OrderedDict()
+        # key -> future of the Lavalink load running for it (raw track payloads), shared by identical requests
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._db.execute("DELETE FROM searches WHERE expires < ?", (time.time(),))
+        self._db.execute("DELETE FROM searches WHERE key LIKE 'list:%'")   # playlists cached by older versions
+        self._db.commit()
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0   # requests answered by a load already in flight instead of a Lavalink load of their own
+
+    # ─── Disk level (runs in the cache thread) ────────────────────────
+    def _disk_get(self, key: str):
+        row = self._db.execute("SELECT tracks, expires FROM searches WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _disk_put(self, key: str, expires: float, tracks: list):
+        self._db.execute(
+            "INSERT OR REPLACE INTO searches (key, tracks, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(tracks, separators=(",", ":")), expires)
+        )
+        self._db.commit()
+
+    def _disk_delete(self, key: str):
+        self._db.execute("DELETE FROM searches WHERE key = ?", (key,))
+        self._db.commit()
+
+    # ─── Memory level ─────────────────────────────────────────────────
+    def _remember(self, key: str, expires: float, tracks: list):
+        self._memory[key] = (expires, tracks)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> list | None:
+        """Return the cached raw track payloads for `key`, or None on a miss."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] >= now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._memory[key]
+            self.evictions += 1
+
+        entry = await self.run(self._disk_get, key)
+        if entry is not None and entry[0] >= now:
+            self._remember(key, *entry)
+            self.hits += 1
+            self.disk_hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, tracks: list):
+        expires = time.time() + self.ttl
+        self._remember(key, expires, tracks)
+        await self.run(self._disk_put, key, expires, tracks)
+
+    async def invalidate(self, key: str):
+        self._memory.pop(key, None)
+        await self.run(self._disk_delete, key)
+
+    def _disk_delete_track(self, identifier: str):
+        needle = f'"identifier":{json.dumps(identifier)}'
+        deleted = self._db.execute("DELETE FROM searches WHERE instr(tracks, ?) > 0", (needle,)).rowcount
+        self._db.commit()
+        return deleted
+
+    async def invalidate_track(self, identifier: str) -> int:
+        """
+        Forget every cached result that contains the track `identifier` (e.g. a video that stopped playing),
+        so the next search for it goes back to Lavalink. Rare, so a full scan is fine here.
+        """
+        stale = [
+            key for key, (_, tracks) in self._memory.items()
+            if any(data["info"]["identifier"] == identifier for data in tracks)
+        ]
+        for key in stale:
+            del self._memory[key]
+        return await self.run(self._disk_delete_track, identifier)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache: SearchCache | None = None
+
+
+def get_cache() -> SearchCache:
+    """Return the process-wide search cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SearchCache(
+            path=getattr(config, "SEARCH_CACHE_PATH", "anakin_cache.db"),
+            capacity=getattr(config, "SEARCH_CACHE_SIZE", 5000),
+            ttl=getattr(config, "SEARCH_CACHE_TTL", 7 * 24 * 3600)
+        )
+    return _cache
+
+
+def _lookup_counts() -> dict:
+    cache = get_cache()
+    return {
+        ("memory_hit",): cache.hits - cache.disk_hits,
+        ("disk_hit",): cache.disk_hits,
+        ("miss",): cache.misses,
+    }
+
+
+metrics.SEARCH_CACHE.collect = _lookup_counts
+metrics.SEARCHES_COALESCED.collect = lambda: {(): get_cache().coalesced}
+
+
+async def _load(key: str, query: str, limit: int | None, cached: bool = True) -> list:
+    """
+    Tracks for `key`: from the cache, else from the Lavalink load already running for the same key
+    (a playlist with a song twice, several guilds playing the same title), else from a new load.
+    Without `cached`, the load is only shared with identical requests running at the same time.
+    """
+    cache = get_cache()
+    pending = cache._inflight.get(key)
+    if pending is None and cached:
+        hit = await cache.get(key)
+        if hit is not None:
+            return [wavelink.Playable(data) for data in hit]
+        # Another request may have started the load while the disk was read
+        pending = cache._inflight.get(key)
+
+    if pending is not None:
+        cache.coalesced += 1
+        loaded = await asyncio.shield(pending)
+        if loaded is None:
+            # The load was cancelled along with the request that started it: start one for this request
+            return await _load(key, query, limit, cached)
+        return [wavelink.Playable(data) for data in loaded]
+
+    future = cache._inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        with metrics.SEARCH_SECONDS.time(search_source(query)):
+            results = await wavelink.Playable.search(search_term(query), node=nodes.best_node())
+        tracks = list(results)[:limit] if results else []
+        future.set_result([track.raw_data for track in tracks])
+        if tracks and cached:
+            await cache.put(key, future.result())
+        return tracks
+    except asyncio.CancelledError:
+        if not future.done():
+            future.set_result(None)
+        raise
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+            future.exception()   # retrieved: no "never retrieved" warning when nobody was waiting
+        raise
+    finally:
+        del cache._inflight[key]
+
+
+async def search_track(query: str):
+    """
+    Search a title or URL and return the first track, or None.
+    Same results as wavelink.Playable.search(query)[0], served from the cache when possible.
+    """
+    tracks = await _load("track:" + normalize_query(query), query, 1)
+    return tracks[0] if tracks else None
+
+
+async def load_tracks(url: str) -> list:
+    """
+    Load every track behind a URL (e.g. a playlist). Always asked to Lavalink, since a playlist can be
+    edited at any time; identical loads running at the same time share one request.
+    """
+    return await _load("list:" + normalize_query(url), url, None, cached=False)
@@ -0,0 +1,114 @@
+# snapshot.py
+import json
+import logging
+import time
+
+from storage import SQLiteStore
+from track_queue import QueueEntry
+
+logger = logging.getLogger("Anakin")
+
+
+def pack(track) -> list:
+    """Compact JSON form of a queue entry or wavelink.Playable: [encoded, title, length, uri(, pending)]."""
+    entry = QueueEntry.of(track)
+    if entry.pending is not None:
+        return [entry.encoded, entry.title, entry.length, entry.uri, entry.pending]
+    return [entry.encoded, entry.title, entry.length, entry.uri]
+
+
+def unpack(data: list) -> QueueEntry:
+    return QueueEntry(*data)
+
+
+class SnapshotStore(SQLiteStore):
+    """
+    Durable copy of every guild's playback state, so a restart does not lose queues.
+    - queues: the queued entries (encoded tracks), only rewritten when the queue changed
+    - playback: history, loop counter, current track, position, pause state and voice channel
+    Restoring only decodes what was saved: no search is sent to Lavalink.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS queues (guild_id INTEGER PRIMARY KEY, entries TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS playback (guild_id INTEGER PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)",
+    )
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._saved_versions: dict[int, int] = {}   # guild_id -> queue version last written
+
+    # ─── Runs in the store thread ─────────────────────────────────────
+    def _write(self, queues: list, playback: list):
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO queues (guild_id, entries) VALUES (?, ?)",
+                [(guild_id, json.dumps([pack(e) for e in entries], separators=(",", ":"))) for guild_id, entries in queues]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO playback (guild_id, state, updated) VALUES (?, ?, ?)",
+                [(guild_id, json.dumps(state, separators=(",", ":")), now) for guild_id, state in playback]
+            )
+
+    def _load(self) -> dict:
+        saved = {}
+        for guild_id, state in self._db.execute("SELECT guild_id, state FROM playback"):
+            saved[guild_id] = json.loads(state)
+        for guild_id, entries in self._db.execute("SELECT guild_id, entries FROM queues"):
+            saved.setdefault(guild_id, {})["queue"] = json.loads(entries)
+        return saved
+
+    def _delete(self, guild_ids: list):
+        with self._db:
+            self._db.executemany("DELETE FROM queues WHERE guild_id = ?", [(g,) for g in guild_ids])
+            self._db.executemany("DELETE FROM playback WHERE guild_id = ?", [(g,) for g in guild_ids])
+
+    # ─── Event loop side ──────────────────────────────────────────────
+    async def save(self, states, get_player) -> int:
+        """
+        Write a snapshot of every GuildState in `states`.
+        `get_player(guild_id)` returns the guild's wavelink.Player or None.
+        Returns the number of guilds saved.
+        """
+        queues = []
+        playback = []
+        versions = {}
+        for state in states:
+            guild_id = state.guild_id
+            queue = state.peek_queue()
+            version = queue.version if queue is not None else 0
+            if self._saved_versions.get(guild_id) != version:
+                # list() copies the references now; the JSON encoding happens in the store thread
+                queues.append((guild_id, list(queue) if queue is not None else []))
+                versions[guild_id] = version
+
+            player = get_player(guild_id)
+            current = player.current if player and player.connected else None
+            playback.append((guild_id, {
+                "history": [pack(t) for t in state.history],
+                "loop": state.loop,
+                "current": pack(current) if current else None,
+                "position": player.position if current else 0,
+                "paused": bool(player and player.paused),
+                "channel_id": player.channel.id if current and player.channel else None,
+            }))
+
+        if not playback:
+            return 0
+        await self.run(self._write, queues, playback)
+        self._saved_versions.update(versions)
+        return len(playback)
+
+    async def load(self) -> dict:
+        """Return {guild_id: saved state} as written by save()."""
+        return await self.run(self._load)
+
+    def mark_saved(self, guild_id: int, version: int):
+        """Record that the queue of a guild, at `version`, is already what is stored (e.g. right after a restore)."""
+        self._saved_versions[guild_id] = version
+
+    async def delete(self, guild_ids: list):
+        for guild_id in guild_ids:
+            self._saved_versions.pop(guild_id, None)
+        await self.run(self._delete, list(guild_ids))
@@ -0,0 +1,142 @@
+# spotify.py
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional for Spotify:
+# If you want to support Spotify links, install spotipy and set
+# SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in config.py.
+try:
+    import requests
+    import spotipy
+    from urllib3.util.retry import Retry
+    from spotipy.cache_handler import MemoryCacheHandler
+    from spotipy.oauth2 import SpotifyClientCredentials
+    SPOTIPY_AVAILABLE = True
+except ImportError:
+    SPOTIPY_AVAILABLE = False
+
+import config
+import metrics
+
+logger = logging.getLogger("Anakin")
+
+# Only the parts of a playlist page the bot uses (QueueEntry.lazy, resolver.resolve_spotify_track)
+PLAYLIST_FIELDS = (
+    "total,limit,offset,next,"
+    "items(track(id,name,duration_ms,artists(name),external_ids(isrc),external_urls(spotify)))"
+)
+PLAYLIST_PAGE_SIZE = 100            # the most Spotify returns per request
+MAX_RATE_LIMIT_RETRIES = 5
+MAX_RETRY_AFTER = 60                # seconds; a longer ban is reported as an error instead of waited out
+
+
+class SpotifyClient:
+    """
+    Async access to the Spotify Web API through one shared spotipy session.
+    spotipy is synchronous, so every request runs in a small dedicated thread pool
+    and the bot's event loop never waits on Spotify.
+    The client-credentials token is kept in memory and only refreshed by spotipy when it expires.
+    A 429 response pauses every request of the client for the Retry-After it gives, then the request
+    is sent again. The HTTP session only retries server errors: urllib3 would otherwise wait out the
+    Retry-After of a 429 itself, sleeping in a worker thread, and the 429 would never reach _run.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, max_workers: int = 4):
+        self.auth_manager = SpotifyClientCredentials(
+            client_id=client_id,
+            client_secret=client_secret,
+            cache_handler=MemoryCacheHandler()
+        )
+        self.sp = spotipy.Spotify(
+            auth_manager=self.auth_manager, requests_timeout=10, requests_session=_session()
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="spotify")
+        self._retry_at = 0.0   # loop time before which no request is sent (after a 429)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            wait = self._retry_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                with metrics.SPOTIFY_SECONDS.time(func.__name__):
+                    return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+            except spotipy.SpotifyException as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or retry_after > MAX_RETRY_AFTER or attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                metrics.SPOTIFY_RATE_LIMITED.inc()
+                logger.warning(f"⏳ Rate limited by Spotify, retrying {func.__name__} in {retry_after:.0f}s.")
+                self._retry_at = max(self._retry_at, loop.time() + retry_after)
+
+    async def track(self, track_id: str) -> dict:
+        """Fetch a single track object."""
+        return await self._run(self.sp.track, track_id)
+
+    async def playlist_items(self, playlist_id: str, **kwargs) -> dict:
+        """Fetch the first page of a playlist (same arguments as spotipy's playlist_items)."""
+        return await self._run(self.sp.playlist_items, playlist_id, **kwargs)
+
+    async def playlist_page(self, playlist_id: str, offset: int = 0) -> dict:
+        """Fetch PLAYLIST_PAGE_SIZE tracks of a playlist from `offset`, with only PLAYLIST_FIELDS."""
+        return await self.playlist_items(
+            playlist_id, fields=PLAYLIST_FIELDS, limit=PLAYLIST_PAGE_SIZE, offset=offset, additional_types=["track"]
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _session() -> "requests.Session":
+    """HTTP session for spotipy that retries server errors with a backoff and hands every 429 back at once."""
+    retry = Retry(
+        total=3,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+    )
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_after(error) -> float | None:
+    """Seconds to wait before retrying a rate-limited (429) request, or None for any other error."""
+    if error.http_status != 429:
+        return None
+    # Without the header this is spotipy giving up on server errors, which it also reports as 429
+    value = error.headers.get("Retry-After") if error.headers else None
+    try:
+        return max(float(value), 1.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+_client: SpotifyClient | None = None
+
+
+def get_client() -> SpotifyClient | None:
+    """
+    Return the process-wide Spotify client, creating it on first use.
+    Returns None if spotipy is not installed.
+    """
+    global _client
+    if not SPOTIPY_AVAILABLE:
+        return None
+    if _client is None:
+        _client = SpotifyClient(
+            client_id=config.SPOTIPY_CLIENT_ID,
+            client_secret=config.SPOTIPY_CLIENT_SECRET,
+            max_workers=getattr(config, "SPOTIFY_MAX_WORKERS", 4)
+        )
+        logger.info("🎧 Spotify client initialised.")
+    return _client
@@ -0,0 +1,93 @@
+# spotify_index.py
+import json
+import logging
+import time
+
+import config
+import metrics
+from storage import SQLiteStore
+
+logger = logging.getLogger("Anakin")
+
+
+class SpotifyIndex(SQLiteStore):
+    """
+    Persistent mapping from Spotify tracks (by Spotify ID, or ISRC as a fallback)
+    to the Lavalink track they were resolved to. A hit gives a playable track
+    without asking Spotify or Lavalink anything.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS spotify_tracks ("
+        " spotify_id TEXT PRIMARY KEY,"
+        " isrc TEXT,"
+        " identifier TEXT NOT NULL,"
+        " track TEXT NOT NULL,"
+        " updated REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS spotify_tracks_isrc ON spotify_tracks (isrc)",
+        "CREATE INDEX IF NOT EXISTS spotify_tracks_identifier ON spotify_tracks (identifier)",
+    )
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, spotify_id: str | None, isrc: str | None):
+        row = None
+        if spotify_id:
+            row = self._db.execute("SELECT track FROM spotify_tracks WHERE spotify_id = ?", (spotify_id,)).fetchone()
+        if row is None and isrc:
+            row = self._db.execute("SELECT track FROM spotify_tracks WHERE isrc = ? LIMIT 1", (isrc,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, spotify_id: str, isrc: str | None, track: dict):
+        self._db.execute(
+            "INSERT OR REPLACE INTO spotify_tracks (spotify_id, isrc, identifier, track, updated) VALUES (?, ?, ?, ?, ?)",
+            (spotify_id, isrc, track["info"]["identifier"], json.dumps(track, separators=(",", ":")), time.time())
+        )
+        self._db.commit()
+
+    def _invalidate(self, identifier: str) -> int:
+        deleted = self._db.execute("DELETE FROM spotify_tracks WHERE identifier = ?", (identifier,)).rowcount
+        self._db.commit()
+        return deleted
+
+    async def get(self, spotify_id: str | None, isrc: str | None = None) -> dict | None:
+        """Return the raw track payload mapped to this Spotify track, or None."""
+        track = await self.run(self._get, spotify_id, isrc)
+        if track is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return track
+
+    async def put(self, spotify_id: str, isrc: str | None, track: dict):
+        """Remember that this Spotify track resolved to `track` (a raw Lavalink track payload)."""
+        await self.run(self._put, spotify_id, isrc, track)
+
+    async def invalidate(self, identifier: str) -> int:
+        """Drop every Spotify track mapped to the Lavalink track `identifier` (e.g. it failed to play)."""
+        deleted = await self.run(self._invalidate, identifier)
+        if deleted:
+            logger.info(f"🗑️ Dropped {deleted} Spotify mapping(s) to unplayable track {identifier}")
+        return deleted
+
+
+_index: SpotifyIndex | None = None
+
+
+def get_index() -> SpotifyIndex:
+    """Return the process-wide Spotify index, creating it on first use."""
+    global _index
+    if _index is None:
+        _index = SpotifyIndex(getattr(config, "SEARCH_CACHE_PATH", "anakin_cache.db"))
+    return _index
+
+
+def _lookup_counts() -> dict:
+    index = get_index()
+    return {("hit",): index.hits, ("miss",): index.misses}
+
+
+metrics.SPOTIFY_INDEX.collect = _lookup_counts
@@ -0,0 +1,32 @@
+# storage.py
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SQLiteStore:
+    """
+    A SQLite connection owned by one background thread.
+    Subclasses write plain synchronous methods and call them through `run()`,
+    so disk access never blocks the bot's event loop.
+    """
+
+    schema: tuple[str, ...] = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{type(self).__name__}")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.schema:
+            self._db.execute(statement)
+        self._db.commit()
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._db.close()
@@ -0,0 +1,14 @@
+# tests/conftest.py
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The shipped config.py is a template that does not parse until it is filled in:
+# the modules under test only need it to import, their settings all have defaults.
+try:
+    import config  # noqa: F401
+except SyntaxError:
+    sys.modules["config"] = types.ModuleType("config")
@@ -0,0 +1,48 @@
+# tests/test_embed_scheduler.py
+import asyncio
+import time
+
+from embed_scheduler import EmbedScheduler
+
+INTERVAL = 0.2
+
+
+def test_direct_edit_pushes_back_a_waiting_worker():
+    """An edit made another way while the worker sleeps starts the interval over."""
+    edits = []
+
+    async def edit():
+        edits.append(time.monotonic())
+
+    async def scenario():
+        scheduler = EmbedScheduler(interval=INTERVAL, debounce=0.01)
+        scheduler.schedule("message", edit)
+        await asyncio.sleep(0.1)                # first edit done, the worker waits out its interval
+        direct = time.monotonic()
+        scheduler.mark_edited("message")
+        scheduler.schedule("message", edit)
+        await asyncio.sleep(INTERVAL * 2)
+        return direct, scheduler
+
+    direct, scheduler = asyncio.run(scenario())
+    assert len(edits) == 2
+    assert edits[1] - direct >= INTERVAL * 0.95
+    assert not scheduler._workers and not scheduler._edited
+
+
+def test_direct_edit_supersedes_pending_edits():
+    edits = []
+
+    async def edit():
+        edits.append(time.monotonic())
+
+    async def scenario():
+        scheduler = EmbedScheduler(interval=INTERVAL, debounce=0.05)
+        scheduler.schedule("message", edit)
+        scheduler.mark_edited("message")
+        await asyncio.sleep(INTERVAL * 1.5)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert edits == []
+    assert scheduler.superseded == 1
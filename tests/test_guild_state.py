@@ -0,0 +1,17 @@
+# tests/test_guild_state.py
+from guild_state import GuildRegistry
+from track_queue import QueueEntry
+
+
+def test_queue_is_created_on_first_use():
+    guilds = GuildRegistry(max_queue_length=2)
+    state = guilds.get(1)
+    assert state.peek_queue() is None
+    assert state.queued == 0
+    assert "queue=0" in repr(state)
+    assert state.peek_queue() is None
+
+    state.queue.append(QueueEntry("enc", "title", 1000))
+    assert state.peek_queue() is state.queue
+    assert state.queued == 1
+    assert state.queue.max_length == 2
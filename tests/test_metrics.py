@@ -0,0 +1,35 @@
+# tests/test_metrics.py
+import logging
+
+import metrics
+
+
+def test_counter_gauge_histogram_render():
+    counter = metrics.Counter("test_counter_total", "Test counter", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    gauge = metrics.Gauge("test_gauge", "Test gauge", collect=lambda: {(): 7})
+    histogram = metrics.Histogram("test_seconds", "Test histogram", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(5)
+    text = metrics.render()
+    assert 'test_counter_total{kind="a"} 3' in text
+    assert "test_gauge 7" in text
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="+Inf"} 2' in text
+
+
+def test_rate_limits_are_counted_from_discord_http_log():
+    log = logging.getLogger("discord.http")
+    fmt = "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds."
+    edits = metrics.EMBED_RATE_LIMITED._values.get((), 0)
+    patches = metrics.DISCORD_RATE_LIMITED._values.get(("PATCH",), 0)
+    posts = metrics.DISCORD_RATE_LIMITED._values.get(("POST",), 0)
+
+    log.warning(fmt, "PATCH", "https://discord.com/api/v10/channels/1/messages/2", 1.5)
+    log.warning(fmt, "POST", "https://discord.com/api/v10/channels/1/messages", 0.5)
+    log.warning("Global rate limit has been hit. Retrying in %.2f seconds.", 1.0)   # same 429, not counted twice
+
+    assert metrics.EMBED_RATE_LIMITED._values[()] == edits + 1
+    assert metrics.DISCORD_RATE_LIMITED._values[("PATCH",)] == patches + 1
+    assert metrics.DISCORD_RATE_LIMITED._values[("POST",)] == posts + 1
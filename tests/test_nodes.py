@@ -0,0 +1,160 @@
+# tests/test_nodes.py
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import wavelink
+from wavelink.websocket import Websocket
+
+import nodes
+
+
+class DownNode:
+    identifier = "down"
+    players = {1: object()}
+
+    async def fetch_stats(self):
+        raise ConnectionError("stats unavailable")
+
+
+def test_failover_after_consecutive_failed_polls(monkeypatch):
+    node = DownNode()
+    balancer = nodes.NodeBalancer(max_failures=3)
+    moved = []
+
+    async def failover(failed):
+        moved.append(failed)
+        return 1
+
+    monkeypatch.setattr(balancer, "connected_nodes", lambda exclude=None: [node])
+    monkeypatch.setattr(balancer, "failover", failover)
+
+    async def poll(times):
+        for _ in range(times):
+            await balancer.refresh()
+
+    asyncio.run(poll(2))
+    assert moved == []
+    assert balancer.score(node) == float("inf")      # no new players meanwhile
+    asyncio.run(poll(1))
+    assert moved == [node]
+    asyncio.run(poll(2))
+    assert moved == [node]                            # the count starts over after a failover
+
+
+def test_successful_poll_resets_the_failures(monkeypatch):
+    node = DownNode()
+    balancer = nodes.NodeBalancer(max_failures=2)
+    moved = []
+
+    async def failover(failed):
+        moved.append(failed)
+        return 1
+
+    async def stats():
+        return object()
+
+    monkeypatch.setattr(balancer, "connected_nodes", lambda exclude=None: [node])
+    monkeypatch.setattr(balancer, "failover", failover)
+    monkeypatch.setattr(nodes, "penalty", lambda stats: 1.0)
+
+    async def poll(fetch_stats):
+        node.fetch_stats = fetch_stats
+        await balancer.refresh()
+
+    down = DownNode().fetch_stats
+    for fetch_stats in (down, stats, down):
+        asyncio.run(poll(fetch_stats))
+    assert moved == []
+    assert balancer.score(node) == float("inf")
+
+
+def test_resumed_answers_once():
+    balancer = nodes.NodeBalancer()
+    balancer._resuming.add(5)
+    assert balancer.resumed(5)
+    assert not balancer.resumed(5)
+
+
+class FakePlayer:
+    def __init__(self, guild_id: int, node):
+        self.guild = SimpleNamespace(id=guild_id)
+        self.node = node
+        self.connected = True
+        self.current = None
+        self.queue = SimpleNamespace(history=None)
+
+    async def switch_node(self, node):
+        self.node = node
+
+
+class FakeChannel:
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+
+    async def connect(self, cls):
+        return FakePlayer(self.guild_id, cls.keywords["nodes"][0])
+
+
+def test_failover_after_websocket_cleanup(monkeypatch):
+    """wavelink empties node.players before dispatching node_disconnected: the players must still be moved."""
+    events = []
+    client = SimpleNamespace(dispatch=lambda event, payload: events.append((event, payload)))
+    balancer = nodes.NodeBalancer()
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return await place_and_drop(session)
+
+    async def place_and_drop(session):
+        dropped = wavelink.Node(identifier="dropped", uri="http://127.0.0.1:1", password="x", session=session, client=client)
+        backup = wavelink.Node(identifier="backup", uri="http://127.0.0.1:2", password="x", session=session, client=client)
+        monkeypatch.setattr(balancer, "connected_nodes", lambda exclude=None: [dropped])
+        player = await balancer.connect(FakeChannel(1))
+        left = await balancer.connect(FakeChannel(2))
+        dropped._players[1] = player
+        left.connected = False      # left the voice channel since
+
+        monkeypatch.setattr(balancer, "connected_nodes", lambda exclude=None: [backup])
+        await Websocket(node=dropped).cleanup()
+        assert dropped.players == {}
+        (event, payload), = events
+        assert event == "wavelink_node_disconnected"
+        moved = await balancer.failover(payload.node)
+        return moved, player.node is backup, left.node is dropped
+
+    moved, player_moved, left_stayed = asyncio.run(run())
+    assert moved == 1
+    assert player_moved and left_stayed
+
+
+def test_switch_takes_back_the_history_entry():
+    class Track:
+        pass
+
+    class History:
+        def __init__(self):
+            self.items = []
+
+        @property
+        def count(self):
+            return len(self.items)
+
+        def delete(self, index):
+            del self.items[index]
+
+    balancer = nodes.NodeBalancer()
+    player = FakePlayer(3, "old")
+    player.current = Track()
+    player.queue.history = History()
+
+    async def switch_node(node):
+        # What wavelink does: play the current track again, with add_history=True
+        player.node = node
+        player.queue.history.items.append(player.current)
+
+    player.switch_node = switch_node
+    asyncio.run(balancer._switch(player, "new"))
+    assert player.node == "new"
+    assert player.queue.history.count == 0
+    assert balancer.resumed(3)
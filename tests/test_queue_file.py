@@ -0,0 +1,97 @@
+# tests/test_queue_file.py
+import asyncio
+import base64
+import json
+
+import pytest
+import wavelink
+
+import queue_file
+from playlist import PlaylistError
+from track_queue import QueueEntry
+
+
+def encode(title: str) -> str:
+    """A minimal encoded track in the lavaplayer format: header, version 3, title, then a few more bytes."""
+    data = title.encode()
+    body = bytes([3]) + len(data).to_bytes(2, "big") + data + b"\x00" * 8
+    return base64.b64encode(((1 << 30) | len(body)).to_bytes(4, "big") + body).decode()
+
+
+LAZY = [None, "Daft Punk - Get Lucky", 248000, "https://open.spotify.com/track/x",
+        {"id": "x", "name": "Get Lucky", "artists": [{"name": "Daft Punk"}]}]
+
+
+def test_encoded_track_shape():
+    assert queue_file.is_encoded_track(encode("Get Lucky"))
+    assert not queue_file.is_encoded_track("x")
+    assert not queue_file.is_encoded_track("not base64!")
+    assert not queue_file.is_encoded_track(base64.b64encode(b"\x00\x00\x00\x10" + b"short").decode())
+
+
+def test_parse_keeps_order_and_marks_invalid_lines():
+    lines = ["# Anakin queue", encode("A"), "junk", json.dumps(LAZY), "", encode("B")]
+    items = queue_file.parse("\n".join(lines).encode())
+    assert items[0] == encode("A")
+    assert items[1] is None
+    assert isinstance(items[2], QueueEntry) and not items[2].resolved
+    assert items[3] == encode("B")
+
+
+@pytest.mark.parametrize("line", [
+    [None, "title", 1, None],                                   # no pending: would pass as resolved
+    ["abc", "title", 1, None, {"name": "x"}],                   # lazy entries have no encoded track
+    [None, "title", "1", None, {"name": "x"}],                  # length is not an int
+    [None, "title", 1, None, None],
+    [None, "title", 1, None, {"name": "x", "artists": "x"}],
+    {"encoded": None},
+])
+def test_parse_rejects_malformed_json_lines(line):
+    assert queue_file.parse(json.dumps(line).encode()) == [None]
+
+
+def test_parse_stops_at_limit():
+    data = "\n".join(["x"] * 100).encode()
+    assert len(queue_file.parse(data, limit=10)) == 10
+
+
+def test_dump_then_parse_round_trip():
+    entries = [QueueEntry(encode("A"), "A", 1000), QueueEntry.lazy({"id": "x", "name": "Get Lucky"})]
+    items = queue_file.parse(queue_file.dump(entries))
+    assert items[0] == encode("A")
+    assert items[1].pending == entries[1].pending
+
+
+class RejectingNode:
+    """Node stub whose decodetracks rejects any batch containing one of `invalid`."""
+
+    def __init__(self, invalid):
+        self.invalid = set(invalid)
+        self.requests = 0
+
+    async def send(self, method, *, path, data):
+        self.requests += 1
+        if self.invalid.intersection(data):
+            raise wavelink.LavalinkException(
+                data={"timestamp": 0, "status": 400, "error": "Bad Request", "path": "/v4/decodetracks"}
+            )
+        return [{"encoded": e} for e in data]
+
+
+def test_decode_tracks_isolates_an_invalid_track():
+    batch = [encode(str(i)) for i in range(64)]
+    node = RejectingNode([batch[10]])
+    failures = []
+    tracks = asyncio.run(queue_file.decode_tracks(node, batch, failures))
+    assert failures == [batch[10]]
+    assert tracks[10] is None
+    assert [t["encoded"] for t in tracks if t] == batch[:10] + batch[11:]
+    assert node.requests <= 2 * 7
+
+
+def test_decode_tracks_aborts_on_a_batch_of_invalid_tracks():
+    batch = [encode(str(i)) for i in range(500)]
+    node = RejectingNode(batch)
+    with pytest.raises(PlaylistError):
+        asyncio.run(queue_file.decode_tracks(node, batch, []))
+    assert node.requests == queue_file.MAX_DECODE_ERRORS
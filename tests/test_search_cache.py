@@ -0,0 +1,95 @@
+# tests/test_search_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import wavelink
+
+import search_cache
+
+
+def track(identifier: str) -> dict:
+    return {"encoded": f"enc-{identifier}", "info": {"identifier": identifier, "title": identifier}}
+
+
+@pytest.mark.parametrize("query, key", [
+    ("  Get   Lucky ", "get lucky"),
+    ("https://youtu.be/AbC", "https://youtu.be/AbC"),
+    ("http://[x", "http://[x"),                           # not a valid URL: plain text, no ValueError
+])
+def test_normalize_query(query, key):
+    assert search_cache.normalize_query(query) == key
+
+
+@pytest.mark.parametrize("query, source", [
+    ("https://www.youtube.com/watch?v=x", "youtube"),
+    ("https://youtu.be/x", "youtube"),
+    ("https://open.spotify.com/track/x", "spotify"),
+    ("https://artist.bandcamp.com/album/x", "bandcamp"),
+    ("https://anything.example.org/x", "other"),           # hostnames do not become label values
+    ("scsearch:x", "scsearch"),
+    ("madeupsearch:x", "other"),
+    ("get lucky", "ytmsearch"),
+    ("http://[x", "ytmsearch"),
+])
+def test_search_source(query, source):
+    assert search_cache.search_source(query) == source
+
+
+def test_search_term_keeps_wavelink_from_raising():
+    assert search_cache.search_term("get lucky") == "get lucky"
+    assert search_cache.search_term("http://[x") == "ytmsearch:http://[x"
+
+
+def test_playlists_are_always_loaded_from_lavalink(monkeypatch):
+    loads = []
+
+    async def search(query, node=None):
+        loads.append(query)
+        return [SimpleNamespace(raw_data=track(f"{query}-{i}")) for i in range(3)]
+
+    async def scenario():
+        cache = search_cache.SearchCache(":memory:", capacity=10)
+        monkeypatch.setattr(search_cache, "_cache", cache)
+        monkeypatch.setattr(wavelink.Playable, "search", search)
+
+        url = "https://youtube.com/playlist?list=x"
+        assert len(await search_cache.load_tracks(url)) == 3
+        assert len(await search_cache.load_tracks(url)) == 3
+        assert loads == [url, url]
+        assert not cache._memory
+        assert await cache.run(cache._disk_get, "list:" + url) is None
+
+        await search_cache.search_track("get lucky")
+        assert list(cache._memory) == ["track:get lucky"]
+
+    asyncio.run(scenario())
+
+
+def test_old_playlist_entries_are_dropped(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def fill():
+        cache = search_cache.SearchCache(path)
+        await cache.put("list:p", [track("p")])
+        await cache.put("track:t", [track("t")])
+
+    async def read():
+        cache = search_cache.SearchCache(path)
+        return await cache.get("list:p"), await cache.get("track:t")
+
+    asyncio.run(fill())
+    playlist, single = asyncio.run(read())
+    assert playlist is None
+    assert single == [track("t")]
+
+
+def test_memory_level_is_bounded_by_entry_count():
+    async def scenario():
+        cache = search_cache.SearchCache(":memory:", capacity=3)
+        for i in range(5):
+            await cache.put(f"track:{i}", [track(str(i))])
+        assert list(cache._memory) == ["track:2", "track:3", "track:4"]
+        assert cache.evictions == 2
+
+    asyncio.run(scenario())
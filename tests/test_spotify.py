@@ -0,0 +1,99 @@
+# tests/test_spotify.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+spotify = pytest.importorskip("spotify")
+if not spotify.SPOTIPY_AVAILABLE:
+    pytest.skip("spotipy is not installed", allow_module_level=True)
+
+
+class RateLimitedAPI:
+    """Local stand-in for the Spotify Web API answering the first `limited` requests with a 429."""
+
+    def __init__(self, limited: int, retry_after: str | None):
+        self.limited = limited
+        self.retry_after = retry_after
+        self.requests = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.requests += 1
+                if api.requests <= api.limited:
+                    self.send_response(429)
+                    if api.retry_after is not None:
+                        self.send_header("Retry-After", api.retry_after)
+                    body = json.dumps({"error": {"status": 429, "message": "API rate limit exceeded"}}).encode()
+                else:
+                    self.send_response(200)
+                    body = json.dumps({"id": "abc", "name": "Get Lucky"}).encode()
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def client(self) -> "spotify.SpotifyClient":
+        client = spotify.SpotifyClient("id", "secret", max_workers=2)
+        client.sp.prefix = f"http://127.0.0.1:{self.server.server_port}/"
+        client.sp.auth_manager = None   # no token request
+        return client
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def api(request):
+    limited, retry_after = request.param
+    api = RateLimitedAPI(limited, retry_after)
+    yield api
+    api.close()
+
+
+@pytest.mark.parametrize("api", [(1, "1")], indirect=True)
+def test_429_is_retried_once_after_retry_after(api):
+    client = api.client()
+    start = time.perf_counter()
+    track = asyncio.run(client.track("abc"))
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    assert track["name"] == "Get Lucky"
+    assert api.requests == 2                 # urllib3 did not retry the 429 on its own
+    assert 1.0 <= elapsed < 3.0
+
+
+@pytest.mark.parametrize("api", [(100, "120")], indirect=True)
+def test_429_with_long_retry_after_is_raised(api):
+    client = api.client()
+    start = time.perf_counter()
+    with pytest.raises(spotify.spotipy.SpotifyException) as error:
+        asyncio.run(client.track("abc"))
+    client.close()
+
+    assert error.value.http_status == 429
+    assert error.value.headers["Retry-After"] == "120"
+    assert api.requests == 1
+    assert time.perf_counter() - start < 2.0
+
+
+@pytest.mark.parametrize("api", [(100, None)], indirect=True)
+def test_429_without_retry_after_is_raised(api):
+    client = api.client()
+    with pytest.raises(spotify.spotipy.SpotifyException):
+        asyncio.run(client.track("abc"))
+    client.close()
+
+    assert api.requests == 1
@@ -0,0 +1,150 @@
+# tests/test_track_queue.py
+import random
+
+import pytest
+
+from track_queue import QueueEntry, QueueFull, TrackQueue
+
+
+def entry(title: str, uri: str | None = None) -> QueueEntry:
+    return QueueEntry(f"enc-{title}", title, 1000, uri)
+
+
+def titles(queue: TrackQueue) -> list[str]:
+    return [track.title for track in queue]
+
+
+def check_index(queue: TrackQueue):
+    """Every queued track is indexed under each of its words, and the index refers to nothing else."""
+    queued = {seq for seq, _ in queue._items if seq in queue._tracks}
+    assert queued == set(queue._tracks)
+    assert len(queue) == len(queued)
+    for word, posting in queue._words.items():
+        seqs = {posting} if isinstance(posting, int) else posting
+        assert len(seqs) >= 1
+        assert seqs <= set(queue._tracks)
+        assert all(word in queue._tracks[seq].title.casefold() for seq in seqs)
+
+
+# ─── Order ──────────────────────────────────────────────────────────
+def test_append_appendleft_pop_order():
+    queue = TrackQueue([entry("B"), entry("C")])
+    queue.appendleft(entry("A"))
+    queue.append(entry("D"))
+    assert titles(queue) == ["A", "B", "C", "D"]
+    assert queue.peek().title == "A"
+    assert queue.popleft().title == "A"
+    assert queue.pop().title == "D"
+    assert queue[0].title == "B" and queue[-1].title == "C"
+    check_index(queue)
+
+
+def test_find_returns_first_match_in_queue_order():
+    queue = TrackQueue([entry("Song 1"), entry("Other"), entry("Song 2")])
+    queue.appendleft(entry("Song 0"))
+    assert queue.find("song")[1].title == "Song 0"
+
+
+def test_find_prefers_whole_words():
+    queue = TrackQueue([entry("Lovely Day"), entry("Love Song")])
+    assert queue.remove_match("love").title == "Love Song"
+    assert queue.remove_match("lov").title == "Lovely Day"
+    assert not queue
+
+
+def test_find_exact_uri():
+    queue = TrackQueue([entry("A", "https://youtu.be/a"), entry("B", "https://youtu.be/b")])
+    assert queue.find("HTTPS://YOUTU.BE/B")[1].title == "B"
+
+
+def test_shuffle_keeps_tracks_and_find_follows_new_order():
+    random.seed(1)
+    queue = TrackQueue(entry(f"Song {i}") for i in range(50))
+    index = dict(queue._words)
+    queue.shuffle()
+    assert sorted(titles(queue)) == sorted(f"Song {i}" for i in range(50))
+    assert queue._words == index                        # the index is not rebuilt
+    assert queue.find("song")[1] is queue.peek()       # shared posting, answered in the new order
+    queue.appendleft(entry("Song first"))
+    queue.append(entry("Song last"))
+    assert titles(queue)[0] == "Song first" and titles(queue)[-1] == "Song last"
+    assert queue.find("song")[1].title == "Song first"
+    queue.popleft()
+    assert queue.find("song")[1] is queue.peek()
+    check_index(queue)
+
+
+# ─── Index ──────────────────────────────────────────────────────────
+def test_shared_posting_shrinks_back_to_a_single_seq():
+    queue = TrackQueue([entry("Daft Punk - One More Time"), entry("Daft Punk - Get Lucky")])
+    assert isinstance(queue._words["daft"], set)
+    queue.remove_match("one more time")
+    assert isinstance(queue._words["daft"], int)
+    assert "one" not in queue._words
+    assert queue.find("daft")[1].title == "Daft Punk - Get Lucky"
+    check_index(queue)
+
+
+def test_remove_from_middle_leaves_order_and_index_consistent():
+    queue = TrackQueue(entry(f"Track {i}") for i in range(10))
+    assert queue.remove_match("Track 4").title == "Track 4"
+    assert queue.remove_match("Track 5").title == "Track 5"
+    assert titles(queue) == [f"Track {i}" for i in (0, 1, 2, 3, 6, 7, 8, 9)]
+    assert queue[:3] == list(queue)[:3]
+    assert queue[4].title == "Track 6"
+    assert queue.find("Track 5") is None
+    check_index(queue)
+
+
+def test_removed_items_at_the_ends_are_never_peeked_or_popped():
+    queue = TrackQueue([entry("A"), entry("B"), entry("C"), entry("D")])
+    queue.remove_match("B")
+    queue.popleft()
+    assert queue.peek().title == "C"
+    queue.remove_match("C")
+    assert queue.peek().title == "D"
+    assert queue.pop().title == "D"
+    assert not queue and queue.peek() is None
+    assert queue.nbytes == 0
+
+
+def test_dead_items_are_compacted():
+    queue = TrackQueue(entry(f"Track {i}") for i in range(100))
+    for i in range(1, 99):
+        queue.remove_match(f"Track {i}")
+    assert len(queue._items) <= 2 * len(queue) + 1
+    assert titles(queue) == ["Track 0", "Track 99"]
+    check_index(queue)
+
+
+def test_version_changes_on_every_change():
+    queue = TrackQueue([entry("A"), entry("B")])
+    versions = [queue.version]
+    for change in (lambda: queue.append(entry("C")), queue.shuffle, lambda: queue.remove_match("A"), queue.popleft):
+        change()
+        versions.append(queue.version)
+    assert len(set(versions)) == len(versions)
+
+
+# ─── Quotas ─────────────────────────────────────────────────────────
+def test_max_length():
+    queue = TrackQueue([entry("A"), entry("B")], max_length=2)
+    with pytest.raises(QueueFull):
+        queue.append(entry("C"))
+    queue.appendleft(entry("Previous"))                  # putting a track back is not limited
+    assert len(queue) == 3
+    queue.remove_match("A")
+    queue.remove_match("B")
+    queue.append(entry("C"))                              # removed tracks free their place
+    assert titles(queue) == ["Previous", "C"]
+
+
+def test_max_bytes():
+    one = entry("A").nbytes
+    queue = TrackQueue([entry("A")], max_bytes=one * 2)
+    queue.append(entry("B"))
+    with pytest.raises(QueueFull):
+        queue.append(entry("C"))
+    queue.popleft()
+    queue.append(entry("C"))
+    assert queue.nbytes == sum(track.nbytes for track in queue)
@@ -0,0 +1,356 @@
+# track_queue.py
+import collections
+import itertools
+import random
+import re
+import sys
+
+import wavelink
+
+
+def _words(text: str) -> list[str]:
+    # Interned: the same word in many titles is stored once in the index
+    return [sys.intern(word) for word in re.findall(r"\w+", text.casefold())]
+
+
+def _post(postings: dict, key: str, seq: int):
+    # A posting is a single seq (the common case, and much smaller) until a second track shares the key
+    current = postings.get(key)
+    if current is None:
+        postings[key] = seq
+    elif isinstance(current, int):
+        postings[key] = {current, seq}
+    else:
+        current.add(seq)
+
+
+def _unpost(postings: dict, key: str, seq: int):
+    current = postings.get(key)
+    if current is None:
+        return
+    if isinstance(current, int):
+        if current == seq:
+            del postings[key]
+    else:
+        current.discard(seq)
+        if len(current) == 1:
+            postings[key] = current.pop()
+
+
+def _seqs(posting, ranks: dict) -> list[int]:
+    """The seqs of a posting in queue order (`ranks` holds the position of the seqs a shuffle moved)."""
+    if isinstance(posting, int):
+        return [posting]
+    if ranks:
+        return sorted(posting, key=lambda seq: ranks.get(seq, seq))
+    return sorted(posting)
+
+
+def _size(posting) -> int:
+    return 1 if isinstance(posting, int) else len(posting)
+
+
+class QueueFull(Exception):
+    """Raised when appending would exceed the queue's length or memory quota."""
+
+
+class QueueEntry:
+    """
+    Compact queue item: the Lavalink encoded track plus the few fields the embeds display.
+    A wavelink.Playable is only rebuilt from it when the track is about to be played;
+    Lavalink itself only needs the encoded string.
+    A lazy entry (QueueEntry.lazy) only has Spotify metadata in `pending` until it is resolved
+    (resolver.resolve_entry); one that could not be found ends up with an empty `encoded`.
+    """
+    __slots__ = ("encoded", "title", "length", "uri", "pending")
+
+    def __init__(self, encoded: str | None, title: str, length: int, uri: str | None = None,
+                 pending: dict | None = None):
+        self.encoded = encoded
+        self.title = title
+        self.length = length
+        self.uri = uri
+        self.pending = pending
+
+    @classmethod
+    def of(cls, track) -> "QueueEntry":
+        """Entry for a wavelink.Playable (entries are returned unchanged)."""
+        if isinstance(track, cls):
+            return track
+        return cls(track.encoded, track.title, track.length, track.uri)
+
+    @classmethod
+    def lazy(cls, track_info: dict) -> "QueueEntry":
+        """Unresolved entry for a Spotify track object; only the fields needed to resolve it are kept."""
+        name = track_info.get("name", "")
+        artists = [artist["name"] for artist in track_info.get("artists", [])]
+        pending = {"id": track_info.get("id"), "name": name, "artists": [{"name": artist} for artist in artists]}
+        isrc = track_info.get("external_ids", {}).get("isrc")
+        if isrc:
+            pending["external_ids"] = {"isrc": isrc}
+        title = f"{', '.join(artists)} - {name}" if artists else name
+        uri = track_info.get("external_urls", {}).get("spotify")
+        return cls(None, title, track_info.get("duration_ms", 0), uri, pending)
+
+    @property
+    def resolved(self) -> bool:
+        return self.pending is None
+
+    @property
+    def playable(self) -> bool:
+        return bool(self.encoded)
+
+    def resolve(self, track):
+        """Fill a lazy entry with the wavelink.Playable it resolved to (title and URI are kept for the index)."""
+        self.encoded = track.encoded
+        self.length = track.length
+        self.pending = None
+
+    def fail(self):
+        """Mark a lazy entry as not found, so it is skipped instead of being searched again."""
+        self.encoded = ""
+        self.pending = None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by this entry."""
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.encoded) + sys.getsizeof(self.title)
+            + (sys.getsizeof(self.uri) if self.uri else 0)
+            + (sys.getsizeof(self.pending) if self.pending else 0)
+        )
+
+    def to_playable(self) -> wavelink.Playable:
+        return wavelink.Playable({
+            "encoded": self.encoded,
+            "info": {
+                "identifier": "",
+                "isSeekable": True,
+                "author": "",
+                "length": self.length,
+                "isStream": False,
+                "position": 0,
+                "title": self.title,
+                "uri": self.uri,
+                "sourceName": "",
+            },
+            "pluginInfo": {},
+            "userData": {},
+        })
+
+    def __repr__(self) -> str:
+        return f"<QueueEntry title={self.title!r}>"
+
+
+class TrackQueue:
+    """
+    Upcoming tracks of one guild, stored as QueueEntry objects (Playables are converted on the way in).
+    - O(1) push/pop at both ends (collections.deque)
+    - cheap access to the first items, which is all the embeds need
+    - an index of title words and URIs, so `!remove` checks a handful of candidates instead of the whole queue
+    - optional quotas: `max_length` entries and `max_bytes` of entry memory, enforced by append()
+    Every track gets a sequence number (seq) that the index refers to it by. Seqs follow queue order,
+    except after a shuffle, which only records the new position of each seq in `_ranks`.
+    A track removed from the middle (remove_match) stays in the deque as a dead item, skipped
+    until the next compaction, so removing does not shift the deque.
+    """
+    __slots__ = (
+        "_items", "_tracks", "_words", "_uris", "_ranks", "_head", "_tail", "_dead",
+        "nbytes", "max_length", "max_bytes", "version"
+    )
+
+    def __init__(self, tracks=(), *, max_length: int | None = None, max_bytes: int | None = None):
+        self._items = collections.deque()   # (seq, track) in queue order, including dead items
+        self._tracks = {}                    # seq -> track, queued tracks only
+        self._words = {}                     # title word -> seq, or set of seq if shared
+        self._uris = {}                      # lowercased URI -> seq, or set of seq if shared
+        self._ranks = {}                     # seq -> position, for the seqs placed by the last shuffle
+        self._head = 0                       # next seq for appendleft (counts down)
+        self._tail = 1                       # next seq for append (counts up)
+        self._dead = 0                       # removed items still in _items
+        self.nbytes = 0                      # approximate memory of the queued entries
+        self.version = 0                     # bumped on every change (lets snapshots skip unchanged queues)
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.extend(tracks)
+
+    # ─── Index maintenance ────────────────────────────────────────────
+    def _index(self, seq: int, track):
+        self.version += 1
+        self._tracks[seq] = track
+        self.nbytes += track.nbytes
+        for word in _words(track.title):
+            _post(self._words, word, seq)
+        if track.uri:
+            _post(self._uris, track.uri.casefold(), seq)
+
+    def _unindex(self, seq: int, track):
+        self.version += 1
+        del self._tracks[seq]
+        if self._ranks:
+            self._ranks.pop(seq, None)
+        self.nbytes -= track.nbytes
+        for word in _words(track.title):
+            _unpost(self._words, word, seq)
+        if track.uri:
+            _unpost(self._uris, track.uri.casefold(), seq)
+
+    def _trim(self):
+        """Drop the dead items at both ends, so peek() and pops always see a queued track."""
+        items, tracks = self._items, self._tracks
+        while items and items[0][0] not in tracks:
+            items.popleft()
+            self._dead -= 1
+        while items and items[-1][0] not in tracks:
+            items.pop()
+            self._dead -= 1
+
+    def _compact(self):
+        """Rebuild the deque without its dead items."""
+        if self._dead:
+            tracks = self._tracks
+            self._items = collections.deque(item for item in self._items if item[0] in tracks)
+            self._dead = 0
+
+    # ─── Push / pop ───────────────────────────────────────────────────
+    def append(self, track):
+        """Add a track at the end. Raises QueueFull if a quota would be exceeded."""
+        track = QueueEntry.of(track)
+        if self.max_length is not None and len(self._tracks) >= self.max_length:
+            raise QueueFull(f"the queue is limited to {self.max_length} tracks")
+        if self.max_bytes is not None and self.nbytes + track.nbytes > self.max_bytes:
+            raise QueueFull(f"the queue is limited to {self.max_bytes // 1024} KiB")
+        seq = self._tail
+        self._tail += 1
+        self._items.append((seq, track))
+        self._index(seq, track)
+
+    def appendleft(self, track):
+        """Put a track back at the front (not subject to the quotas, e.g. the current track on "previous")."""
+        track = QueueEntry.of(track)
+        seq = self._head
+        self._head -= 1
+        self._items.appendleft((seq, track))
+        self._index(seq, track)
+
+    def extend(self, tracks):
+        for track in tracks:
+            self.append(track)
+
+    def popleft(self):
+        seq, track = self._items.popleft()
+        self._unindex(seq, track)
+        if self._dead:
+            self._trim()
+        return track
+
+    def pop(self):
+        seq, track = self._items.pop()
+        self._unindex(seq, track)
+        if self._dead:
+            self._trim()
+        return track
+
+    def peek(self):
+        """First track of the queue, or None if it is empty."""
+        return self._items[0][1] if self._items else None
+
+    def clear(self):
+        self.version += 1
+        self.nbytes = 0
+        self._items.clear()
+        self._tracks.clear()
+        self._words.clear()
+        self._uris.clear()
+        self._ranks.clear()
+        self._head, self._tail, self._dead = 0, 1, 0
+
+    def shuffle(self):
+        """
+        Shuffle in place. Tracks keep their seq (so the index is untouched): the new position of
+        each one is recorded in `_ranks`, between the seqs of appendleft and append.
+        """
+        self._compact()
+        items = list(self._items)
+        random.shuffle(items)
+        self._items = collections.deque(items)
+        first = self._head + 1
+        self._ranks = {seq: first + position for position, (seq, _) in enumerate(items)}
+        self.version += 1
+
+    # ─── Search ───────────────────────────────────────────────────────
+    def _matches(self, needle: str, track) -> bool:
+        return needle in track.title.casefold() or bool(track.uri and needle in track.uri.casefold())
+
+    def find(self, identifier: str):
+        """
+        Return (seq, track) of the track `identifier` designates (case-insensitive), or None:
+        1. a track whose URI is exactly `identifier`
+        2. else the first track, in queue order, whose title contains `identifier` with its words
+           as whole title words ("love" finds "Love Song" before "Lovely Day")
+        3. else the first track, in queue order, whose title or URI contains `identifier` at all
+        1 and 2 are answered from the index; only 3 scans the queue.
+        """
+        needle = identifier.strip().casefold()
+        if not needle:
+            return None
+
+        posting = self._uris.get(needle)
+        if posting is not None:
+            seq = _seqs(posting, self._ranks)[0]
+            return seq, self._tracks[seq]
+
+        postings = [self._words[word] for word in _words(needle) if word in self._words]
+        if postings:
+            for seq in _seqs(min(postings, key=_size), self._ranks):
+                track = self._tracks[seq]
+                if self._matches(needle, track):
+                    return seq, track
+
+        tracks = self._tracks
+        for seq, track in self._items:
+            if seq in tracks and self._matches(needle, track):
+                return seq, track
+        return None
+
+    def remove_match(self, identifier: str):
+        """
+        Remove and return the track matching `identifier` (see find), or None.
+        Its deque item is left dead; the deque is compacted once dead items outnumber queued ones.
+        """
+        found = self.find(identifier)
+        if found is None:
+            return None
+        self._unindex(*found)
+        self._dead += 1
+        self._trim()
+        if self._dead > len(self._tracks):
+            self._compact()
+        return found[1]
+
+    # ─── Sequence protocol ────────────────────────────────────────────
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __bool__(self) -> bool:
+        return bool(self._tracks)
+
+    def __iter__(self):
+        if not self._dead:
+            return (track for _, track in self._items)
+        tracks = self._tracks
+        return (track for seq, track in self._items if seq in tracks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if start >= 0 and (stop is None or stop >= 0) and step > 0:
+                if not self._dead:
+                    return [track for _, track in itertools.islice(self._items, start, stop, step)]
+                return list(itertools.islice(iter(self), start, stop, step))
+            return list(self)[index]
+        self._compact()
+        return self._items[index][1]
+
+    def __repr__(self) -> str:
+        return f"<TrackQueue len={len(self._tracks)}>"
@@ -0,0 +1,178 @@
+# watchdog.py
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+import metrics
+
+logger = logging.getLogger("Anakin")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Task -> what it is doing for a user ("!playlist in guild 123"), read by the watchdog thread when the loop stalls
+_activities: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+
+def set_activity(text: str):
+    """Label the current task in the watchdog report (e.g. the command and guild it is serving)."""
+    task = asyncio.current_task()
+    if task is not None:
+        _activities[task] = text
+
+
+class Offender:
+    """Every stall blamed on the same place in the bot's code, worst one's stack kept."""
+    __slots__ = ("site", "cause", "count", "total", "worst", "stack", "activity")
+
+    def __init__(self, site: str, cause: str):
+        self.site = site
+        self.cause = cause
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack: list[str] = []
+        self.activity = ""
+
+
+class LoopWatchdog:
+    """
+    Finds the code that blocks the event loop (audio stutters, late button responses).
+    - a heartbeat task wakes up every `threshold / 2` seconds and measures how late it is
+    - a thread checks the heartbeat; when it is more than `threshold` late the loop is still blocked,
+      so the loop thread's stack and the running task's activity (see set_activity) are captured right then
+    - once the loop comes back, the stall is recorded against the innermost frame of the bot's own code
+      (the "site"), with the innermost frame overall as its "cause" (e.g. a blocking HTTP read in a library)
+    report() ranks the sites by total blocked time.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_sites: int = 100):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.max_sites = max_sites
+        self.offenders: dict[tuple, Offender] = {}
+        self.stalls = 0
+        self.blocked = 0.0
+        self._beat = time.monotonic()
+        self._capture = None          # (beat, task, stack) taken by the thread during the current stall
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"🐕 Event loop watchdog started (threshold {self.threshold * 1000:.0f} ms).")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._beat - self.interval
+            capture, self._capture = self._capture, None
+            if lag >= self.threshold and capture is not None and capture[0] == self._beat:
+                self._record(lag, capture[1], capture[2])
+
+    def _watch(self):
+        captured_beat = None
+        while not self._stopped.wait(self.threshold / 4):
+            beat = self._beat
+            if beat != captured_beat and time.monotonic() - beat - self.interval > self.threshold:
+                captured_beat = beat
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._capture = (beat, asyncio.current_task(self._loop), traceback.extract_stack(frame))
+
+    def _record(self, lag: float, task, stack: traceback.StackSummary):
+        # Drop the frames of the loop itself, down to the callback that is running
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index].filename.endswith(os.path.join("asyncio", "events.py")):
+                stack = traceback.StackSummary.from_list(stack[index + 1:])
+                break
+        own = [frame for frame in stack if _is_own(frame.filename)]
+        site = _location(own[-1]) if own else "?"
+        cause = _location(stack[-1]) if stack else "?"
+        activity = _activities.get(task) if task is not None else None
+        if activity is None:
+            activity = task.get_name() if task is not None else "loop callback"
+
+        self.stalls += 1
+        self.blocked += lag
+        metrics.LOOP_BLOCKS.inc(site)
+        logger.warning(f"🐢 Event loop blocked {lag * 1000:.0f} ms in {site} ({cause}) during {activity}")
+
+        key = (site, cause)
+        offender = self.offenders.get(key)
+        if offender is None:
+            if len(self.offenders) >= self.max_sites:
+                return
+            offender = self.offenders[key] = Offender(site, cause)
+        offender.count += 1
+        offender.total += lag
+        if lag >= offender.worst:
+            offender.worst = lag
+            offender.stack = traceback.format_list(stack)
+            offender.activity = activity
+
+    def report(self, limit: int = 10, stacks: bool = False) -> str:
+        """Text report of the `limit` sites that blocked the loop the longest in total."""
+        lines = [
+            f"🐢 Event loop blocked {self.stalls} time(s) for {self.blocked:.2f}s in total "
+            f"(threshold {self.threshold * 1000:.0f} ms)"
+        ]
+        ranked = sorted(self.offenders.values(), key=lambda offender: offender.total, reverse=True)
+        for rank, offender in enumerate(ranked[:limit], start=1):
+            lines.append(
+                f"{rank}. {offender.total:.2f}s over {offender.count} stall(s), worst {offender.worst * 1000:.0f} ms: "
+                f"{offender.site} -> {offender.cause} (worst during {offender.activity})"
+            )
+            if stacks:
+                lines.extend("    " + line.rstrip().replace("\n", "\n    ") for line in offender.stack)
+        return "\n".join(lines)
+
+
+def _is_own(filename: str) -> bool:
+    return filename.startswith(ROOT) and os.sep + "site-packages" + os.sep not in filename
+
+
+def _location(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if _is_own(filename):
+        filename = os.path.relpath(filename, ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+_watchdog: LoopWatchdog | None = None
+
+
+def get_watchdog() -> LoopWatchdog | None:
+    """The process-wide watchdog, or None if it was never started."""
+    return _watchdog
+
+
+def start(threshold: float) -> LoopWatchdog:
+    """Create and start the process-wide watchdog on the running loop."""
+    global _watchdog
+    _watchdog = LoopWatchdog(threshold)
+    _watchdog.start()
+    return _watchdog